@@ -0,0 +1,321 @@
+"""
+Análises de Agendamentos
+Mapa de ocupação (dia da semana × hora), taxa de cancelamento e mix de serviços,
+calculados com pandas/NumPy sobre os agendamentos em formato colunar
+"""
+
+import datetime
+import logging
+import threading
+from contextlib import nullcontext
+from typing import Dict, Iterable, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+from agents.scheduling_logic import Appointment, BarberScheduler, WEEKDAY_NAMES, scheduler
+from agents.appointment_store import ColumnarAppointmentStore
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Status que ocupam a cadeira (entram no mapa de ocupação e no mix de serviços)
+OCCUPYING_STATUSES = ("confirmed", "completed")
+
+# Ordinal de 1970-01-01 (conversão de dia ordinal para datetime64)
+_UNIX_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+def _frame(days, minutes, statuses, services, barbers) -> pd.DataFrame:
+    """Monta o quadro colunar: dia (ordinal), hora e categorias de status, serviço e barbeiro"""
+    days = np.asarray(days, dtype=np.int64)
+    return pd.DataFrame({
+        "day": days,
+        # datetime.date.fromordinal(1) é uma segunda-feira (weekday 0)
+        "weekday": ((days - 1) % 7).astype(np.int8),
+        "hour": (np.asarray(minutes, dtype=np.int32) // 60).astype(np.int8),
+        "status": statuses,
+        "service": services,
+        "barber_id": barbers
+    })
+
+def appointments_frame(appointments: Iterable[Appointment]) -> pd.DataFrame:
+    """Converte agendamentos em um DataFrame colunar (uma passada pelos objetos)"""
+    rows = [
+        (a.date.toordinal(), a.time.hour * 60 + a.time.minute, a.status, a.service, a.barber_id or "")
+        for a in appointments
+    ]
+    columns = list(zip(*rows)) if rows else [(), (), (), (), ()]
+    return _frame(
+        columns[0], columns[1],
+        pd.Categorical(columns[2]), pd.Categorical(columns[3]), pd.Categorical(columns[4])
+    )
+
+def store_frame(store, lock=None) -> pd.DataFrame:
+    """
+    Exporta um armazenamento de agendamentos como DataFrame colunar
+
+    ColumnarAppointmentStore (inclusive dentro do journal) é lido direto das
+    colunas, sem materializar os registros; os demais, registro a registro.
+    As colunas são copiadas sob lock (o do armazenamento do scheduler): uma visão
+    np.frombuffer impediria o array de crescer (BufferError em novas reservas) e
+    uma leitura no meio de uma inserção veria colunas de tamanhos diferentes.
+    """
+    store = getattr(store, "inner", store)
+    with lock if lock is not None else nullcontext():
+        if not isinstance(store, ColumnarAppointmentStore):
+            return appointments_frame(list(store.values()))
+
+        days = np.array(store._days)
+        minutes = np.array(store._minutes)
+        codes = [np.array(column, dtype=np.int32)
+                 for column in (store._status_codes, store._service_codes, store._barber_codes)]
+        pools = [list(pool._values) for pool in (store._statuses, store._services, store._barbers)]
+
+    return _frame(
+        days, minutes,
+        *(pd.Categorical.from_codes(column, categories=values) for column, values in zip(codes, pools))
+    )
+
+# Colunas do cubo: contagens por (dia, hora, status, serviço, barbeiro), ordenadas por dia
+CUBE_COLUMNS = ("day", "hour", "status", "service", "barber_id", "count")
+
+def _empty_cube() -> Dict[str, np.ndarray]:
+    return {column: np.zeros(0, dtype=np.int64) for column in CUBE_COLUMNS}
+
+def _slice_cube(cube: Dict[str, np.ndarray], first: int, last: int) -> Dict[str, np.ndarray]:
+    """Recorta os dias [first, last] do cubo por busca binária"""
+    lo = np.searchsorted(cube["day"], first, "left")
+    hi = np.searchsorted(cube["day"], last, "right")
+    return {column: values[lo:hi] for column, values in cube.items()}
+
+def _concat_cubes(*cubes: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Junta cubos de dias diferentes, mantendo a ordem por dia"""
+    merged = {column: np.concatenate([cube[column] for cube in cubes]) for column in CUBE_COLUMNS}
+    order = np.argsort(merged["day"], kind="stable")
+    return {column: values[order] for column, values in merged.items()}
+
+class SchedulingAnalytics:
+    """
+    Relatórios gerenciais sobre o histórico de agendamentos
+
+    Dias fechados (anteriores a hoje) são agregados uma única vez em um cubo de
+    contagens (arrays NumPy com códigos inteiros, ordenados por dia); um
+    relatório recorta o cubo por busca binária e agrega o recorte com bincount,
+    somando os dias em aberto (hoje em diante), que são sempre recalculados.
+    Se um dia fechado mudar (ex: baixa tardia como 'completed'), chame
+    invalidate(date).
+    """
+
+    def __init__(self, scheduler: BarberScheduler, include_archived: bool = True):
+        self.scheduler = scheduler
+        self.include_archived = include_archived
+        self._lock = threading.Lock()
+        self._closed_cube = _empty_cube()
+        self._cached_days: Set[int] = set()
+        # Códigos estáveis de status, serviços e barbeiros (valor -> código e código -> valor)
+        self._codes: Dict[str, Dict[str, int]] = {"status": {}, "service": {}, "barber_id": {}}
+        self._names: Dict[str, List[str]] = {"status": [], "service": [], "barber_id": []}
+
+    def _code(self, dimension: str, value: str) -> int:
+        codes = self._codes[dimension]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(self._names[dimension])
+            self._names[dimension].append(value)
+        return code
+
+    def _encode(self, dimension: str, column: pd.Series) -> np.ndarray:
+        """Converte uma coluna categórica nos códigos estáveis (tabela por categoria, sem laço por linha)"""
+        column = column.astype("category")
+        table = np.array([self._code(dimension, str(value)) for value in column.cat.categories] or [0],
+                         dtype=np.int64)
+        return table[column.cat.codes.to_numpy()]
+
+    def _cube(self, frame: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """Agrega o quadro colunar em contagens por (dia, hora, status, serviço, barbeiro)"""
+        if frame.empty:
+            return _empty_cube()
+        keys = np.stack([
+            frame["day"].to_numpy(dtype=np.int64),
+            frame["hour"].to_numpy(dtype=np.int64),
+            self._encode("status", frame["status"]),
+            self._encode("service", frame["service"]),
+            self._encode("barber_id", frame["barber_id"])
+        ], axis=1)
+        # np.unique ordena as linhas: o cubo já sai ordenado por dia
+        unique, counts = np.unique(keys, axis=0, return_counts=True)
+        cube = {column: unique[:, i] for i, column in enumerate(CUBE_COLUMNS[:-1])}
+        cube["count"] = counts.astype(np.int64)
+        return cube
+
+    def _open_store(self):
+        """Armazenamento colunar do scheduler (None se for outro tipo de armazenamento)"""
+        store = getattr(self.scheduler.appointments, "inner", self.scheduler.appointments)
+        return store if isinstance(store, ColumnarAppointmentStore) else None
+
+    def _load_days(self, first: datetime.date, last: datetime.date) -> Dict[str, np.ndarray]:
+        """Agrega os agendamentos (e, se configurado, o arquivo) dos dias entre first e last"""
+        store = self._open_store()
+        if store is not None:
+            frame = store_frame(store, self.scheduler._index_lock)
+            frame = frame[(frame["day"] >= first.toordinal()) & (frame["day"] <= last.toordinal())]
+        else:
+            frame = appointments_frame(self.scheduler.get_appointment_history(first, last))
+        cube = self._cube(frame)
+
+        if self.include_archived:
+            # Import local: agents.archive depende do scheduler
+            from agents.archive import read_archive
+            archived = self._cube(appointments_frame(read_archive(first, last)))
+            if archived["day"].size:
+                cube = _concat_cubes(cube, archived)
+        return cube
+
+    def _closed_days(self, first: int, last: int) -> Dict[str, np.ndarray]:
+        """Recorte do cubo dos dias fechados [first, last], agregando antes os que faltam"""
+        with self._lock:
+            missing = np.setdiff1d(np.arange(first, last + 1), np.fromiter(self._cached_days, dtype=np.int64))
+            if missing.size:
+                loaded = self._load_days(datetime.date.fromordinal(int(missing[0])),
+                                         datetime.date.fromordinal(int(missing[-1])))
+                keep = np.isin(loaded["day"], missing)
+                self._closed_cube = _concat_cubes(
+                    self._closed_cube, {column: values[keep] for column, values in loaded.items()}
+                )
+                self._cached_days.update(missing.tolist())
+                logger.info(f"Analytics: {missing.size} dia(s) fechado(s) agregado(s)")
+
+            return _slice_cube(self._closed_cube, first, last)
+
+    def invalidate(self, date: Optional[datetime.date] = None):
+        """Descarta o cubo de um dia fechado (ou de todos)"""
+        with self._lock:
+            if date is None:
+                self._closed_cube = _empty_cube()
+                self._cached_days.clear()
+                return
+            day = date.toordinal()
+            self._cached_days.discard(day)
+            keep = self._closed_cube["day"] != day
+            self._closed_cube = {column: values[keep] for column, values in self._closed_cube.items()}
+
+    def _range_cube(self, start_date: datetime.date, end_date: datetime.date) -> Dict[str, np.ndarray]:
+        """Cubo de contagens do intervalo: dias fechados do cache + dias em aberto recalculados"""
+        today = datetime.date.today().toordinal()
+        first, last = start_date.toordinal(), end_date.toordinal()
+        parts = []
+        if first < today:
+            parts.append(self._closed_days(first, min(last, today - 1)))
+        if last >= today:
+            parts.append(self._load_days(datetime.date.fromordinal(max(first, today)), end_date))
+        if not parts:
+            return _empty_cube()
+        return _concat_cubes(*parts) if len(parts) > 1 else parts[0]
+
+    def _status_mask(self, cube: Dict[str, np.ndarray], statuses) -> np.ndarray:
+        """Linhas do cubo com um dos status (tabela indexada pelo código)"""
+        table = np.zeros(len(self._names["status"]) + 1, dtype=bool)
+        table[[self._codes["status"][status] for status in statuses if status in self._codes["status"]]] = True
+        return table[cube["status"]]
+
+    @staticmethod
+    def _weekday_occurrences(start_date: datetime.date, end_date: datetime.date) -> np.ndarray:
+        """Quantas vezes cada dia da semana aparece no intervalo"""
+        days = np.arange(start_date.toordinal(), end_date.toordinal() + 1)
+        return np.bincount((days - 1) % 7, minlength=7)
+
+    def occupancy_heatmap(self, start_date: datetime.date, end_date: datetime.date,
+                          barber_id: Optional[str] = None) -> pd.DataFrame:
+        """
+        Média de atendimentos por dia da semana × hora no intervalo
+
+        Returns:
+            pd.DataFrame: linhas = dias da semana (monday..sunday), colunas = horas com atendimento
+        """
+        return self._heatmap(self._range_cube(start_date, end_date), start_date, end_date, barber_id)
+
+    def _heatmap(self, cube: Dict[str, np.ndarray], start_date: datetime.date, end_date: datetime.date,
+                 barber_id: Optional[str] = None) -> pd.DataFrame:
+        mask = self._status_mask(cube, OCCUPYING_STATUSES)
+        if barber_id is not None:
+            mask &= cube["barber_id"] == self._codes["barber_id"].get(barber_id, -1)
+
+        cells = ((cube["day"][mask] - 1) % 7) * 24 + cube["hour"][mask]
+        counts = np.bincount(cells, weights=cube["count"][mask], minlength=7 * 24).astype(float).reshape(7, 24)
+        occurrences = self._weekday_occurrences(start_date, end_date)[:, None]
+        averages = np.divide(counts, occurrences, out=np.zeros_like(counts), where=occurrences > 0)
+
+        heatmap = pd.DataFrame(averages, index=list(WEEKDAY_NAMES), columns=range(24))
+        return heatmap.loc[:, averages.any(axis=0)]
+
+    def cancellation_rate(self, start_date: datetime.date, end_date: datetime.date,
+                          by: Optional[str] = None):
+        """
+        Percentual de agendamentos cancelados no intervalo
+
+        Args:
+            by: None (taxa geral) ou "weekday", "hour", "service", "barber_id", "month"
+
+        Returns:
+            float ou pd.Series com a taxa por grupo
+        """
+        return self._cancellation_rate(self._range_cube(start_date, end_date), by)
+
+    def _cancellation_rate(self, cube: Dict[str, np.ndarray], by: Optional[str] = None):
+        totals = cube["count"]
+        cancelled = np.where(self._status_mask(cube, ("cancelled",)), totals, 0)
+        if by is None:
+            total = totals.sum()
+            return float(cancelled.sum() / total * 100) if total > 0 else 0.0
+
+        if by == "weekday":
+            keys, labels = (cube["day"] - 1) % 7, list(WEEKDAY_NAMES)
+        elif by == "hour":
+            keys, labels = cube["hour"], list(range(24))
+        elif by == "month":
+            months = (cube["day"] - _UNIX_EPOCH_ORDINAL).astype("datetime64[D]").astype("datetime64[M]")
+            unique, keys = np.unique(months, return_inverse=True)
+            labels = [str(month) for month in unique]
+        else:
+            keys, labels = cube[by], self._names[by]
+
+        group_totals = np.bincount(keys, weights=totals, minlength=len(labels))
+        group_cancelled = np.bincount(keys, weights=cancelled, minlength=len(labels))
+        present = group_totals > 0
+        return pd.Series(group_cancelled[present] / group_totals[present] * 100,
+                         index=[label for label, used in zip(labels, present) if used], name="cancellation_rate")
+
+    def service_mix(self, start_date: datetime.date, end_date: datetime.date) -> pd.DataFrame:
+        """Atendimentos por serviço no intervalo e participação percentual"""
+        return self._service_mix(self._range_cube(start_date, end_date))
+
+    def _service_mix(self, cube: Dict[str, np.ndarray]) -> pd.DataFrame:
+        mask = self._status_mask(cube, OCCUPYING_STATUSES)
+        counts = np.bincount(cube["service"][mask], weights=cube["count"][mask],
+                             minlength=len(self._names["service"])).astype(np.int64)
+        mix = pd.DataFrame({"count": counts}, index=self._names["service"][:len(counts)])
+        mix = mix[mix["count"] > 0].sort_values("count", ascending=False)
+        total = mix["count"].sum()
+        mix["share"] = mix["count"] / total * 100 if total > 0 else 0.0
+        return mix
+
+    def report(self, start_date: datetime.date, end_date: datetime.date) -> Dict:
+        """Relatório completo do intervalo (estruturas simples, prontas para JSON)"""
+        cube = self._range_cube(start_date, end_date)
+        heatmap = self._heatmap(cube, start_date, end_date)
+        by_weekday = self._cancellation_rate(cube, by="weekday")
+        mix = self._service_mix(cube)
+        return {
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+            "occupancy_heatmap": {weekday: {int(hour): round(float(value), 2) for hour, value in row.items()}
+                                  for weekday, row in heatmap.round(2).to_dict("index").items()},
+            "cancellation_rate": round(self._cancellation_rate(cube), 2),
+            "cancellation_rate_by_weekday": {weekday: round(float(rate), 2) for weekday, rate in by_weekday.items()},
+            "service_mix": {service: {"count": int(row["count"]), "share": round(float(row["share"]), 2)}
+                            for service, row in mix.to_dict("index").items()}
+        }
+
+# Instância global das análises
+analytics = SchedulingAnalytics(scheduler)
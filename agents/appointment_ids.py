@@ -0,0 +1,89 @@
+"""
+Geração de IDs de Agendamento
+IDs únicos e ordenáveis pela criação: instante (ms) + nó + processo + sequência
+"""
+
+import datetime
+import itertools
+import os
+import time
+from typing import Optional, Tuple
+
+from config.settings import SCHEDULING_CONFIG
+
+ID_PREFIX = "apt_"
+
+# Larguras fixas (hexadecimal) de cada parte: a ordem das strings é a ordem de criação
+_TIMESTAMP_DIGITS = 12
+_NODE_DIGITS = 4
+_PID_DIGITS = 6
+_SEQUENCE_DIGITS = 8
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+_MILLISECOND = datetime.timedelta(milliseconds=1)
+
+def _to_milliseconds(moment: datetime.datetime) -> int:
+    """Converte um datetime local (sem fuso) em milissegundos desde a época"""
+    return (moment - _EPOCH) // _MILLISECOND
+
+class AppointmentIdAllocator:
+    """
+    Gerador de IDs sem lock
+
+    Formato: apt_<ms:12><nó:4><pid:6><sequência:8>, tudo em hexadecimal.
+    - O instante vem do relógio de parede lido uma vez e avançado pelo relógio
+      monotônico, então nunca volta mesmo se o relógio do sistema for ajustado.
+    - A sequência é um itertools.count (next() é atômico), única por processo.
+    - Nó e PID separam processos, inclusive os que compartilham o mesmo nó.
+    """
+
+    def __init__(self, node_id: Optional[int] = None):
+        node_id = SCHEDULING_CONFIG["node_id"] if node_id is None else node_id
+        self._prefix_tail = f"{node_id % 16 ** _NODE_DIGITS:0{_NODE_DIGITS}x}"
+        self._base_wall = _to_milliseconds(datetime.datetime.now())
+        self._base_monotonic = time.monotonic_ns()
+        self._sequence = itertools.count()
+        self._pid = None
+        self._process_tail = ""
+
+    def _process_part(self) -> str:
+        # Recalculado após fork (processos filhos herdam o alocador)
+        pid = os.getpid()
+        if pid != self._pid:
+            self._process_tail = f"{self._prefix_tail}{pid % 16 ** _PID_DIGITS:0{_PID_DIGITS}x}"
+            self._pid = pid
+        return self._process_tail
+
+    def _now_milliseconds(self) -> int:
+        return self._base_wall + (time.monotonic_ns() - self._base_monotonic) // 1_000_000
+
+    def next_id(self) -> str:
+        """Retorna um novo ID, maior que todos os anteriores deste processo"""
+        sequence = next(self._sequence) % 16 ** _SEQUENCE_DIGITS
+        return (f"{ID_PREFIX}{self._now_milliseconds():0{_TIMESTAMP_DIGITS}x}"
+                f"{self._process_part()}{sequence:0{_SEQUENCE_DIGITS}x}")
+
+def appointment_id_range(start: datetime.datetime, end: datetime.datetime) -> Tuple[str, str]:
+    """
+    Retorna os limites [menor, maior) dos IDs criados entre start e end
+
+    Permite varrer por data de criação usando só a ordem dos IDs
+    (ex: WHERE id >= menor AND id < maior). IDs do formato antigo ficam de fora.
+    """
+    return (f"{ID_PREFIX}{_to_milliseconds(start):0{_TIMESTAMP_DIGITS}x}",
+            f"{ID_PREFIX}{_to_milliseconds(end):0{_TIMESTAMP_DIGITS}x}")
+
+def appointment_id_created_at(appointment_id: str) -> Optional[datetime.datetime]:
+    """Retorna o instante de criação gravado no ID (None para IDs do formato antigo)"""
+    body = appointment_id[len(ID_PREFIX):]
+    if "_" in body:
+        # Formato antigo (apt_YYYYmmdd_HHMMSS_xxxx); int() aceitaria os "_"
+        return None
+    try:
+        timestamp = body[:_TIMESTAMP_DIGITS]
+        return _EPOCH + int(timestamp, 16) * _MILLISECOND
+    except ValueError:
+        return None
+
+# Instância global do gerador
+id_allocator = AppointmentIdAllocator()
@@ -0,0 +1,274 @@
+"""
+Armazenamento Colunar de Agendamentos
+Mantém os agendamentos em colunas compactas (array) em vez de um objeto por registro
+"""
+
+import datetime
+from array import array
+from collections.abc import MutableMapping
+from typing import Dict, Iterator, List
+
+from agents.scheduling_logic import Appointment
+
+# Referência para converter datetime em microssegundos (sem fuso, ida e volta exata)
+_EPOCH = datetime.datetime(1970, 1, 1)
+_MICROSECOND = datetime.timedelta(microseconds=1)
+
+class StringPool:
+    """Tabela de strings internadas: cada valor distinto é guardado uma única vez"""
+
+    def __init__(self):
+        self._codes: Dict[str, int] = {}
+        self._values: List[str] = []
+
+    def encode(self, value: str) -> int:
+        """Retorna o código do valor, registrando-o se ainda não existir"""
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self._values)
+            self._codes[value] = code
+            self._values.append(value)
+        return code
+
+    def decode(self, code: int) -> str:
+        """Retorna o valor correspondente a um código"""
+        return self._values[code]
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+class AppointmentView:
+    """Visão leve de um agendamento armazenado em colunas (leitura e escrita direto nas colunas)"""
+
+    __slots__ = ('_store', 'id')
+
+    def __init__(self, store: 'ColumnarAppointmentStore', appointment_id: str):
+        self._store = store
+        self.id = appointment_id
+
+    @property
+    def _row(self) -> int:
+        return self._store._rows[self.id]
+
+    @property
+    def client_name(self) -> str:
+        return self._store._names.decode(self._store._name_codes[self._row])
+
+    @client_name.setter
+    def client_name(self, value: str):
+        self._store._name_codes[self._row] = self._store._names.encode(value)
+
+    @property
+    def client_phone(self) -> str:
+        return self._store._phones.decode(self._store._phone_codes[self._row])
+
+    @client_phone.setter
+    def client_phone(self, value: str):
+        self._store._phone_codes[self._row] = self._store._phones.encode(value)
+
+    @property
+    def date(self) -> datetime.date:
+        return datetime.date.fromordinal(self._store._days[self._row])
+
+    @date.setter
+    def date(self, value: datetime.date):
+        self._store._days[self._row] = value.toordinal()
+
+    @property
+    def time(self) -> datetime.time:
+        minutes = self._store._minutes[self._row]
+        return datetime.time(hour=minutes // 60, minute=minutes % 60)
+
+    @time.setter
+    def time(self, value: datetime.time):
+        self._store._minutes[self._row] = value.hour * 60 + value.minute
+
+    @property
+    def service(self) -> str:
+        return self._store._services.decode(self._store._service_codes[self._row])
+
+    @service.setter
+    def service(self, value: str):
+        self._store._service_codes[self._row] = self._store._services.encode(value)
+
+    @property
+    def status(self) -> str:
+        return self._store._statuses.decode(self._store._status_codes[self._row])
+
+    @status.setter
+    def status(self, value: str):
+        self._store._status_codes[self._row] = self._store._statuses.encode(value)
+
+    @property
+    def created_at(self) -> datetime.datetime:
+        return _EPOCH + self._store._created_at[self._row] * _MICROSECOND
+
+    @created_at.setter
+    def created_at(self, value: datetime.datetime):
+        self._store._created_at[self._row] = (value - _EPOCH) // _MICROSECOND
+
+    @property
+    def updated_at(self) -> datetime.datetime:
+        return _EPOCH + self._store._updated_at[self._row] * _MICROSECOND
+
+    @updated_at.setter
+    def updated_at(self, value: datetime.datetime):
+        self._store._updated_at[self._row] = (value - _EPOCH) // _MICROSECOND
+
+    @property
+    def barber_id(self):
+        # Código 0 é reservado para "sem barbeiro" (registros antigos)
+        return self._store._barbers.decode(self._store._barber_codes[self._row]) or None
+
+    @barber_id.setter
+    def barber_id(self, value):
+        self._store._barber_codes[self._row] = self._store._barbers.encode(value or '')
+
+    def to_appointment(self) -> Appointment:
+        """Materializa a visão em um Appointment comum"""
+        return Appointment(
+            id=self.id,
+            client_name=self.client_name,
+            client_phone=self.client_phone,
+            date=self.date,
+            time=self.time,
+            service=self.service,
+            status=self.status,
+            created_at=self.created_at,
+            updated_at=self.updated_at,
+            barber_id=self.barber_id
+        )
+
+    def __repr__(self) -> str:
+        return (f"AppointmentView(id={self.id!r}, date={self.date}, time={self.time}, "
+                f"status={self.status!r}, barber_id={self.barber_id!r})")
+
+class ColumnarAppointmentStore(MutableMapping):
+    """
+    Armazenamento de agendamentos em colunas compactas
+
+    Pode ser usado no lugar do dict padrão do BarberScheduler:
+        BarberScheduler(store=ColumnarAppointmentStore())
+
+    Datas são guardadas como número do dia (ordinal), horários como minuto do dia
+    e status, serviços, nomes e telefones como códigos de tabelas de strings.
+    """
+
+    def __init__(self):
+        self._rows: Dict[str, int] = {}
+        self._ids: List[str] = []
+
+        self._days = array('l')
+        self._minutes = array('H')
+        self._status_codes = array('B')
+        self._service_codes = array('H')
+        self._phone_codes = array('L')
+        self._name_codes = array('L')
+        self._created_at = array('q')
+        self._updated_at = array('q')
+        self._barber_codes = array('H')
+
+        self._statuses = StringPool()
+        self._services = StringPool()
+        self._phones = StringPool()
+        self._names = StringPool()
+        self._barbers = StringPool()
+        self._barbers.encode('')
+
+    def _columns(self) -> tuple:
+        return (self._days, self._minutes, self._status_codes, self._service_codes,
+                self._phone_codes, self._name_codes, self._created_at, self._updated_at,
+                self._barber_codes)
+
+    def _pools(self) -> tuple:
+        return (self._statuses, self._services, self._phones, self._names, self._barbers)
+
+    def export_columns(self) -> dict:
+        """Exporta o conteúdo em formato compacto (bytes das colunas e tabelas de strings)"""
+        return {
+            "ids": list(self._ids),
+            "columns": [column.tobytes() for column in self._columns()],
+            "pools": [list(pool._values) for pool in self._pools()]
+        }
+
+    @classmethod
+    def from_columns(cls, data: dict) -> 'ColumnarAppointmentStore':
+        """Recria o armazenamento a partir de export_columns (sem converter registro a registro)"""
+        store = cls()
+        store._ids = list(data["ids"])
+        store._rows = {appointment_id: row for row, appointment_id in enumerate(store._ids)}
+        for column, raw in zip(store._columns(), data["columns"]):
+            column.frombytes(raw)
+        for pool, values in zip(store._pools(), data["pools"]):
+            pool._values = list(values)
+            pool._codes = {value: code for code, value in enumerate(pool._values)}
+        return store
+
+    def __getitem__(self, appointment_id: str) -> AppointmentView:
+        if appointment_id not in self._rows:
+            raise KeyError(appointment_id)
+        return AppointmentView(self, appointment_id)
+
+    def __setitem__(self, appointment_id: str, appointment):
+        values = (
+            appointment.date.toordinal(),
+            appointment.time.hour * 60 + appointment.time.minute,
+            self._statuses.encode(appointment.status),
+            self._services.encode(appointment.service),
+            self._phones.encode(appointment.client_phone),
+            self._names.encode(appointment.client_name),
+            (appointment.created_at - _EPOCH) // _MICROSECOND,
+            (appointment.updated_at - _EPOCH) // _MICROSECOND,
+            self._barbers.encode(appointment.barber_id or '')
+        )
+
+        # Colunas primeiro, desfazendo em caso de erro (valor fora do tipo da coluna,
+        # BufferError): _rows, _ids e as colunas nunca ficam desalinhados
+        columns = self._columns()
+        row = self._rows.get(appointment_id)
+        if row is None:
+            appended = 0
+            try:
+                for column, value in zip(columns, values):
+                    column.append(value)
+                    appended += 1
+            except Exception:
+                for column in columns[:appended]:
+                    column.pop()
+                raise
+            self._rows[appointment_id] = len(self._ids)
+            self._ids.append(appointment_id)
+        else:
+            previous = [column[row] for column in columns]
+            try:
+                for column, value in zip(columns, values):
+                    column[row] = value
+            except Exception:
+                for column, value in zip(columns, previous):
+                    column[row] = value
+                raise
+
+    def __delitem__(self, appointment_id: str):
+        row = self._rows.pop(appointment_id)
+        last_row = len(self._ids) - 1
+
+        # Move a última linha para a posição removida (remoção em O(1))
+        if row != last_row:
+            last_id = self._ids[last_row]
+            self._ids[row] = last_id
+            self._rows[last_id] = row
+            for column in self._columns():
+                column[row] = column[last_row]
+
+        self._ids.pop()
+        for column in self._columns():
+            column.pop()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._rows)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, appointment_id) -> bool:
+        return appointment_id in self._rows
@@ -0,0 +1,86 @@
+"""
+Arquivo de Agendamentos Antigos
+Partições removidas pela limpeza são gravadas em arquivos gzip mensais (JSON lines)
+"""
+
+import datetime
+import gzip
+import json
+import logging
+import os
+import zlib
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from config.settings import SCHEDULING_CONFIG
+from agents.scheduling_logic import Appointment
+from agents.journal import appointment_to_row, row_to_appointment
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FILE = "appointments_{year:04d}_{month:02d}.jsonl.gz"
+
+def _archive_path(directory: str, year: int, month: int) -> str:
+    return os.path.join(directory, ARCHIVE_FILE.format(year=year, month=month))
+
+def archive_appointments(appointments: Iterable[Appointment], directory: Optional[str] = None) -> int:
+    """
+    Acrescenta agendamentos aos arquivos do mês de cada um
+
+    Cada chamada grava um novo membro gzip no final do arquivo (o formato permite
+    concatenar membros), então arquivar de novo não reescreve o que já existe.
+    """
+    directory = directory or SCHEDULING_CONFIG["archive_directory"]
+    by_month: Dict[Tuple[int, int], List[str]] = {}
+    for appointment in appointments:
+        line = json.dumps(appointment_to_row(appointment), separators=(",", ":"))
+        by_month.setdefault((appointment.date.year, appointment.date.month), []).append(line)
+
+    os.makedirs(directory, exist_ok=True)
+    for (year, month), lines in by_month.items():
+        with gzip.open(_archive_path(directory, year, month), "at", encoding="utf-8") as archive_file:
+            archive_file.write("\n".join(lines) + "\n")
+
+    archived = sum(len(lines) for lines in by_month.values())
+    logger.info(f"Arquivados {archived} agendamentos em {len(by_month)} arquivo(s) mensal(is)")
+    return archived
+
+def _months(start_date: datetime.date, end_date: datetime.date) -> Iterator[Tuple[int, int]]:
+    year, month = start_date.year, start_date.month
+    while (year, month) <= (end_date.year, end_date.month):
+        yield year, month
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+def read_archive(start_date: Optional[datetime.date] = None,
+                 end_date: Optional[datetime.date] = None,
+                 directory: Optional[str] = None) -> Iterator[Appointment]:
+    """
+    Lê os agendamentos arquivados com data entre start_date e end_date (inclusive)
+
+    Só abre os arquivos dos meses do intervalo. Sem datas, lê todo o arquivo.
+    """
+    directory = directory or SCHEDULING_CONFIG["archive_directory"]
+    if start_date is None or end_date is None:
+        paths = sorted(
+            os.path.join(directory, name) for name in os.listdir(directory)
+            if name.startswith("appointments_") and name.endswith(".jsonl.gz")
+        ) if os.path.isdir(directory) else []
+    else:
+        paths = [_archive_path(directory, year, month) for year, month in _months(start_date, end_date)]
+
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as archive_file:
+                for line in archive_file:
+                    appointment = row_to_appointment(json.loads(line))
+                    if start_date is not None and appointment.date < start_date:
+                        continue
+                    if end_date is not None and appointment.date > end_date:
+                        continue
+                    yield appointment
+        except (EOFError, zlib.error, ValueError) as e:
+            # Último membro incompleto (queda durante a gravação): mantém o que foi lido
+            logger.warning(f"Arquivo {path} truncado: {e}")
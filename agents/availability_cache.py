@@ -0,0 +1,273 @@
+"""
+Cache de Disponibilidade
+Guarda por data os horários calculados pelo scheduler, com LRU e invalidação por data
+"""
+
+import datetime
+import json
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config.settings import CACHE_CONFIG
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def dumps_slots(slots: List) -> bytes:
+    """Serializa uma lista de TimeSlot em JSON compacto: [["HH:MM:SS", disponível, id], ...]"""
+    return json.dumps(
+        [[slot.time.isoformat(), slot.available, slot.appointment_id] for slot in slots],
+        separators=(",", ":")
+    ).encode()
+
+def loads_slots(raw: bytes) -> List:
+    """Lê uma lista gravada por dumps_slots (só dados: nada é executado)"""
+    # Import local: agents.scheduling_logic depende deste módulo
+    from agents.scheduling_logic import TimeSlot
+    return [
+        TimeSlot(time=datetime.time.fromisoformat(slot_time), available=available, appointment_id=appointment_id)
+        for slot_time, available, appointment_id in json.loads(raw)
+    ]
+
+class AvailabilityCache(ABC):
+    """
+    Interface dos backends de cache
+
+    Cada entrada pertence a uma data; invalidate(date) descarta todas as entradas
+    da data. Uma geração por data impede que um valor calculado antes de uma
+    invalidação seja gravado depois dela.
+    """
+
+    def __init__(self):
+        self._counters_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _count(self, counter: str, amount: int = 1):
+        with self._counters_lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    @abstractmethod
+    def get_or_compute(self, date: datetime.date, key: str, compute: Callable[[], Any]) -> Any:
+        """Retorna o valor em cache ou calcula, grava e retorna"""
+
+    @abstractmethod
+    def invalidate(self, date: datetime.date):
+        """Descarta todas as entradas de uma data"""
+
+    @abstractmethod
+    def clear(self):
+        """Descarta todas as entradas"""
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna os contadores de acertos, falhas, remoções por LRU e invalidações"""
+        with self._counters_lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": (self.hits / lookups * 100) if lookups > 0 else 0
+            }
+
+class InProcessAvailabilityCache(AvailabilityCache):
+    """Cache em memória do processo (OrderedDict como LRU, com TTL de segurança)"""
+
+    def __init__(self, max_size: Optional[int] = None, ttl: Optional[int] = None):
+        super().__init__()
+        self.max_size = max_size or CACHE_CONFIG["max_size"]
+        self.ttl = ttl or CACHE_CONFIG["ttl"]
+        self._lock = threading.Lock()
+        # (data, chave) -> (expira_em, valor), do menos para o mais recente
+        self._entries: OrderedDict = OrderedDict()
+        self._keys_by_date: Dict[datetime.date, set] = {}
+        self._generations: Dict[datetime.date, int] = {}
+        # Incrementada por clear(): invalida os cálculos em andamento de todas as datas
+        self._epoch = 0
+
+    def _generation(self, date: datetime.date) -> Tuple[int, int]:
+        return self._epoch, self._generations.get(date, 0)
+
+    def get_or_compute(self, date: datetime.date, key: str, compute: Callable[[], Any]) -> Any:
+        entry_key = (date, key)
+        with self._lock:
+            entry = self._entries.get(entry_key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(entry_key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation(date)
+
+        value = compute()
+
+        with self._lock:
+            # Se a data foi invalidada durante o cálculo, o valor já está velho
+            if self._generation(date) == generation:
+                self._entries[entry_key] = (time.monotonic() + self.ttl, value)
+                self._entries.move_to_end(entry_key)
+                self._keys_by_date.setdefault(date, set()).add(key)
+                while len(self._entries) > self.max_size:
+                    (old_date, old_key), _ = self._entries.popitem(last=False)
+                    self._discard_key(old_date, old_key)
+                    self.evictions += 1
+        return value
+
+    def _discard_key(self, date: datetime.date, key: str):
+        keys = self._keys_by_date.get(date)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_date[date]
+
+    def invalidate(self, date: datetime.date):
+        with self._lock:
+            self._generations[date] = self._generations.get(date, 0) + 1
+            for key in self._keys_by_date.pop(date, ()):
+                self._entries.pop((date, key), None)
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._generations.clear()
+            self._entries.clear()
+            self._keys_by_date.clear()
+            self.invalidations += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna os contadores (protegidos pelo _lock deste backend) e o tamanho atual"""
+        with self._lock:
+            stats = super().get_stats()
+            stats["size"] = len(self._entries)
+            return stats
+
+class RedisAvailabilityCache(AvailabilityCache):
+    """
+    Cache compartilhado entre processos via Redis
+
+    - availability:<data>: hash com as entradas da data (EXPIRE = ttl)
+    - availability:gen:<data>: geração da data, incrementada a cada invalidação
+    - availability:lru: sorted set com o último acesso de cada data; acima de
+      max_size datas, as menos usadas são removidas
+
+    A leitura (entrada + geração + acesso no LRU) é um único pipeline. A gravação
+    usa WATCH na geração: se outro processo invalidou a data, não grava. Os
+    horários são gravados em JSON (dumps_slots), nunca com pickle: o conteúdo do
+    Redis compartilhado não é executado ao ser lido.
+    Os contadores de get_stats são deste processo.
+    """
+
+    PREFIX = "availability"
+
+    def __init__(self, redis_url: Optional[str] = None, max_size: Optional[int] = None,
+                 ttl: Optional[int] = None, client=None, serializer: Optional[Tuple[Callable, Callable]] = None):
+        super().__init__()
+        import redis
+
+        self.client = client if client is not None else redis.Redis.from_url(redis_url or CACHE_CONFIG["redis_url"])
+        self._watch_error = redis.WatchError
+        self.max_size = max_size or CACHE_CONFIG["max_size"]
+        self.ttl = ttl or CACHE_CONFIG["ttl"]
+        self.dumps, self.loads = serializer or (dumps_slots, loads_slots)
+
+    def _data_key(self, date: datetime.date) -> str:
+        return f"{self.PREFIX}:{date.isoformat()}"
+
+    def _generation_key(self, date: datetime.date) -> str:
+        return f"{self.PREFIX}:gen:{date.isoformat()}"
+
+    @property
+    def _lru_key(self) -> str:
+        return f"{self.PREFIX}:lru"
+
+    def get_or_compute(self, date: datetime.date, key: str, compute: Callable[[], Any]) -> Any:
+        data_key = self._data_key(date)
+        generation_key = self._generation_key(date)
+
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hget(data_key, key)
+        pipe.get(generation_key)
+        pipe.zadd(self._lru_key, {date.isoformat(): time.time()})
+        cached, generation, _ = pipe.execute()
+
+        if cached is not None:
+            self._count("hits")
+            return self.loads(cached)
+        self._count("misses")
+
+        value = compute()
+        self._store(date, key, value, generation)
+        return value
+
+    def _store(self, date: datetime.date, key: str, value: Any, generation):
+        data_key = self._data_key(date)
+        generation_key = self._generation_key(date)
+        try:
+            with self.client.pipeline() as pipe:
+                pipe.watch(generation_key)
+                if pipe.get(generation_key) != generation:
+                    # Invalidada depois da leitura: o valor calculado já está velho
+                    return
+                pipe.multi()
+                pipe.hset(data_key, key, self.dumps(value))
+                pipe.expire(data_key, self.ttl)
+                pipe.zcard(self._lru_key)
+                _, _, cached_dates = pipe.execute()
+        except self._watch_error:
+            return
+
+        self._evict_least_recent(cached_dates)
+
+    def _evict_least_recent(self, cached_dates: int):
+        excess = cached_dates - self.max_size
+        if excess <= 0:
+            return
+        evicted = self.client.zpopmin(self._lru_key, excess)
+        if evicted:
+            self.client.delete(*[
+                f"{self.PREFIX}:{member.decode() if isinstance(member, bytes) else member}"
+                for member, _ in evicted
+            ])
+            self._count("evictions", len(evicted))
+
+    def invalidate(self, date: datetime.date):
+        pipe = self.client.pipeline()
+        pipe.incr(self._generation_key(date))
+        pipe.expire(self._generation_key(date), self.ttl * 2)
+        pipe.delete(self._data_key(date))
+        pipe.execute()
+        self._count("invalidations")
+
+    def clear(self):
+        members = self.client.zrange(self._lru_key, 0, -1)
+        pipe = self.client.pipeline()
+        for member in members:
+            day = member.decode() if isinstance(member, bytes) else member
+            pipe.incr(f"{self.PREFIX}:gen:{day}")
+            pipe.expire(f"{self.PREFIX}:gen:{day}", self.ttl * 2)
+            pipe.delete(f"{self.PREFIX}:{day}")
+        pipe.delete(self._lru_key)
+        pipe.execute()
+        self._count("invalidations")
+
+def create_availability_cache(backend: Optional[str] = None) -> Optional[AvailabilityCache]:
+    """Cria o cache configurado em CACHE_CONFIG["backend"] ("memory", "redis" ou "none")"""
+    backend = backend or CACHE_CONFIG["backend"]
+    if backend == "memory":
+        return InProcessAvailabilityCache()
+    if backend == "redis":
+        try:
+            return RedisAvailabilityCache()
+        except ImportError:
+            logger.error("Pacote redis não instalado; usando cache em memória")
+            return InProcessAvailabilityCache()
+    return None
@@ -5,7 +5,8 @@ Integração com SuperAgentes e Make
 
 import json
 import logging
-import re
+import threading
+from collections import Counter
 from typing import Dict, List, Optional, Tuple, Any
 from datetime import datetime, date, time, timedelta
 from dataclasses import asdict
@@ -16,8 +17,12 @@ from config.prompts import (
     APPOINTMENT_CANCELLATION_PROMPT, APPOINTMENT_RESCHEDULING_PROMPT,
     CONFIRMATION_PROMPT, PERSONALITY_PROMPT, ERROR_HANDLING_PROMPT, CLOSING_PROMPT
 )
-from agents.scheduling_logic import scheduler, Appointment
+from agents.scheduling_logic import scheduler, Appointment, WaitlistOffer
 from agents.whatsapp_handler import whatsapp_handler
+from agents.outbound_dispatcher import outbound_dispatcher
+from agents.conversation_store import create_conversation_store
+from agents.intent_router import intent_router
+from agents.datetime_parser import parse_date, parse_time
 
 # Configuração de logging
 logging.basicConfig(level=logging.INFO)
@@ -32,9 +37,20 @@ class BarberAgent:
     def __init__(self):
         self.scheduler = scheduler
         self.whatsapp = whatsapp_handler
-        self.conversation_context = {}
+        # Envios saem pela fila: process_message não espera a API do WhatsApp
+        self.outbound = outbound_dispatcher
+        # Ofertas da lista de espera também saem pela fila, sem segurar o cancelamento
+        self.scheduler.waitlist_notifier = self._send_waitlist_offer
         self.pending_appointments = {}
         
+        # Contadores incrementais de conversas por estado
+        self._stats_lock = threading.Lock()
+        self._state_counts: Counter = Counter()
+        
+        # Contextos limitados por inatividade (e quantidade, em memória) ou no Redis,
+        # compartilhados entre processos (CONVERSATION_CONFIG["backend"])
+        self.conversation_context = create_conversation_store(on_evict=self._on_context_removed)
+        
         # Estados da conversa
         self.conversation_states = {
             'idle': self._handle_idle_state,
@@ -45,7 +61,9 @@ class BarberAgent:
             'waiting_for_confirmation': self._handle_confirmation_input,
             'waiting_for_cancellation_confirmation': self._handle_cancellation_confirmation,
             'waiting_for_reschedule_date': self._handle_reschedule_date_input,
-            'waiting_for_reschedule_time': self._handle_reschedule_time_input
+            'waiting_for_reschedule_time': self._handle_reschedule_time_input,
+            'waiting_for_waitlist_confirmation': self._handle_waitlist_confirmation,
+            'waiting_for_waitlist_name': self._handle_waitlist_name_input
         }
     
     def process_message(self, message: str, phone_number: str, 
@@ -62,9 +80,11 @@ class BarberAgent:
             Tuple[str, Dict]: (resposta, contexto atualizado)
         """
         try:
-            # Inicializa contexto se necessário
-            if conversation_id not in self.conversation_context:
-                self.conversation_context[conversation_id] = {
+            # Inicializa contexto se necessário (ou se a conversa expirou)
+            context = self.conversation_context.get(conversation_id)
+            new_conversation = context is None
+            if new_conversation:
+                context = {
                     'state': 'idle',
                     'phone_number': phone_number,
                     'current_appointment': None,
@@ -72,58 +92,82 @@ class BarberAgent:
                     'last_interaction': datetime.now()
                 }
             
-            context = self.conversation_context[conversation_id]
             context['last_interaction'] = datetime.now()
             
             # Processa a mensagem baseado no estado atual
             current_state = context['state']
             
-            if current_state in self.conversation_states:
-                response, updated_context = self.conversation_states[current_state](
-                    message, context, conversation_id
-                )
-            else:
-                response, updated_context = self._handle_unknown_state(message, context)
-            
-            # Atualiza o contexto
-            self.conversation_context[conversation_id].update(updated_context)
+            try:
+                # Ofertas vencidas da lista de espera passam para o próximo cliente
+                self.scheduler.expire_waitlist_offers()
+                
+                if current_state in self.conversation_states:
+                    response, updated_context = self.conversation_states[current_state](
+                        message, context, conversation_id
+                    )
+                else:
+                    response, updated_context = self._handle_unknown_state(message, context)
+                
+                # Atualiza o contexto
+                context.update(updated_context)
+            finally:
+                self.conversation_context.save(conversation_id, context)
+                self._track_state_change(None if new_conversation else current_state, context.get('state'))
             
-            # Envia resposta via WhatsApp
-            self.whatsapp.send_message(phone_number, response)
+            # Envia resposta via WhatsApp (enfileirada; retorna sem esperar o envio)
+            self.outbound.dispatch(phone_number, self.whatsapp.send_message, response)
             
             return response, updated_context
             
         except Exception as e:
             logger.error(f"Erro ao processar mensagem: {str(e)}")
             error_response = "Desculpe, ocorreu um erro inesperado. Pode tentar novamente?"
-            self.whatsapp.send_message(phone_number, error_response)
+            self.outbound.dispatch(phone_number, self.whatsapp.send_message, error_response)
             return error_response, {}
     
+    def _send_waitlist_offer(self, offer: WaitlistOffer):
+        """Notificador da lista de espera do scheduler: enfileira a oferta para o cliente"""
+        self.outbound.dispatch(offer.client_phone, self.whatsapp.send_waitlist_offer, offer)
+    
     def _handle_idle_state(self, message: str, context: Dict, 
                           conversation_id: str) -> Tuple[str, Dict]:
         """Processa mensagem no estado ocioso"""
-        message_lower = message.lower()
+        # Resposta a uma oferta da lista de espera
+        offer = self.scheduler.get_waitlist_offer(context['phone_number'])
+        if offer is not None:
+            offer_intent = intent_router.route('waitlist_offer', message)
+            if offer_intent == 'decline':
+                _, message_text = self.scheduler.decline_waitlist_offer(offer.entry_id)
+                return f"👍 {message_text}", context
+            if offer_intent == 'accept':
+                success, message_text, appointment_id = self.scheduler.accept_waitlist_offer(offer.entry_id)
+                if not success:
+                    return f"❌ {message_text}", context
+                context['current_appointment'] = appointment_id
+                return (f"🎉 Agendamento confirmado para {offer.date.strftime('%d/%m/%Y')} "
+                        f"às {offer.time.strftime('%H:%M')}!"), context
         
         # Identifica intenção do usuário
-        if any(word in message_lower for word in ['agendar', 'marcar', 'horário', 'corte']):
+        intent = intent_router.route('idle', message)
+        if intent == 'schedule':
             context['state'] = 'waiting_for_date'
             return "📅 Perfeito! Para qual data você gostaria de agendar?", context
         
-        elif any(word in message_lower for word in ['verificar', 'disponível', 'horários', 'livre']):
+        elif intent == 'check_availability':
             context['state'] = 'waiting_for_date'
             context['intent'] = 'check_availability'
             return "📅 Claro! Para qual data você gostaria de verificar a disponibilidade?", context
         
-        elif any(word in message_lower for word in ['cancelar', 'cancelamento']):
+        elif intent == 'cancel':
             context['state'] = 'waiting_for_cancellation_confirmation'
             return "❌ Entendo que quer cancelar. Qual é o seu número de telefone para eu localizar o agendamento?", context
         
-        elif any(word in message_lower for word in ['remarcar', 'mudar', 'alterar']):
+        elif intent == 'reschedule':
             context['state'] = 'waiting_for_cancellation_confirmation'
             context['intent'] = 'reschedule'
             return "🔄 Entendo que quer remarcar. Qual é o seu número de telefone para eu localizar o agendamento?", context
         
-        elif any(word in message_lower for word in ['ajuda', 'help', 'o que pode fazer']):
+        elif intent == 'help':
             return MESSAGE_TEMPLATES["help"], context
         
         else:
@@ -151,7 +195,12 @@ class BarberAgent:
                 available_slots = self.scheduler.get_available_slots(parsed_date)
                 
                 if not available_slots:
-                    return "😔 Não há horários disponíveis para esta data. Gostaria de ver outras datas?", context
+                    if self.scheduler.is_working_day(parsed_date):
+                        context['state'] = 'waiting_for_waitlist_confirmation'
+                        return (self._format_no_availability(parsed_date) + 
+                                "\n\n⏳ Se preferir, posso colocar você na lista de espera deste dia "
+                                "e aviso se um horário vagar. Responda 'sim' ou informe outra data."), context
+                    return self._format_no_availability(parsed_date), context
                 
                 # Envia horários disponíveis
                 return self._format_available_times(available_slots, parsed_date), context
@@ -230,9 +279,9 @@ Responda com:
     def _handle_confirmation_input(self, message: str, context: Dict, 
                                  conversation_id: str) -> Tuple[str, Dict]:
         """Processa confirmação do agendamento"""
-        message_lower = message.lower()
+        intent = intent_router.route('confirmation', message)
         
-        if any(word in message_lower for word in ['sim', 'confirmar', '✅', 'confirmo']):
+        if intent == 'confirm':
             # Cria o agendamento
             success, message_text, appointment_id = self.scheduler.create_appointment(
                 client_name=context['pending_data']['name'],
@@ -242,17 +291,19 @@ Responda com:
             )
             
             if success:
+                # Data e horário da confirmação, antes de limpar os dados pendentes
+                date_str = context['pending_data']['date'].strftime("%d/%m/%Y")
+                time_str = context['pending_data']['time'].strftime("%H:%M")
+                
                 # Limpa dados pendentes e volta ao estado ocioso
                 context['state'] = 'idle'
                 context['pending_data'] = {}
                 context['current_appointment'] = appointment_id
                 
                 # Envia confirmação via WhatsApp
-                date_str = context['pending_data']['date'].strftime("%d/%m/%Y")
-                time_str = context['pending_data']['time'].strftime("%H:%M")
-                
-                self.whatsapp.send_confirmation_message(
+                self.outbound.dispatch(
                     context['phone_number'],
+                    self.whatsapp.send_confirmation_message,
                     date_str,
                     time_str
                 )
@@ -261,12 +312,12 @@ Responda com:
             else:
                 return f"❌ {message_text}", context
         
-        elif any(word in message_lower for word in ['não', 'cancelar', '❌']):
+        elif intent == 'deny':
             context['state'] = 'idle'
             context['pending_data'] = {}
             return "😔 Agendamento cancelado. Se precisar de mais alguma coisa, é só chamar!", context
         
-        elif any(word in message_lower for word in ['alterar', '🔄']):
+        elif intent == 'change':
             context['state'] = 'waiting_for_date'
             context['pending_data'] = {}
             return "🔄 Sem problemas! Vamos começar novamente. Para qual data você gostaria de agendar?", context
@@ -319,6 +370,46 @@ Responda com:
         
         return appointments_text, context
     
+    def _handle_waitlist_confirmation(self, message: str, context: Dict, 
+                                      conversation_id: str) -> Tuple[str, Dict]:
+        """Processa a resposta ao convite para a lista de espera"""
+        intent = intent_router.route('waitlist_invite', message)
+        if intent == 'decline':
+            context['state'] = 'idle'
+            context['pending_data'] = {}
+            return "👍 Tudo bem, não vou colocar você na lista de espera. Se precisar de mais alguma coisa, é só chamar.", context
+        
+        if intent == 'accept':
+            context['state'] = 'waiting_for_waitlist_name'
+            return "👤 Combinado! Qual é o seu nome completo?", context
+        
+        if self._parse_date_input(message):
+            # Cliente preferiu outra data
+            context['state'] = 'waiting_for_date'
+            return self._handle_date_input(message, context, conversation_id)
+        
+        context['state'] = 'idle'
+        context['pending_data'] = {}
+        return "👍 Tudo bem! Se precisar de mais alguma coisa, é só chamar.", context
+    
+    def _handle_waitlist_name_input(self, message: str, context: Dict, 
+                                    conversation_id: str) -> Tuple[str, Dict]:
+        """Processa o nome e coloca o cliente na lista de espera da data escolhida"""
+        if len(message.strip()) < 2:
+            return "👤 O nome deve ter pelo menos 2 caracteres. Pode informar novamente?", context
+        
+        success, message_text, _ = self.scheduler.join_waitlist(
+            client_name=message.strip(),
+            client_phone=context['phone_number'],
+            date=context['pending_data']['date']
+        )
+        
+        context['state'] = 'idle'
+        context['pending_data'] = {}
+        if not success:
+            return f"❌ {message_text}", context
+        return f"⏳ {message_text}", context
+    
     def _handle_reschedule_date_input(self, message: str, context: Dict, 
                                     conversation_id: str) -> Tuple[str, Dict]:
         """Processa nova data para remarcação"""
@@ -334,7 +425,7 @@ Responda com:
         available_slots = self.scheduler.get_available_slots(parsed_date)
         
         if not available_slots:
-            return "😔 Não há horários disponíveis para esta data. Gostaria de ver outras datas?", context
+            return self._format_no_availability(parsed_date), context
         
         return self._format_available_times(available_slots, parsed_date, "remarcação"), context
     
@@ -366,8 +457,9 @@ Responda com:
             new_date_str = new_date.strftime("%d/%m/%Y")
             new_time_str = parsed_time.strftime("%H:%M")
             
-            self.whatsapp.send_reschedule_confirmation(
+            self.outbound.dispatch(
                 context['phone_number'],
+                self.whatsapp.send_reschedule_confirmation,
                 old_date_str,
                 old_time_str,
                 new_date_str,
@@ -384,7 +476,7 @@ Responda com:
         
         if not available_slots:
             context['state'] = 'idle'
-            return "😔 Não há horários disponíveis para esta data. Gostaria de ver outras datas?", context
+            return self._format_no_availability(check_date), context
         
         # Formata horários disponíveis
         response = self._format_available_times(available_slots, check_date)
@@ -420,6 +512,21 @@ Responda com:
         
         return response
     
+    def _format_no_availability(self, date_obj: date) -> str:
+        """Formata resposta de data sem horários, sugerindo as próximas datas livres"""
+        response = "😔 Não há horários disponíveis para esta data."
+        
+        # Busca as próximas datas com horários livres em uma única passada
+        alternative_dates = self.scheduler.get_days_with_availability(
+            start_date=date_obj + timedelta(days=1), limit=3
+        )
+        
+        if not alternative_dates:
+            return response + " Gostaria de ver outras datas?"
+        
+        dates_text = ", ".join(alt.strftime("%d/%m/%Y") for alt in alternative_dates)
+        return response + f" Próximas datas com horários livres: {dates_text}."
+    
     def _handle_unknown_state(self, message: str, context: Dict) -> Tuple[str, Dict]:
         """Processa mensagem em estado desconhecido"""
         logger.warning(f"Estado desconhecido: {context.get('state')}")
@@ -432,56 +539,11 @@ Responda com:
     
     def _parse_date_input(self, message: str) -> Optional[date]:
         """Extrai data da mensagem do usuário"""
-        message_lower = message.lower().strip()
-        
-        # Casos especiais
-        if message_lower in ['hoje', 'agora']:
-            return date.today()
-        elif message_lower == 'amanhã':
-            return date.today() + timedelta(days=1)
-        elif message_lower == 'depois de amanhã':
-            return date.today() + timedelta(days=2)
-        
-        # Padrões de data
-        patterns = [
-            r'(\d{1,2})/(\d{1,2})/(\d{4})',  # DD/MM/AAAA
-            r'(\d{1,2})-(\d{1,2})-(\d{4})',  # DD-MM-AAAA
-            r'(\d{1,2})\.(\d{1,2})\.(\d{4})',  # DD.MM.AAAA
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, message)
-            if match:
-                day, month, year = map(int, match.groups())
-                try:
-                    return date(year, month, day)
-                except ValueError:
-                    continue
-        
-        return None
+        return parse_date(message)
     
     def _parse_time_input(self, message: str) -> Optional[time]:
         """Extrai horário da mensagem do usuário"""
-        message_clean = message.strip()
-        
-        # Padrões de horário
-        patterns = [
-            r'(\d{1,2}):(\d{2})',  # HH:MM
-            r'(\d{1,2})h(\d{2})?',  # HHh ou HHhMM
-            r'(\d{1,2})\.(\d{2})',  # HH.MM
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, message_clean)
-            if match:
-                hour = int(match.group(1))
-                minute = int(match.group(2)) if match.group(2) else 0
-                
-                # Validações básicas
-                if 0 <= hour <= 23 and 0 <= minute <= 59:
-                    return time(hour, minute)
-        
-        return None
+        return parse_time(message)
     
     def send_reminder_notifications(self):
         """Envia lembretes para agendamentos próximos"""
@@ -499,29 +561,50 @@ Responda com:
                     date_str = appointment.date.strftime("%d/%m/%Y")
                     time_str = appointment.time.strftime("%H:%M")
                     
-                    self.whatsapp.send_reminder_message(
+                    self.outbound.dispatch(
                         appointment.client_phone,
+                        self.whatsapp.send_reminder_message,
                         date_str,
                         time_str
                     )
                     
-                    logger.info(f"Lembrete enviado para {appointment.client_name} - {date_str} {time_str}")
+                    logger.info(f"Lembrete enfileirado para {appointment.client_name} - {date_str} {time_str}")
         
         except Exception as e:
             logger.error(f"Erro ao enviar lembretes: {str(e)}")
     
+    def _track_state_change(self, old_state: Optional[str], new_state: Optional[str]):
+        """Atualiza os contadores de conversas quando o estado muda"""
+        if old_state == new_state:
+            return
+        
+        with self._stats_lock:
+            if old_state is not None:
+                self._state_counts[old_state] -= 1
+            if new_state is not None:
+                self._state_counts[new_state] += 1
+    
+    def _on_context_removed(self, conversation_id: str, context: Dict, reason: str):
+        """Desconta dos contadores a conversa expirada ou removida pelo limite de entradas"""
+        self._track_state_change(context.get('state'), None)
+    
     def get_conversation_stats(self) -> Dict:
         """Retorna estatísticas das conversas"""
-        total_conversations = len(self.conversation_context)
-        active_conversations = len([
-            conv for conv in self.conversation_context.values()
-            if conv['state'] != 'idle'
-        ])
+        if self.conversation_context.shared:
+            # Contagem de todos os processos que compartilham o Redis
+            state_counts = Counter(self.conversation_context.state_counts())
+        else:
+            with self._stats_lock:
+                state_counts = self._state_counts.copy()
+        total_conversations = sum(state_counts.values())
+        active_conversations = total_conversations - state_counts['idle']
         
         return {
             'total_conversations': total_conversations,
             'active_conversations': active_conversations,
-            'idle_conversations': total_conversations - active_conversations
+            'idle_conversations': total_conversations - active_conversations,
+            'context_store': self.conversation_context.get_stats(),
+            'outbound': self.outbound.get_stats()
         }
 
 # Instância global do agente
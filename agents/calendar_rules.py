@@ -0,0 +1,142 @@
+"""
+Calendário de Exceções
+Regras de feriados, horários especiais e folgas/férias de barbeiros que sobrepõem
+o horário semanal (working_hours)
+"""
+
+import datetime
+import logging
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+WEEKDAY_NUMBERS = {
+    "monday": 0, "tuesday": 1, "wednesday": 2, "thursday": 3,
+    "friday": 4, "saturday": 5, "sunday": 6
+}
+
+@dataclass(frozen=True)
+class CalendarRule:
+    """
+    Regra do calendário de exceções
+
+    Datas cobertas: uma data ("date"), um período ("start"/"end"), todo ano no
+    mesmo dia ("month_day": "MM-DD") ou toda semana ("weekday"); "month_day" e
+    "weekday" podem ser limitados por um período. Efeito: fechar ("closed") ou
+    trocar o horário ("hours": {"start", "end"}); com "barber_id", a regra vale
+    só para o barbeiro (folga ou férias, somente "closed").
+    """
+    closed: bool
+    hours: Optional[Tuple[str, str]]
+    barber_id: Optional[str]
+    first_date: Optional[datetime.date]
+    last_date: Optional[datetime.date]
+    month_day: Optional[Tuple[int, int]]
+    weekday: Optional[int]
+    reason: str
+    # Regras mais específicas são aplicadas depois (e prevalecem):
+    # recorrentes < períodos < datas únicas
+    priority: int
+
+    def matches(self, date: datetime.date) -> bool:
+        """Verifica se a regra vale para a data"""
+        if self.first_date is not None and not self.first_date <= date <= self.last_date:
+            return False
+        if self.month_day is not None and (date.month, date.day) != self.month_day:
+            return False
+        if self.weekday is not None and date.weekday() != self.weekday:
+            return False
+        return True
+
+    def dates_between(self, first: datetime.date, last: datetime.date) -> Iterator[datetime.date]:
+        """Gera as datas cobertas pela regra entre first e last, sem testar dia a dia"""
+        if self.first_date is not None:
+            first = max(first, self.first_date)
+            last = min(last, self.last_date)
+        if first > last:
+            return
+
+        if self.month_day is not None:
+            month, day = self.month_day
+            for year in range(first.year, last.year + 1):
+                try:
+                    date = datetime.date(year, month, day)
+                except ValueError:
+                    # 29/02 em ano não bissexto
+                    continue
+                if first <= date <= last and self.matches(date):
+                    yield date
+            return
+
+        date = first
+        step = 1
+        if self.weekday is not None:
+            date += datetime.timedelta(days=(self.weekday - first.weekday()) % 7)
+            step = 7
+        while date <= last:
+            yield date
+            date += datetime.timedelta(days=step)
+
+def _parse_date(value: str) -> datetime.date:
+    return datetime.datetime.strptime(value, "%Y-%m-%d").date()
+
+def parse_calendar_rule(entry: Dict) -> CalendarRule:
+    """Converte uma entrada da configuração em regra (ValueError se for inválida)"""
+    hours = entry.get("hours")
+    closed = bool(entry.get("closed", hours is None))
+    if hours is not None:
+        # Valida o formato já na carga
+        start = datetime.datetime.strptime(hours["start"], "%H:%M").time()
+        end = datetime.datetime.strptime(hours["end"], "%H:%M").time()
+        if start >= end:
+            raise ValueError("o horário especial precisa terminar depois de começar")
+        hours = (hours["start"], hours["end"])
+    elif not closed:
+        raise ValueError("regras que não fecham o dia precisam de hours")
+    if entry.get("barber_id") and not closed:
+        raise ValueError("regras de barbeiro só podem fechar o dia (folga ou férias)")
+
+    first_date = last_date = None
+    if "date" in entry:
+        first_date = last_date = _parse_date(entry["date"])
+        priority = 2
+    elif "start" in entry or "end" in entry:
+        first_date = _parse_date(entry["start"]) if "start" in entry else datetime.date.min
+        last_date = _parse_date(entry["end"]) if "end" in entry else datetime.date.max
+        priority = 1
+    else:
+        priority = 0
+
+    month_day = None
+    if "month_day" in entry:
+        month, day = (int(part) for part in entry["month_day"].split("-"))
+        month_day = (month, day)
+    weekday = WEEKDAY_NUMBERS[entry["weekday"]] if "weekday" in entry else None
+    if first_date is None and month_day is None and weekday is None:
+        raise ValueError("a regra precisa de date, start/end, month_day ou weekday")
+
+    return CalendarRule(
+        closed=closed,
+        hours=hours,
+        barber_id=entry.get("barber_id"),
+        first_date=first_date,
+        last_date=last_date,
+        month_day=month_day,
+        weekday=weekday,
+        reason=entry.get("reason", ""),
+        priority=priority
+    )
+
+def parse_calendar_rules(entries: List[Dict]) -> List[CalendarRule]:
+    """Converte as entradas da configuração, ignorando (com log) as inválidas, em ordem de aplicação"""
+    rules = []
+    for entry in entries:
+        try:
+            rules.append(parse_calendar_rule(entry))
+        except (KeyError, TypeError, ValueError) as e:
+            logger.error(f"Regra de calendário inválida ignorada ({entry}): {e}")
+    # sort é estável: entre regras de mesma prioridade, vale a ordem da configuração
+    return sorted(rules, key=lambda rule: rule.priority)
@@ -0,0 +1,369 @@
+"""
+Armazenamento de Contextos de Conversa
+Contextos do BarberAgent com expiração por inatividade: em memória (com limite de
+entradas LRU) ou no Redis, compartilhados entre processos
+"""
+
+import datetime
+import itertools
+import json
+import logging
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from collections.abc import MutableMapping
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from config.settings import CONVERSATION_CONFIG, CACHE_CONFIG
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Chamado com (conversation_id, contexto, motivo) para cada contexto removido pelo
+# armazenamento; motivo é "expired" (inatividade) ou "evicted" (limite de entradas)
+EvictionCallback = Callable[[str, Dict, str], None]
+
+def _deep_size(value: Any) -> int:
+    """Tamanho aproximado em bytes de um valor e do que ele contém (dicts, listas, tuplas)"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_deep_size(key) + _deep_size(item) for key, item in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(_deep_size(item) for item in value)
+    return size
+
+class ConversationContextStore(MutableMapping):
+    """
+    Contextos de conversa em memória, limitados por inatividade e por quantidade
+
+    O contexto devolvido é o próprio objeto armazenado; save() só renova o acesso.
+    O OrderedDict fica na ordem do último acesso. Como o prazo de inatividade é
+    o mesmo para todas as conversas, essa também é a ordem de expiração: as
+    vencidas estão sempre no início e são removidas em O(1) cada, a cada
+    operação, sem varrer o armazenamento. Acima de max_entries, sai a conversa
+    usada há mais tempo.
+    """
+
+    def __init__(self, idle_ttl: Optional[float] = None, max_entries: Optional[int] = None,
+                 on_evict: Optional[EvictionCallback] = None):
+        self.idle_ttl = idle_ttl or CONVERSATION_CONFIG["idle_ttl"]
+        self.max_entries = max_entries or CONVERSATION_CONFIG["max_entries"]
+        self.on_evict = on_evict
+        self._lock = threading.Lock()
+        # conversation_id -> (último acesso em time.monotonic(), contexto)
+        self._entries: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self.expirations = 0
+        self.evictions = 0
+
+    # Contextos locais a este processo
+    shared = False
+
+    def _pop_expired(self, now: float) -> List[Tuple[str, Dict, str]]:
+        """Remove as conversas inativas do início da fila (o _lock já deve estar adquirido)"""
+        removed = []
+        deadline = now - self.idle_ttl
+        while self._entries:
+            key, (last_access, context) = next(iter(self._entries.items()))
+            if last_access > deadline:
+                break
+            del self._entries[key]
+            self.expirations += 1
+            removed.append((key, context, "expired"))
+        return removed
+
+    def _notify(self, removed: List[Tuple[str, Dict, str]]):
+        """Avisa o dono dos contextos sobre as remoções (fora do lock)"""
+        if self.on_evict is None:
+            return
+        for key, context, reason in removed:
+            try:
+                self.on_evict(key, context, reason)
+            except Exception as e:
+                logger.error(f"Erro ao notificar remoção da conversa {key}: {str(e)}")
+
+    def expire(self) -> int:
+        """Remove as conversas inativas há mais de idle_ttl segundos e retorna quantas saíram"""
+        with self._lock:
+            removed = self._pop_expired(time.monotonic())
+        self._notify(removed)
+        return len(removed)
+
+    def __getitem__(self, key: str) -> Dict:
+        with self._lock:
+            now = time.monotonic()
+            removed = self._pop_expired(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                # Acesso renova o prazo e move a conversa para o fim da fila
+                self._entries[key] = (now, entry[1])
+                self._entries.move_to_end(key)
+        self._notify(removed)
+        if entry is None:
+            raise KeyError(key)
+        return entry[1]
+
+    def __setitem__(self, key: str, context: Dict):
+        with self._lock:
+            now = time.monotonic()
+            removed = self._pop_expired(now)
+            self._entries[key] = (now, context)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                old_key, (_, old_context) = self._entries.popitem(last=False)
+                self.evictions += 1
+                removed.append((old_key, old_context, "evicted"))
+        self._notify(removed)
+
+    def save(self, key: str, context: Dict):
+        """Grava o contexto ao fim do processamento da mensagem"""
+        self[key] = context
+
+    def __delitem__(self, key: str):
+        with self._lock:
+            del self._entries[key]
+
+    def __contains__(self, key: object) -> bool:
+        with self._lock:
+            removed = self._pop_expired(time.monotonic())
+            found = key in self._entries
+        self._notify(removed)
+        return found
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            return iter(list(self._entries))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self, sample_size: int = 64) -> Dict:
+        """
+        Retorna tamanho, remoções e uso de memória estimado
+
+        A memória é estimada medindo uma amostra de contextos, metade das conversas
+        mais antigas e metade das mais recentes (o custo não cresce com a
+        quantidade de conversas).
+        """
+        with self._lock:
+            entries = len(self._entries)
+            half = sample_size // 2
+            sampled = itertools.chain(
+                itertools.islice(self._entries.values(), half),
+                itertools.islice(reversed(self._entries.values()), min(half, max(entries - half, 0)))
+            )
+            contexts = [context for _, context in sampled]
+            expirations, evictions = self.expirations, self.evictions
+
+        average = sum(_deep_size(context) for context in contexts) / len(contexts) if contexts else 0
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "idle_ttl": self.idle_ttl,
+            "expirations": expirations,
+            "evictions": evictions,
+            "estimated_bytes": int(average * entries)
+        }
+
+# Tipos de data/hora gravados no JSON como {"$<tipo>": "<ISO 8601>"}; datetime antes de date (subclasse)
+_JSON_TYPES = (
+    ("$datetime", datetime.datetime),
+    ("$date", datetime.date),
+    ("$time", datetime.time)
+)
+
+def _json_default(value: Any) -> Dict[str, str]:
+    for tag, value_type in _JSON_TYPES:
+        if isinstance(value, value_type):
+            return {tag: value.isoformat()}
+    raise TypeError(f"Valor não serializável no contexto: {type(value).__name__}")
+
+def _json_object(obj: Dict) -> Any:
+    if len(obj) == 1:
+        for tag, value_type in _JSON_TYPES:
+            if tag in obj:
+                return value_type.fromisoformat(obj[tag])
+    return obj
+
+def dumps_context(context: Dict) -> bytes:
+    """Serializa um contexto em JSON compacto (datas e horários em ISO 8601)"""
+    return json.dumps(context, default=_json_default, separators=(",", ":"), sort_keys=True).encode()
+
+def loads_context(raw: bytes) -> Dict:
+    """Lê um contexto gravado por dumps_context (só tipos JSON e datas: nada é executado)"""
+    return json.loads(raw, object_hook=_json_object)
+
+class RedisContext(dict):
+    """Contexto lido do Redis, com a versão lida (para o save detectar mudanças)"""
+
+    __slots__ = ("loaded_raw",)
+
+    def __init__(self, values: Dict, loaded_raw: Optional[bytes] = None):
+        super().__init__(values)
+        self.loaded_raw = loaded_raw
+
+class RedisConversationStore(MutableMapping):
+    """
+    Contextos de conversa no Redis, compartilhados entre processos
+
+    - <prefixo>:<id>: contexto em JSON (datas em ISO 8601), com EXPIRE =
+      CONVERSATION_CONFIG["idle_ttl"] (renovado a cada leitura)
+    - <prefixo>:states / :deadlines: estado atual e prazo de cada conversa (base
+      da contagem global por estado, ver state_counts)
+
+    Por mensagem: a leitura (GET + EXPIRE + prazo) é um único pipeline e a gravação,
+    síncrona, outro pipeline, feito só se o contexto mudou (mensagens que não mudam
+    o contexto custam uma ida ao Redis). A versão lida fica no próprio contexto
+    devolvido (RedisContext), e a gravação é um MULTI/EXEC que grava contexto e
+    estado juntos: com mensagens simultâneas da mesma conversa, a última gravação
+    vale para os dois. Campos voláteis como last_interaction não são gravados (o
+    TTL da chave já marca a inatividade).
+    """
+
+    # Contextos visíveis a todos os processos
+    shared = True
+
+    def __init__(self, client=None, redis_url: Optional[str] = None, ttl: Optional[int] = None,
+                 prefix: Optional[str] = None,
+                 serializer: Optional[Tuple[Callable, Callable]] = None,
+                 volatile_fields: Tuple[str, ...] = ("last_interaction",)):
+        import redis
+
+        self.client = client if client is not None else redis.Redis.from_url(redis_url or CACHE_CONFIG["redis_url"])
+        self.ttl = ttl or CONVERSATION_CONFIG["idle_ttl"]
+        self.prefix = prefix or CONVERSATION_CONFIG["key_prefix"]
+        self.dumps, self.loads = serializer or (dumps_context, loads_context)
+        self.volatile_fields = volatile_fields
+        self._counters_lock = threading.Lock()
+        self.reads = 0
+        self.writes = 0
+        self.skipped_writes = 0
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}:{key}"
+
+    @property
+    def _states_key(self) -> str:
+        return f"{self.prefix}:states"
+
+    @property
+    def _deadlines_key(self) -> str:
+        return f"{self.prefix}:deadlines"
+
+    def _count(self, counter: str):
+        with self._counters_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _serialize(self, context: Dict) -> bytes:
+        return self.dumps({field: value for field, value in context.items() if field not in self.volatile_fields})
+
+    def __getitem__(self, key: str) -> Dict:
+        pipe = self.client.pipeline(transaction=False)
+        pipe.get(self._key(key))
+        pipe.expire(self._key(key), self.ttl)
+        pipe.zadd(self._deadlines_key, {key: time.time() + self.ttl}, xx=True)
+        raw, _, _ = pipe.execute()
+        self._count("reads")
+        if raw is None:
+            raise KeyError(key)
+
+        return RedisContext(self.loads(raw), loaded_raw=raw)
+
+    def save(self, key: str, context: Dict):
+        """Grava o contexto se ele mudou desde a leitura (SET EX + estado, em um único pipeline)"""
+        raw = self._serialize(context)
+        if raw == getattr(context, "loaded_raw", None):
+            self._count("skipped_writes")
+            return
+
+        pipe = self.client.pipeline(transaction=True)
+        pipe.set(self._key(key), raw, ex=self.ttl)
+        pipe.zadd(self._deadlines_key, {key: time.time() + self.ttl})
+        pipe.hset(self._states_key, key, context.get("state"))
+        pipe.execute()
+        self._count("writes")
+        if isinstance(context, RedisContext):
+            # A próxima gravação deste mesmo objeto parte da versão gravada agora
+            context.loaded_raw = raw
+
+    def __setitem__(self, key: str, context: Dict):
+        self.save(key, context)
+
+    def __delitem__(self, key: str):
+        pipe = self.client.pipeline(transaction=True)
+        pipe.delete(self._key(key))
+        pipe.hdel(self._states_key, key)
+        pipe.zrem(self._deadlines_key, key)
+        deleted, _, _ = pipe.execute()
+        if not deleted:
+            raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        return bool(self.client.exists(self._key(key)))
+
+    def __iter__(self) -> Iterator[str]:
+        for member, _ in self.client.zscan_iter(self._deadlines_key):
+            yield member.decode() if isinstance(member, bytes) else member
+
+    def __len__(self) -> int:
+        return self.client.zcard(self._deadlines_key)
+
+    def _reconcile_expired(self):
+        """
+        Remove dos estados as conversas cujo TTL venceu no Redis
+
+        Só consulta as conversas com prazo vencido (ZRANGEBYSCORE no sorted set
+        de prazos), sem varrer as chaves.
+        """
+        expired = self.client.zrangebyscore(self._deadlines_key, "-inf", time.time())
+        if not expired:
+            return
+        pipe = self.client.pipeline(transaction=False)
+        for member in expired:
+            pipe.exists(self._key(member.decode() if isinstance(member, bytes) else member))
+        gone = [member for member, exists in zip(expired, pipe.execute()) if not exists]
+        if not gone:
+            return
+        pipe = self.client.pipeline(transaction=True)
+        pipe.zrem(self._deadlines_key, *gone)
+        pipe.hdel(self._states_key, *gone)
+        pipe.execute()
+
+    def state_counts(self) -> Dict[str, int]:
+        """Quantidade de conversas por estado, somando todos os processos"""
+        self._reconcile_expired()
+        counts = Counter(self.client.hvals(self._states_key))
+        return {
+            (state.decode() if isinstance(state, bytes) else state): count
+            for state, count in counts.items()
+        }
+
+    def get_stats(self) -> Dict:
+        """Retorna o número de conversas e os contadores de leitura/gravação deste processo"""
+        with self._counters_lock:
+            reads, writes, skipped = self.reads, self.writes, self.skipped_writes
+        return {
+            "backend": "redis",
+            "entries": len(self),
+            "idle_ttl": self.ttl,
+            "reads": reads,
+            "writes": writes,
+            "skipped_writes": skipped
+        }
+
+def create_conversation_store(backend: Optional[str] = None,
+                              on_evict: Optional[EvictionCallback] = None) -> MutableMapping:
+    """
+    Cria o armazenamento configurado em CONVERSATION_CONFIG["backend"] ("memory" ou "redis")
+
+    on_evict só se aplica ao armazenamento em memória: no Redis o estado de
+    cada conversa fica no próprio armazenamento (state_counts).
+    """
+    backend = backend or CONVERSATION_CONFIG["backend"]
+    if backend == "redis":
+        try:
+            return RedisConversationStore()
+        except ImportError:
+            logger.error("Pacote redis não instalado; usando contextos em memória")
+    return ConversationContextStore(on_evict=on_evict)
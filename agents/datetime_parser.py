@@ -0,0 +1,227 @@
+"""
+Interpretação de Datas e Horários
+Extrai datas ("amanhã", "sexta que vem", "dia 15", "15/11") e horários ("15h30",
+"às 3 da tarde", "meio-dia") das mensagens, com expressões pré-compiladas e cache
+"""
+
+import calendar
+import logging
+import re
+from datetime import date, time, timedelta
+from functools import lru_cache
+from typing import Dict, Optional
+
+from config.settings import SCHEDULING_CONFIG
+from agents.intent_router import normalize_text
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Mensagens distintas guardadas no cache (cada uma vale um dia, para as datas)
+PARSE_CACHE_SIZE = 4096
+
+MONTHS = {
+    "janeiro": 1, "jan": 1, "fevereiro": 2, "fev": 2, "marco": 3, "mar": 3,
+    "abril": 4, "abr": 4, "maio": 5, "mai": 5, "junho": 6, "jun": 6,
+    "julho": 7, "jul": 7, "agosto": 8, "ago": 8, "setembro": 9, "set": 9,
+    "outubro": 10, "out": 10, "novembro": 11, "nov": 11, "dezembro": 12, "dez": 12
+}
+
+WEEKDAYS = {
+    "segunda": 0, "terca": 1, "quarta": 2, "quinta": 3,
+    "sexta": 4, "sabado": 5, "domingo": 6
+}
+
+RELATIVE_DAYS = {"hoje": 0, "amanha": 1, "depois de amanha": 2}
+
+NUMBER_WORDS = {"uma": 1, "um": 1, "duas": 2, "dois": 2, "tres": 3, "quatro": 4}
+
+def _working_hours_bounds() -> tuple:
+    """Primeira abertura e último fechamento da semana, em horas"""
+    hours = SCHEDULING_CONFIG["working_hours"].values()
+    opening = min(int(day["start"].split(":")[0]) for day in hours)
+    closing = max(int(day["end"].split(":")[0]) for day in hours)
+    return opening, closing
+
+# "às 3" sem período nem "h": antes da abertura, mas no expediente se for à tarde -> 15h
+_OPENING_HOUR, _CLOSING_HOUR = _working_hours_bounds()
+
+# Expressões aplicadas ao texto normalizado (minúsculas, sem acentos, espaços simples)
+_MONTH_NAMES = "|".join(sorted(MONTHS, key=len, reverse=True))
+_NUMERIC_DATE = re.compile(r"(?<!\d)(\d{1,2})/(\d{1,2})(?:/(\d{4}|\d{2}))?(?![\d/])")  # DD/MM[/AAAA]
+_SEPARATED_DATE = re.compile(r"(?<!\d)(\d{1,2})([-.])(\d{1,2})\2(\d{4}|\d{2})(?!\d)")  # DD-MM-AAAA, DD.MM.AAAA
+_DAY_MONTH_NAME = re.compile(
+    rf"(?<!\d)(\d{{1,2}}) de ({_MONTH_NAMES})\b(?: de (\d{{4}}))?"  # 15 de março [de 2026]
+)
+_DAY_OF_MONTH = re.compile(r"\bdia (\d{1,2})(?!\d)")  # dia 15
+_RELATIVE_DAY = re.compile(r"\b(depois de amanha|amanha|hoje)\b")
+_DAYS_AHEAD = re.compile(r"\b(?:daqui a|em|dentro de) (\d{1,3}) dias?\b")  # daqui a 3 dias
+_WEEKS_AHEAD = re.compile(
+    r"\b(?:daqui a|em|dentro de) (\d{1,2}|uma|duas|tres|quatro) semanas?\b"  # em 2 semanas
+)
+_NEXT_WEEK = re.compile(r"\b(?:semana que vem|proxima semana)\b")  # segunda-feira da próxima semana
+_WEEKDAY = re.compile(
+    r"\b(?P<next>proxim[ao] )?(?P<weekday>segunda|terca|quarta|quinta|sexta|sabado|domingo)"
+    r"(?:[ -]feira)?"
+    r"(?P<suffix> que vem| da semana que vem| da proxima semana)?\b"
+)
+
+_CLOCK = re.compile(
+    r"(?:\b(?P<at>as|a partir das|pras?) )?"
+    r"(?<![\d/])(?P<hour>\d{1,2})"
+    r"(?:(?: ?[:h.] ?)(?P<minute>\d{2})(?!\d)| ?(?P<suffix>hs|h|horas|hora)\b)?"
+    r"(?P<half> e meia)?"
+    r"(?: (?:horas? )?d[ae] (?P<period>manha|tarde|noite|madrugada))?"
+)
+_NOON = re.compile(r"\b(?P<name>meio ?-?dia|meia ?-?noite)(?P<half> e meia)?\b")
+
+def _normalize(message: str) -> str:
+    return " ".join(normalize_text(message).split())
+
+def _build_date(year: int, month: int, day: int) -> Optional[date]:
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+def _next_day_month(day: int, month: int, today: date) -> Optional[date]:
+    """Próxima ocorrência de DD/MM (sem ano): este ano ou, se já passou, o próximo"""
+    parsed = _build_date(today.year, month, day)
+    if parsed is not None and parsed < today:
+        parsed = _build_date(today.year + 1, month, day)
+    return parsed
+
+def _next_day_of_month(day: int, today: date) -> Optional[date]:
+    """Próximo "dia N": neste mês se ainda não passou, senão no primeiro mês que tem o dia"""
+    if not 1 <= day <= 31:
+        return None
+    year, month = today.year, today.month
+    if day < today.day:
+        month += 1
+    for _ in range(12):
+        if month > 12:
+            year, month = year + 1, 1
+        if day <= calendar.monthrange(year, month)[1]:
+            return date(year, month, day)
+        month += 1
+    return None
+
+def _full_year(year: str) -> int:
+    return int(year) + 2000 if len(year) == 2 else int(year)
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_date_normalized(text: str, today: date) -> Optional[date]:
+    if text == "agora":
+        return today
+
+    # Datas explícitas primeiro; depois as relativas
+    match = _NUMERIC_DATE.search(text)
+    if match:
+        day, month = int(match.group(1)), int(match.group(2))
+        if match.group(3):
+            return _build_date(_full_year(match.group(3)), month, day)
+        return _next_day_month(day, month, today)
+
+    match = _SEPARATED_DATE.search(text)
+    if match:
+        return _build_date(_full_year(match.group(4)), int(match.group(3)), int(match.group(1)))
+
+    match = _DAY_MONTH_NAME.search(text)
+    if match:
+        day, month = int(match.group(1)), MONTHS[match.group(2)]
+        if match.group(3):
+            return _build_date(int(match.group(3)), month, day)
+        return _next_day_month(day, month, today)
+
+    match = _DAY_OF_MONTH.search(text)
+    if match:
+        return _next_day_of_month(int(match.group(1)), today)
+
+    match = _RELATIVE_DAY.search(text)
+    if match:
+        return today + timedelta(days=RELATIVE_DAYS[match.group(1)])
+
+    match = _WEEKDAY.search(text)
+    if match:
+        weekday = WEEKDAYS[match.group("weekday")]
+        suffix = match.group("suffix")
+        if suffix and "semana" in suffix:
+            # "sexta da semana que vem": dia da semana seguinte (de segunda a domingo)
+            next_monday = today + timedelta(days=7 - today.weekday())
+            return next_monday + timedelta(days=weekday)
+        days_ahead = (weekday - today.weekday()) % 7
+        if days_ahead == 0 and (suffix or match.group("next")):
+            # "sexta que vem" dito numa sexta é a da semana seguinte
+            days_ahead = 7
+        return today + timedelta(days=days_ahead)
+
+    match = _DAYS_AHEAD.search(text)
+    if match:
+        return today + timedelta(days=int(match.group(1)))
+
+    match = _WEEKS_AHEAD.search(text)
+    if match:
+        weeks = match.group(1)
+        return today + timedelta(weeks=int(weeks) if weeks.isdigit() else NUMBER_WORDS[weeks])
+
+    match = _NEXT_WEEK.search(text)
+    if match:
+        # "semana que vem" sozinho: o primeiro dia (segunda-feira) da próxima semana
+        return today + timedelta(days=7 - today.weekday())
+
+    return None
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_time_normalized(text: str) -> Optional[time]:
+    for match in _CLOCK.finditer(text):
+        hour = int(match.group("hour"))
+        minute = int(match.group("minute") or 0)
+        period = match.group("period")
+        # Um número solto só é horário com marcador ("15h", "às 3", "3 da tarde")
+        # ou quando é a mensagem inteira ("15")
+        if not (match.group("minute") or match.group("suffix") or match.group("at")
+                or match.group("half") or period or match.group() == text):
+            continue
+        if match.group("half") and not match.group("minute"):
+            minute = 30
+        if period in ("tarde", "noite") and hour < 12:
+            hour += 12
+        elif period in ("noite", "madrugada") and hour == 12:
+            # "12 da noite" é meia-noite
+            hour = 0
+        elif (period is None and not (match.group("minute") or match.group("suffix"))
+              and hour < _OPENING_HOUR and 12 <= hour + 12 < _CLOSING_HOUR):
+            # "às 3": ninguém marca às 3 da manhã; dentro do expediente, é à tarde.
+            # Com "h" ou ":" ("1h", "3:30") o horário foi escrito por extenso e vale como está
+            hour += 12
+        if 0 <= hour <= 23 and 0 <= minute <= 59:
+            return time(hour, minute)
+
+    match = _NOON.search(text)
+    if match:
+        hour = 12 if match.group("name").startswith("meio") else 0
+        return time(hour, 30 if match.group("half") else 0)
+
+    return None
+
+def parse_date(message: str, today: Optional[date] = None) -> Optional[date]:
+    """
+    Extrai a data da mensagem (None se não houver)
+
+    O cache usa o texto normalizado e a data de hoje como chave: "amanhã" muda de
+    valor à meia-noite, então entradas de outros dias nunca são reaproveitadas.
+    """
+    return _parse_date_normalized(_normalize(message), today or date.today())
+
+def parse_time(message: str) -> Optional[time]:
+    """Extrai o horário da mensagem (None se não houver)"""
+    return _parse_time_normalized(_normalize(message))
+
+def get_parser_stats() -> Dict:
+    """Retorna acertos e tamanho dos caches de datas e horários"""
+    stats = {}
+    for name, parser in (("date", _parse_date_normalized), ("time", _parse_time_normalized)):
+        info = parser.cache_info()
+        stats[name] = {"hits": info.hits, "misses": info.misses, "size": info.currsize}
+    return stats
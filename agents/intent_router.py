@@ -0,0 +1,133 @@
+"""
+Roteador de Intenções
+Classifica mensagens por palavras-chave com expressões regulares pré-compiladas por
+etapa da conversa, a partir de INTENT_KEYWORDS
+"""
+
+import logging
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from config.settings import INTENT_KEYWORDS
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def _build_fold_table() -> Dict[str, str]:
+    """Letra acentuada -> letra sem acento (um caractere para um caractere)"""
+    table = {}
+    for code in range(0xC0, 0x250):
+        base = unicodedata.normalize("NFKD", chr(code))[0]
+        if base != chr(code) and base.isascii():
+            table[chr(code)] = base
+    return table
+
+_FOLD_TABLE = _build_fold_table()
+_ACCENTED = re.compile("[" + "".join(_FOLD_TABLE) + "]")
+
+def normalize_text(text: str) -> str:
+    """
+    Minúsculas e sem acentos ("Não" -> "nao")
+
+    Cada caractere vira exatamente um caractere, então as posições no texto
+    normalizado valem para a mensagem original. Só as letras acentuadas são
+    substituídas (mais rápido que str.translate com a tabela inteira).
+    """
+    text = text.lower()
+    if text.isascii():
+        return text
+    return _ACCENTED.sub(lambda found: _FOLD_TABLE[found.group()], text)
+
+@dataclass(frozen=True)
+class IntentMatch:
+    """Palavra-chave encontrada na mensagem (posições na mensagem em minúsculas)"""
+    intent: str
+    keyword: str
+    start: int
+    end: int
+
+def _trie_pattern(keywords: List[str]) -> str:
+    """
+    Expressão em forma de trie: prefixos comuns aparecem uma vez só
+
+    Em cada posição da mensagem o regex segue um único ramo por caractere, então
+    o custo quase não cresce com o número de palavras-chave (uma alternância
+    simples testaria todas). Ramos opcionais gulosos preferem a palavra mais longa.
+    """
+    trie: Dict[str, Dict] = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def emit(node: Dict[str, Dict]) -> str:
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return "(?:" + body + ")?" if "" in node else body
+
+    return emit(trie)
+
+class IntentRouter:
+    """
+    Classificador de intenções por etapa da conversa
+
+    Mesma regra das cadeias de any(palavra in mensagem) que ele substitui: a
+    mensagem em minúsculas contém a palavra-chave em qualquer posição, e vale a
+    primeira intenção da etapa, na ordem da tabela. Acentos não são ignorados
+    (variantes sem acento entram na tabela, como "nao" ao lado de "não").
+
+    Cada intenção tem uma expressão em forma de trie com suas palavras-chave, e
+    route() testa as intenções em ordem, parando na primeira que casa. match()
+    usa uma expressão com todas as palavras da etapa e devolve as ocorrências
+    com as posições.
+    """
+
+    def __init__(self, tables: Optional[Dict[str, Dict[str, List[str]]]] = None):
+        # Por etapa: (intenção, expressão) na ordem de prioridade
+        self._intents: Dict[str, List[Tuple[str, re.Pattern]]] = {}
+        self._patterns: Dict[str, re.Pattern] = {}
+        # Por etapa: palavra-chave em minúsculas -> intenção
+        self._keywords: Dict[str, Dict[str, str]] = {}
+        for name, intents in (tables if tables is not None else INTENT_KEYWORDS).items():
+            self._compile(name, intents)
+
+    def _compile(self, name: str, intents: Dict[str, List[str]]):
+        keywords = {}
+        compiled = []
+        for intent, intent_keywords in intents.items():
+            lowered = [keyword.lower() for keyword in intent_keywords]
+            for keyword in lowered:
+                if keywords.setdefault(keyword, intent) != intent:
+                    raise ValueError(
+                        f"Palavra-chave '{keyword}' em duas intenções da etapa '{name}'"
+                    )
+            compiled.append((intent, re.compile(_trie_pattern(lowered))))
+
+        self._intents[name] = compiled
+        self._patterns[name] = re.compile(_trie_pattern(list(keywords)))
+        self._keywords[name] = keywords
+
+    def match(self, table: str, message: str) -> List[IntentMatch]:
+        """Palavras-chave da etapa encontradas na mensagem, em ordem de posição (sem sobreposição)"""
+        keywords = self._keywords[table]
+        return [
+            IntentMatch(keywords[found.group()], found.group(), found.start(), found.end())
+            for found in self._patterns[table].finditer(message.lower())
+        ]
+
+    def route(self, table: str, message: str) -> Optional[str]:
+        """Primeira intenção da etapa, na ordem da tabela, presente na mensagem (None se nenhuma)"""
+        message_lower = message.lower()
+        for intent, pattern in self._intents[table]:
+            if pattern.search(message_lower):
+                return intent
+        return None
+
+# Instância global do roteador
+intent_router = IntentRouter()
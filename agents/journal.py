@@ -0,0 +1,272 @@
+"""
+Journal e Snapshots do Scheduler
+Durabilidade para o armazenamento em memória: cada alteração é registrada em um
+journal append-only (fsync em lote) e o estado completo é compactado em snapshots
+"""
+
+import atexit
+import datetime
+import json
+import logging
+import os
+import pickle
+import threading
+import time
+from collections.abc import MutableMapping
+from typing import Iterator, Optional
+
+from config.settings import JOURNAL_CONFIG
+from agents.scheduling_logic import Appointment
+from agents.appointment_store import ColumnarAppointmentStore
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FILE = "snapshot.pkl"
+JOURNAL_FILE = "journal.log"
+
+# Referência para converter datetime em microssegundos (sem fuso, ida e volta exata)
+_EPOCH = datetime.datetime(1970, 1, 1)
+_MICROSECOND = datetime.timedelta(microseconds=1)
+
+def appointment_to_row(appointment: Appointment) -> tuple:
+    """Converte um agendamento em uma tupla compacta de valores primitivos"""
+    return (
+        appointment.id,
+        appointment.client_name,
+        appointment.client_phone,
+        appointment.date.toordinal(),
+        appointment.time.hour * 60 + appointment.time.minute,
+        appointment.service,
+        appointment.status,
+        (appointment.created_at - _EPOCH) // _MICROSECOND,
+        (appointment.updated_at - _EPOCH) // _MICROSECOND,
+        appointment.barber_id
+    )
+
+def row_to_appointment(row) -> Appointment:
+    """Reconstrói um agendamento a partir da tupla compacta"""
+    apt_id, name, phone, day, minutes, service, status, created, updated, barber_id = row
+    return Appointment(
+        id=apt_id,
+        client_name=name,
+        client_phone=phone,
+        date=datetime.date.fromordinal(day),
+        time=datetime.time(hour=minutes // 60, minute=minutes % 60),
+        service=service,
+        status=status,
+        created_at=_EPOCH + created * _MICROSECOND,
+        updated_at=_EPOCH + updated * _MICROSECOND,
+        barber_id=barber_id
+    )
+
+def _load_snapshot(path: str, inner: MutableMapping) -> MutableMapping:
+    """Carrega o snapshot no armazenamento (colunas são carregadas em bloco quando possível)"""
+    with open(path, "rb") as snapshot_file:
+        snapshot = pickle.load(snapshot_file)
+
+    if snapshot["format"] == "columns":
+        columns = ColumnarAppointmentStore.from_columns(snapshot["data"])
+        if isinstance(inner, ColumnarAppointmentStore) and not inner:
+            return columns
+        for appointment_id in columns:
+            inner[appointment_id] = columns[appointment_id].to_appointment()
+        return inner
+
+    for row in snapshot["data"]:
+        inner[row[0]] = row_to_appointment(row)
+    return inner
+
+class JournaledAppointmentStore(MutableMapping):
+    """
+    Armazenamento que registra cada alteração em um journal antes de aplicá-la
+
+    Uso:
+        store = JournaledAppointmentStore.open("data/journal")
+        scheduler = BarberScheduler(store=store)
+
+    Registros do journal ("put" com a linha completa ou "del" com o ID) são
+    idempotentes: reaplicá-los sobre um snapshot mais novo leva ao mesmo estado.
+    Com o armazenamento colunar (padrão) o snapshot guarda as próprias colunas,
+    que são recarregadas em bloco na inicialização.
+    """
+
+    def __init__(self, directory: str, inner: Optional[MutableMapping] = None,
+                 fsync_batch_size: Optional[int] = None,
+                 fsync_interval: Optional[float] = None,
+                 snapshot_every: Optional[int] = None):
+        self.directory = directory
+        self.inner = inner if inner is not None else ColumnarAppointmentStore()
+        self.fsync_batch_size = fsync_batch_size or JOURNAL_CONFIG["fsync_batch_size"]
+        self.fsync_interval = fsync_interval or JOURNAL_CONFIG["fsync_interval"]
+        self.snapshot_every = snapshot_every or JOURNAL_CONFIG["snapshot_every"]
+
+        self._lock = threading.RLock()
+        self._unsynced = 0
+        self._journal_records = 0
+        self._last_sync = time.monotonic()
+
+        os.makedirs(directory, exist_ok=True)
+        self._journal = open(self._path(JOURNAL_FILE), "a", encoding="utf-8")
+        self._closed = False
+
+        # Garante o fsync dos registros pendentes mesmo sem novas escritas
+        self._stop = threading.Event()
+        self._syncer = threading.Thread(target=self._sync_loop, daemon=True)
+        self._syncer.start()
+
+        # Registros ainda sem fsync vão para o disco quando o processo termina
+        atexit.register(self.close)
+
+    @classmethod
+    def open(cls, directory: Optional[str] = None, inner: Optional[MutableMapping] = None,
+             **kwargs) -> 'JournaledAppointmentStore':
+        """Recupera o estado (snapshot + cauda do journal) e abre o journal para novas escritas"""
+        directory = directory or JOURNAL_CONFIG["directory"]
+        inner = inner if inner is not None else ColumnarAppointmentStore()
+        started = time.perf_counter()
+
+        snapshot_path = os.path.join(directory, SNAPSHOT_FILE)
+        if os.path.exists(snapshot_path):
+            inner = _load_snapshot(snapshot_path, inner)
+        loaded = len(inner)
+
+        replayed = 0
+        journal_path = os.path.join(directory, JOURNAL_FILE)
+        if os.path.exists(journal_path):
+            # Posição logo depois do último registro completo
+            valid_end = 0
+            with open(journal_path, "rb") as journal_file:
+                for line in journal_file:
+                    try:
+                        if not line.endswith(b"\n"):
+                            raise ValueError("registro sem fim de linha")
+                        operation, payload = json.loads(line)
+                    except ValueError:
+                        # Última linha incompleta (queda durante a escrita): descarta
+                        logger.warning("Registro incompleto ignorado no final do journal")
+                        break
+                    if operation == "put":
+                        inner[payload[0]] = row_to_appointment(payload)
+                    elif operation == "del":
+                        inner.pop(payload, None)
+                    valid_end += len(line)
+                    replayed += 1
+
+            if valid_end < os.path.getsize(journal_path):
+                # Corta o registro incompleto: senão os próximos seriam gravados
+                # na mesma linha e perdidos na recuperação seguinte
+                with open(journal_path, "r+b") as journal_file:
+                    journal_file.truncate(valid_end)
+                    journal_file.flush()
+                    os.fsync(journal_file.fileno())
+
+        store = cls(directory, inner, **kwargs)
+        store._journal_records = replayed
+        logger.info(
+            f"Scheduler recuperado: {loaded} agendamentos do snapshot e {replayed} registros do journal "
+            f"em {time.perf_counter() - started:.3f}s"
+        )
+        return store
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    # Journal
+
+    def _append(self, operation: str, payload):
+        with self._lock:
+            self._journal.write(json.dumps([operation, payload], separators=(",", ":")) + "\n")
+            self._unsynced += 1
+            self._journal_records += 1
+
+            if (self._unsynced >= self.fsync_batch_size or
+                    time.monotonic() - self._last_sync >= self.fsync_interval):
+                self.sync()
+
+    def _maybe_snapshot(self):
+        # Chamado depois de aplicar a alteração, para o snapshot já incluí-la
+        if self._journal_records >= self.snapshot_every:
+            self.snapshot()
+
+    def sync(self):
+        """Grava em disco (fsync) os registros pendentes do journal"""
+        with self._lock:
+            if self._unsynced:
+                self._journal.flush()
+                os.fsync(self._journal.fileno())
+                self._unsynced = 0
+            self._last_sync = time.monotonic()
+
+    def _sync_loop(self):
+        while not self._stop.wait(self.fsync_interval):
+            if self._unsynced:
+                try:
+                    self.sync()
+                except (OSError, ValueError) as e:
+                    logger.error(f"Erro ao sincronizar journal: {e}")
+
+    def snapshot(self):
+        """Grava o estado completo em um snapshot compacto e reinicia o journal"""
+        with self._lock:
+            self.sync()
+            if isinstance(self.inner, ColumnarAppointmentStore):
+                snapshot = {"format": "columns", "data": self.inner.export_columns()}
+            else:
+                snapshot = {"format": "rows",
+                            "data": [appointment_to_row(appointment) for appointment in self.inner.values()]}
+
+            temporary_path = self._path(SNAPSHOT_FILE + ".tmp")
+            with open(temporary_path, "wb") as snapshot_file:
+                pickle.dump(snapshot, snapshot_file, protocol=pickle.HIGHEST_PROTOCOL)
+                snapshot_file.flush()
+                os.fsync(snapshot_file.fileno())
+            os.replace(temporary_path, self._path(SNAPSHOT_FILE))
+
+            # O snapshot já contém tudo o que está no journal
+            self._journal.close()
+            self._journal = open(self._path(JOURNAL_FILE), "w", encoding="utf-8")
+            os.fsync(self._journal.fileno())
+            self._journal_records = 0
+
+            logger.info(f"Snapshot gravado com {len(self.inner)} agendamentos")
+
+    def close(self):
+        """Sincroniza o journal e encerra o armazenamento (chamado também ao fim do processo)"""
+        self._stop.set()
+        with self._lock:
+            if self._closed:
+                return
+            self.sync()
+            self._journal.close()
+            self._closed = True
+        atexit.unregister(self.close)
+
+    # Interface de MutableMapping
+
+    def __getitem__(self, appointment_id: str) -> Appointment:
+        return self.inner[appointment_id]
+
+    def __setitem__(self, appointment_id: str, appointment: Appointment):
+        with self._lock:
+            self._append("put", appointment_to_row(appointment))
+            self.inner[appointment_id] = appointment
+            self._maybe_snapshot()
+
+    def __delitem__(self, appointment_id: str):
+        with self._lock:
+            if appointment_id not in self.inner:
+                raise KeyError(appointment_id)
+            self._append("del", appointment_id)
+            del self.inner[appointment_id]
+            self._maybe_snapshot()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.inner)
+
+    def __len__(self) -> int:
+        return len(self.inner)
+
+    def __contains__(self, appointment_id) -> bool:
+        return appointment_id in self.inner
@@ -0,0 +1,202 @@
+"""
+Fila de Envio de Mensagens
+Envia as mensagens do WhatsApp em threads de trabalho, fora da thread do webhook,
+mantendo a ordem das mensagens de cada cliente
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config.settings import OUTBOUND_CONFIG
+from agents.scheduling_logic import normalize_phone_number
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class DeliveryResult:
+    """Resultado de um envio, entregue aos callbacks"""
+    phone_number: str
+    action: str
+    success: bool
+    message: str
+    queued_seconds: float
+    send_seconds: float
+
+DeliveryCallback = Callable[[DeliveryResult], None]
+
+# Sinal para a thread de trabalho encerrar
+_STOP = object()
+
+class OutboundDispatcher:
+    """
+    Fila de envios com um pool de threads
+
+    Cada cliente (telefone normalizado) sempre cai na mesma thread, que tem sua
+    própria fila FIFO: as mensagens de um cliente saem na ordem em que foram
+    enfileiradas, e clientes diferentes são atendidos em paralelo. Com a fila
+    cheia, dispatch() espera (nenhuma mensagem é descartada). Com async
+    desativado, o envio é feito na hora, na thread de quem chamou. Depois de
+    shutdown(), novos envios são recusados (RuntimeError).
+    """
+
+    def __init__(self, workers: Optional[int] = None, queue_size: Optional[int] = None,
+                 asynchronous: Optional[bool] = None):
+        self.workers = workers or OUTBOUND_CONFIG["workers"]
+        self.queue_size = queue_size or OUTBOUND_CONFIG["queue_size"]
+        self.asynchronous = OUTBOUND_CONFIG["async"] if asynchronous is None else asynchronous
+        self._queues: List[queue.Queue] = []
+        self._threads: List[threading.Thread] = []
+        self._start_lock = threading.Lock()
+        self._closed = False
+        self._listeners: List[DeliveryCallback] = []
+
+        self._stats_lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+        self.total_queued_seconds = 0.0
+        self.total_send_seconds = 0.0
+        self.max_queued_seconds = 0.0
+
+    def add_listener(self, callback: DeliveryCallback):
+        """Registra um callback chamado com o resultado de todos os envios"""
+        self._listeners.append(callback)
+
+    def _start_workers(self):
+        """Cria as filas e as threads (o _start_lock já deve estar adquirido)"""
+        for index in range(self.workers):
+            worker_queue = queue.Queue(maxsize=self.queue_size)
+            thread = threading.Thread(
+                target=self._run, args=(worker_queue,),
+                name=f"outbound-{index}", daemon=True
+            )
+            self._queues.append(worker_queue)
+            self._threads.append(thread)
+            thread.start()
+        # Mensagens ainda na fila saem antes de o processo terminar
+        atexit.register(self.shutdown)
+
+    def dispatch(self, phone_number: str, send: Callable[..., Tuple[bool, str]], *args,
+                 callback: Optional[DeliveryCallback] = None, **kwargs):
+        """
+        Enfileira um envio e retorna em seguida
+
+        send é chamado na thread de trabalho como send(phone_number, *args, **kwargs)
+        e deve retornar (sucesso, mensagem), como os métodos do WhatsAppHandler.
+        """
+        self._check_open()
+        job = (phone_number, send, args, kwargs, callback, time.monotonic())
+        if not self.asynchronous:
+            self._deliver(job)
+            return
+        self._enqueue(phone_number, job)
+
+    def _check_open(self):
+        if self._closed:
+            raise RuntimeError("Fila de envio encerrada")
+
+    def _enqueue(self, phone_number: str, job):
+        shard = hash(normalize_phone_number(phone_number)) % self.workers
+        with self._start_lock:
+            # Com o lock, nenhum envio entra na fila depois do sinal de parada de shutdown()
+            # (as threads de trabalho não usam este lock: uma fila cheia continua esvaziando)
+            self._check_open()
+            if not self._threads:
+                self._start_workers()
+            self._queues[shard].put(job)
+
+    def _run(self, worker_queue: queue.Queue):
+        while True:
+            job = worker_queue.get()
+            try:
+                if job is _STOP:
+                    return
+                self._deliver(job)
+            finally:
+                worker_queue.task_done()
+
+    def _deliver(self, job):
+        phone_number, send, args, kwargs, callback, enqueued_at = job
+        started = time.monotonic()
+        try:
+            success, message = send(phone_number, *args, **kwargs)
+        except Exception as e:
+            logger.error(f"Erro ao enviar mensagem para {phone_number}: {str(e)}")
+            success, message = False, f"Erro interno: {str(e)}"
+        finished = time.monotonic()
+
+        result = DeliveryResult(
+            phone_number=phone_number,
+            action=getattr(send, "__name__", repr(send)),
+            success=bool(success),
+            message=message,
+            queued_seconds=started - enqueued_at,
+            send_seconds=finished - started
+        )
+        with self._stats_lock:
+            if result.success:
+                self.sent += 1
+            else:
+                self.failed += 1
+            self.total_queued_seconds += result.queued_seconds
+            self.total_send_seconds += result.send_seconds
+            self.max_queued_seconds = max(self.max_queued_seconds, result.queued_seconds)
+
+        for listener in ([callback] if callback else []) + self._listeners:
+            try:
+                listener(result)
+            except Exception as e:
+                logger.error(f"Erro no callback de envio: {str(e)}")
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Espera as filas esvaziarem; retorna False se o tempo acabar antes"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for worker_queue in self._queues:
+            with worker_queue.all_tasks_done:
+                while worker_queue.unfinished_tasks:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    worker_queue.all_tasks_done.wait(remaining)
+        return True
+
+    def shutdown(self, timeout: Optional[float] = None):
+        """Envia o que está na fila e encerra as threads; depois disso, dispatch() é recusado"""
+        timeout = OUTBOUND_CONFIG["shutdown_timeout"] if timeout is None else timeout
+        with self._start_lock:
+            if self._closed:
+                return
+            self._closed = True
+            queues, threads = self._queues, self._threads
+        atexit.unregister(self.shutdown)
+        for worker_queue in queues:
+            worker_queue.put(_STOP)
+        deadline = time.monotonic() + timeout
+        for thread in threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+            if thread.is_alive():
+                logger.error(f"Fila de envio {thread.name} não terminou em {timeout}s")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna os contadores de envio e os tempos médios de fila e de envio"""
+        with self._stats_lock:
+            delivered = self.sent + self.failed
+            return {
+                "async": self.asynchronous,
+                "workers": self.workers,
+                "pending": sum(worker_queue.qsize() for worker_queue in self._queues),
+                "sent": self.sent,
+                "failed": self.failed,
+                "avg_queued_seconds": self.total_queued_seconds / delivered if delivered else 0.0,
+                "max_queued_seconds": self.max_queued_seconds,
+                "avg_send_seconds": self.total_send_seconds / delivered if delivered else 0.0
+            }
+
+# Instância global da fila de envio
+outbound_dispatcher = OutboundDispatcher()
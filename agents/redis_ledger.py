@@ -0,0 +1,194 @@
+"""
+Ledger de Horários no Redis
+Ocupação compartilhada entre processos: um bitmap por (dia, barbeiro) no Redis,
+alterado com transações WATCH/MULTI para que dois processos não reservem o mesmo horário
+"""
+
+import datetime
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config.settings import CACHE_CONFIG, SCHEDULING_CONFIG
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# (barbeiro, data, início, fim) em minutos do dia
+Interval = Tuple[str, datetime.date, int, int]
+
+class RedisSlotLedger:
+    """
+    Ocupação dos barbeiros mantida no Redis
+
+    - <prefixo>:<data>:<barbeiro>:cells: bitmap; bit i ligado = célula i ocupada
+      (células de time_granularity minutos desde a meia-noite)
+    - <prefixo>:<data>:<barbeiro>:intervals: hash ID -> "início-fim"
+
+    Intervalos fora da grade de células são arredondados para fora (a reserva
+    nunca fica menor que o intervalo real).
+    """
+
+    def __init__(self, client=None, redis_url: Optional[str] = None,
+                 granularity: Optional[int] = None, prefix: str = "schedule"):
+        import redis
+
+        self.client = client if client is not None else redis.Redis.from_url(redis_url or CACHE_CONFIG["redis_url"])
+        self.granularity = granularity or SCHEDULING_CONFIG["time_granularity"]
+        self.prefix = prefix
+        self._watch_error = redis.WatchError
+
+    def _cells_key(self, barber_id: str, date: datetime.date) -> str:
+        return f"{self.prefix}:{date.isoformat()}:{barber_id}:cells"
+
+    def _intervals_key(self, barber_id: str, date: datetime.date) -> str:
+        return f"{self.prefix}:{date.isoformat()}:{barber_id}:intervals"
+
+    def _cells(self, start: int, end: int) -> range:
+        """Células cobertas pelo intervalo [start, end)"""
+        return range(start // self.granularity, -(-end // self.granularity))
+
+    @staticmethod
+    def _cell_is_set(bitmap: bytes, cell: int) -> bool:
+        # Ordem de bits do Redis: bit 0 é o mais significativo do primeiro byte
+        byte = cell >> 3
+        return byte < len(bitmap) and bool(bitmap[byte] >> (7 - (cell & 7)) & 1)
+
+    def is_free(self, bitmap: Optional[bytes], start: int, end: int) -> bool:
+        """Verifica, em um bitmap já lido, se o intervalo [start, end) está livre"""
+        if not bitmap:
+            return True
+        return not any(self._cell_is_set(bitmap, cell) for cell in self._cells(start, end))
+
+    def read_day(self, date: datetime.date, barber_ids: Iterable[str]) -> Dict[str, bytes]:
+        """Lê os bitmaps do dia de vários barbeiros em um único round trip (pipeline)"""
+        barber_ids = list(barber_ids)
+        pipe = self.client.pipeline(transaction=False)
+        for barber_id in barber_ids:
+            pipe.get(self._cells_key(barber_id, date))
+        return {barber_id: bitmap or b"" for barber_id, bitmap in zip(barber_ids, pipe.execute())}
+
+    def _write(self, pipe, interval: Interval, appointment_id: str, occupied: bool):
+        barber_id, date, start, end = interval
+        cells_key = self._cells_key(barber_id, date)
+        for cell in self._cells(start, end):
+            pipe.setbit(cells_key, cell, 1 if occupied else 0)
+        if occupied:
+            pipe.hset(self._intervals_key(barber_id, date), appointment_id, f"{start}-{end}")
+        else:
+            pipe.hdel(self._intervals_key(barber_id, date), appointment_id)
+
+    def transition(self, appointment_id: str, old: Optional[Interval], new: Optional[Interval]) -> bool:
+        """
+        Troca atomicamente a reserva do agendamento de old para new
+
+        - old None: reserva new (falha se alguma célula estiver ocupada)
+        - new None: libera old (sempre tem sucesso)
+        - ambos: remarcação; as células de old não contam como ocupadas para new
+
+        Returns:
+            bool: False se o novo intervalo estiver ocupado por outro agendamento
+        """
+        if new is None:
+            if old is not None:
+                pipe = self.client.pipeline()
+                self._write(pipe, old, appointment_id, occupied=False)
+                pipe.execute()
+            return True
+
+        new_barber, new_date, new_start, new_end = new
+        new_key = self._cells_key(new_barber, new_date)
+        released = set()
+        if old is not None and self._cells_key(old[0], old[1]) == new_key:
+            released = set(self._cells(old[2], old[3]))
+
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(new_key)
+                    bitmap = pipe.get(new_key) or b""
+                    if any(self._cell_is_set(bitmap, cell)
+                           for cell in self._cells(new_start, new_end) if cell not in released):
+                        pipe.unwatch()
+                        return False
+
+                    pipe.multi()
+                    if old is not None:
+                        self._write(pipe, old, appointment_id, occupied=False)
+                    self._write(pipe, new, appointment_id, occupied=True)
+                    pipe.execute()
+                    return True
+                except self._watch_error:
+                    # Outro processo alterou o dia entre a leitura e a gravação: tenta de novo
+                    continue
+
+    def reconcile(self, reservations: Dict[str, Interval]) -> int:
+        """
+        Grava no Redis as reservas (ID -> intervalo) que faltam nele
+
+        Usado na inicialização: ledger recém-ativado sobre agendamentos já
+        existentes ou dados perdidos no Redis. Dois round trips: um pipeline lê as
+        reservas já registradas em cada dia, outro grava só as ausentes. Uma
+        reserva ausente que ocupa células de outra (já registrada ou gravada
+        agora) é gravada assim mesmo e registrada no log como conflito.
+
+        Returns:
+            int: número de reservas gravadas
+        """
+        by_key: Dict[str, List[Tuple[str, Interval]]] = {}
+        for appointment_id, interval in reservations.items():
+            by_key.setdefault(self._intervals_key(interval[0], interval[1]), []).append((appointment_id, interval))
+        if not by_key:
+            return 0
+
+        keys = list(by_key)
+        pipe = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipe.hgetall(key)
+        registered = [
+            {
+                (field.decode() if isinstance(field, bytes) else field):
+                    tuple(int(part) for part in (value.decode() if isinstance(value, bytes) else value).split("-"))
+                for field, value in fields.items()
+            }
+            for fields in pipe.execute()
+        ]
+
+        pipe = self.client.pipeline(transaction=False)
+        written = 0
+        for key, taken in zip(keys, registered):
+            for appointment_id, interval in by_key[key]:
+                if appointment_id in taken:
+                    continue
+                barber_id, date, start, end = interval
+                cells = set(self._cells(start, end))
+                conflicts = sorted(
+                    other_id for other_id, (other_start, other_end) in taken.items()
+                    if cells.intersection(self._cells(other_start, other_end))
+                )
+                if conflicts:
+                    logger.error(
+                        f"Ledger: reserva {appointment_id} ({barber_id}, {date}, {start}-{end} min) "
+                        f"sobrepõe {', '.join(conflicts)}"
+                    )
+                self._write(pipe, interval, appointment_id, occupied=True)
+                taken[appointment_id] = (start, end)
+                written += 1
+        if written:
+            pipe.execute()
+        return written
+
+    def drop_day(self, date: datetime.date, barber_ids: Iterable[str]):
+        """Remove os dados de um dia (limpeza de dias antigos)"""
+        keys: List[str] = []
+        for barber_id in barber_ids:
+            keys += [self._cells_key(barber_id, date), self._intervals_key(barber_id, date)]
+        if keys:
+            self.client.delete(*keys)
+
+def create_slot_ledger(backend: Optional[str] = None) -> Optional[RedisSlotLedger]:
+    """Cria o ledger configurado em SCHEDULING_CONFIG["ledger_backend"] ("redis" ou "none")"""
+    backend = backend or SCHEDULING_CONFIG["ledger_backend"]
+    if backend == "redis":
+        return RedisSlotLedger()
+    return None
@@ -2,16 +2,39 @@
 Lógica de Agendamento para Barbearia
 """
 
+import bisect
 import datetime
+import heapq
+import itertools
 import logging
-from typing import Dict, List, Optional, Tuple
+import threading
+from collections import Counter, deque
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, FrozenSet, List, MutableMapping, Optional, Set, Tuple
 from dataclasses import dataclass
-from config.settings import SCHEDULING_CONFIG
+from config.settings import SCHEDULING_CONFIG, JOURNAL_CONFIG, DATABASE_CONFIG, CACHE_CONFIG
+from agents.appointment_ids import id_allocator
+from agents.availability_cache import (
+    AvailabilityCache, InProcessAvailabilityCache, RedisAvailabilityCache, create_availability_cache
+)
+from agents.redis_ledger import RedisSlotLedger, create_slot_ledger
+from agents.calendar_rules import CalendarRule, parse_calendar_rules
 
 # Configuração de logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def normalize_phone_number(phone_number: str) -> str:
+    """Normaliza o número do telefone no formato do WhatsApp (somente dígitos, com código do país)"""
+    # Remove caracteres especiais
+    cleaned = ''.join(filter(str.isdigit, phone_number))
+    
+    # Adiciona código do país se não existir
+    if not cleaned.startswith('55'):
+        cleaned = '55' + cleaned
+        
+    return cleaned
+
 @dataclass
 class Appointment:
     """Classe para representar um agendamento"""
@@ -24,6 +47,7 @@ class Appointment:
     status: str  # 'confirmed', 'cancelled', 'completed', 'pending'
     created_at: datetime.datetime
     updated_at: datetime.datetime
+    barber_id: Optional[str] = None
 
 @dataclass
 class TimeSlot:
@@ -32,85 +56,788 @@ class TimeSlot:
     available: bool
     appointment_id: Optional[str] = None
 
+@dataclass(frozen=True)
+class SlotTemplate:
+    """Grade de horários pré-calculada para um dia da semana"""
+    start: datetime.time
+    end: datetime.time
+    times: Tuple[datetime.time, ...]
+    minutes: Tuple[int, ...]
+
+@dataclass(frozen=True)
+class DayPlan:
+    """Configuração efetiva de um dia: grade (None = fechado) e barbeiros ausentes"""
+    template: Optional[SlotTemplate]
+    absent_barbers: FrozenSet[str] = frozenset()
+    reason: str = ""
+
+@dataclass
+class WaitlistEntry:
+    """Cliente na lista de espera de uma data, aceitando horários entre earliest e latest"""
+    id: str
+    client_name: str
+    client_phone: str
+    date: datetime.date
+    earliest: datetime.time
+    latest: datetime.time
+    service: str
+    status: str  # 'waiting', 'offered', 'booked', 'cancelled'
+    created_at: datetime.datetime
+    barber_id: Optional[str] = None
+
+@dataclass(frozen=True)
+class WaitlistOffer:
+    """Horário vago oferecido a um cliente da lista de espera, válido até expires_at"""
+    entry_id: str
+    client_phone: str
+    date: datetime.date
+    time: datetime.time
+    service: str
+    expires_at: datetime.datetime
+    barber_id: Optional[str] = None
+
+# Nomes dos dias na ordem de datetime.date.weekday(), independentes do locale
+WEEKDAY_NAMES = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+# Dias passados cobertos pelo calendário compilado (agendamentos ainda não limpos)
+CALENDAR_LOOKBACK_DAYS = 90
+
 class BarberScheduler:
     """Classe principal para gerenciar agendamentos"""
     
-    def __init__(self):
-        self.appointments: Dict[str, Appointment] = {}
+    def __init__(self, store: Optional[MutableMapping[str, Appointment]] = None, 
+                 cache: Optional[AvailabilityCache] = None, 
+                 ledger: Optional[RedisSlotLedger] = None):
+        # Armazenamento dos agendamentos: dict em memória por padrão, ou um backend
+        # alternativo com a mesma interface (ex: ColumnarAppointmentStore)
+        self.appointments: MutableMapping[str, Appointment] = store if store is not None else {}
+        # Ocupação compartilhada entre processos (SCHEDULING_CONFIG["ledger_backend"]):
+        # quando presente, é a fonte de verdade para reservas e disponibilidade.
+        # Os registros dos agendamentos devem então estar em um armazenamento
+        # compartilhado (ex: PostgresAppointmentStore) e o cache no Redis.
+        self.ledger: Optional[RedisSlotLedger] = ledger if ledger is not None else create_slot_ledger()
+        if cache is None and self.ledger is not None and CACHE_CONFIG["backend"] == "memory":
+            # Um cache em memória não é invalidado pelas reservas dos outros processos
+            logger.warning("SCHEDULER_LEDGER=redis com CACHE_BACKEND=memory: usando o cache de disponibilidade no Redis do ledger")
+            cache = RedisAvailabilityCache(client=self.ledger.client)
+        # Cache dos horários por data (backend de CACHE_CONFIG se não informado)
+        self.availability_cache: Optional[AvailabilityCache] = (
+            cache if cache is not None else create_availability_cache()
+        )
+        if self.ledger is not None and isinstance(self.availability_cache, InProcessAvailabilityCache):
+            logger.warning(
+                "Ledger compartilhado com cache de disponibilidade em memória: reservas de outros "
+                f"processos podem levar até {self.availability_cache.ttl}s para aparecer"
+            )
+        self._stats_lock = threading.Lock()
+        # Locks por data (striping): reservas em dias diferentes rodam em paralelo e
+        # a verificação + inserção no mesmo dia é atômica
+        self._date_locks = [threading.Lock() for _ in range(SCHEDULING_CONFIG["lock_stripes"])]
+        # Protege as estruturas compartilhadas entre dias (índice de clientes, linha do tempo, armazenamento)
+        self._index_lock = threading.RLock()
         self.working_hours = SCHEDULING_CONFIG["working_hours"]
         self.appointment_duration = SCHEDULING_CONFIG["appointment_duration"]
         self.buffer_time = SCHEDULING_CONFIG["buffer_time"]
+        self.service_durations = SCHEDULING_CONFIG["service_durations"]
+        self.time_granularity = SCHEDULING_CONFIG["time_granularity"]
         self.advance_booking_days = SCHEDULING_CONFIG["advance_booking_days"]
+        self.barbers: Dict[str, str] = dict(SCHEDULING_CONFIG["barbers"])
+        self.default_barber_id = next(iter(self.barbers))
+        self.waitlist_offer_ttl = SCHEDULING_CONFIG["waitlist_offer_ttl"]
+        # Lista de espera: entradas por ID e, para cada (data, horário da grade), um heap
+        # (ordem de chegada, ID) com remoção preguiçosa das entradas que saíram da lista
+        self._waitlist_lock = threading.Lock()
+        self._waitlist_sequence = itertools.count(1)
+        self._waitlist: Dict[str, WaitlistEntry] = {}
+        self._waitlist_heaps: Dict[Tuple[datetime.date, int], List[Tuple[int, str]]] = {}
+        # Ofertas em aberto (uma por entrada e por telefone) e heap de expiração
+        self._waitlist_offers: Dict[str, WaitlistOffer] = {}
+        self._offers_by_phone: Dict[str, str] = {}
+        self._offer_expiry: List[Tuple[datetime.datetime, str]] = []
+        # Intervalos liberados (data, início, fim) aguardando oferta à lista de espera
+        self._freed_slots: deque = deque()
+        # Chamado com cada WaitlistOffer (registrado pelo BarberAgent)
+        self.waitlist_notifier: Optional[Callable[[WaitlistOffer], None]] = None
+        self.calendar_rules: List[CalendarRule] = parse_calendar_rules(SCHEDULING_CONFIG["calendar_exceptions"])
+        self._slot_templates = self._build_slot_templates()
+        self._compile_calendar()
+        self._rebuild_indexes()
+        if self.ledger is not None:
+            self.reconcile_ledger()
+    
+    def reconcile_ledger(self) -> int:
+        """
+        Grava no ledger os agendamentos confirmados (de hoje em diante) que faltam nele
+        
+        Sem isso, ativar o ledger sobre uma agenda existente (ou perder os dados
+        do Redis) faria todos os horários reservados parecerem livres.
+        """
+        today = datetime.date.today()
+        with self._index_lock:
+            reservations = {
+                appointment.id: self._shared_interval(appointment)
+                for appointment in self.appointments.values()
+                if appointment.status == 'confirmed' and appointment.date >= today
+            }
+        written = self.ledger.reconcile(reservations)
+        if written:
+            logger.info(f"Ledger: {written} reserva(s) restaurada(s) a partir dos agendamentos armazenados")
+        return written
+    
+    def _reset_indexes(self):
+        """Inicializa índices e contadores vazios"""
+        # Intervalos ocupados por (barbeiro, dia): lista ordenada de (início, fim, ID) em minutos do dia
+        self._intervals: Dict[Tuple[str, datetime.date], List[Tuple[int, int, str]]] = {}
+        # Mapa de ocupação por (barbeiro, dia): bit i ligado = i-ésimo horário da grade ocupado
+        self._occupancy: Dict[Tuple[str, datetime.date], int] = {}
+        # Carga por dia (agendamentos confirmados de cada barbeiro) e heap com remoção preguiçosa
+        self._barber_loads: Dict[datetime.date, Counter] = {}
+        self._load_heaps: Dict[datetime.date, List[Tuple[int, str]]] = {}
+        # Índice de clientes: telefone normalizado -> IDs dos agendamentos não cancelados
+        self._phone_index: Dict[str, Set[str]] = {}
+        # Linha do tempo dos confirmados, ordenada por (data/hora, ID)
+        self._timeline: List[Tuple[datetime.datetime, str]] = []
+        # Partições por dia: data -> IDs de todos os agendamentos do dia (inclusive cancelados)
+        self._day_ids: Dict[datetime.date, Set[str]] = {}
+        # Contadores incrementais de status (total, por dia e por serviço)
+        with self._stats_lock:
+            self._status_counts: Counter = Counter()
+            self._day_counts: Dict[datetime.date, Counter] = {}
+            self._service_counts: Dict[str, Counter] = {}
+    
+    def _rebuild_indexes(self):
+        """
+        Reconstrói os índices e contadores a partir dos agendamentos armazenados
+        
+        Carga em lote: as listas são ordenadas uma única vez no final e a ocupação,
+        a carga dos barbeiros e os contadores são calculados por dia, em vez de a
+        cada inserção como em _index_appointment.
+        """
+        self._reset_indexes()
+        if self.availability_cache is not None:
+            self.availability_cache.clear()
+        grouped: Counter = Counter()
+        
+        for appointment in self.appointments.values():
+            status = appointment.status
+            date = appointment.date
+            grouped[(date, appointment.service, status)] += 1
+            self._day_ids.setdefault(date, set()).add(appointment.id)
+            
+            if status == 'cancelled':
+                continue
+            phone = normalize_phone_number(appointment.client_phone)
+            self._phone_index.setdefault(phone, set()).add(appointment.id)
+            
+            if status != 'confirmed':
+                continue
+            start, end = self._appointment_interval(appointment)
+            key = (self._appointment_barber(appointment), date)
+            self._intervals.setdefault(key, []).append((start, end, appointment.id))
+            self._timeline.append((datetime.datetime.combine(date, appointment.time), appointment.id))
+        
+        self._timeline.sort()
+        for (barber_id, date), intervals in self._intervals.items():
+            intervals.sort()
+            self._refresh_occupancy(barber_id, date, intervals[0][0], max(end for _, end, _ in intervals))
+            self._barber_loads.setdefault(date, Counter())[barber_id] = len(intervals)
+        
+        with self._stats_lock:
+            for (date, service, status), count in grouped.items():
+                self._status_counts[status] += count
+                self._day_counts.setdefault(date, Counter())[status] += count
+                self._service_counts.setdefault(service, Counter())[status] += count
+    
+    def _build_slot_templates(self) -> Tuple[Optional[SlotTemplate], ...]:
+        """Pré-calcula a grade de horários de cada dia da semana a partir da configuração"""
+        # Grades por horário (start, end): dias com o mesmo horário compartilham a grade
+        self._templates_by_hours: Dict[Tuple[str, str], SlotTemplate] = {}
+        return tuple(
+            self._slot_template_for(self.working_hours[weekday]["start"], self.working_hours[weekday]["end"])
+            if weekday in self.working_hours else None
+            for weekday in WEEKDAY_NAMES
+        )
+    
+    def _slot_template_for(self, start: str, end: str) -> SlotTemplate:
+        """Retorna a grade de horários de um expediente ("HH:MM" a "HH:MM")"""
+        template = self._templates_by_hours.get((start, end))
+        if template is not None:
+            return template
+        
+        step = self.appointment_duration + self.buffer_time
+        start_time = datetime.datetime.strptime(start, "%H:%M").time()
+        end_time = datetime.datetime.strptime(end, "%H:%M").time()
+        minutes = tuple(range(self._to_minutes(start_time), self._to_minutes(end_time), step))
+        
+        template = self._templates_by_hours[(start, end)] = SlotTemplate(
+            start=start_time,
+            end=end_time,
+            times=tuple(datetime.time(hour=m // 60, minute=m % 60) for m in minutes),
+            minutes=minutes
+        )
+        return template
+    
+    def _apply_calendar_rule(self, rule: CalendarRule, template: Optional[SlotTemplate], 
+                             absent: FrozenSet[str]) -> Tuple[Optional[SlotTemplate], FrozenSet[str]]:
+        """Aplica o efeito de uma regra do calendário sobre a grade e os ausentes de um dia"""
+        if rule.barber_id is not None:
+            return template, absent | {rule.barber_id}
+        if rule.closed:
+            return None, absent
+        return self._slot_template_for(*rule.hours), absent
+    
+    def _compile_calendar(self):
+        """
+        Compila o horário semanal e o calendário de exceções em um plano por data
+        
+        Cobre de CALENDAR_LOOKBACK_DAYS dias atrás até o dobro da janela de
+        agendamento, em uma lista indexada pelo ordinal da data: consultar um dia
+        é O(1) independentemente da quantidade de regras. Cada regra percorre só
+        as datas que cobre (dates_between), na ordem de prioridade.
+        """
+        today = datetime.date.today()
+        first = today - datetime.timedelta(days=CALENDAR_LOOKBACK_DAYS)
+        last = today + datetime.timedelta(days=2 * self.advance_booking_days)
+        base = first.toordinal()
+        
+        # Dias sem exceção compartilham o plano do dia da semana
+        weekly_plans = [DayPlan(template) for template in self._slot_templates]
+        plans = [weekly_plans[(first.weekday() + offset) % 7] for offset in range(last.toordinal() - base + 1)]
+        
+        for rule in self.calendar_rules:
+            for date in rule.dates_between(first, last):
+                offset = date.toordinal() - base
+                template, absent = self._apply_calendar_rule(rule, plans[offset].template, plans[offset].absent_barbers)
+                plans[offset] = DayPlan(template, absent, rule.reason)
+        
+        # Troca atômica: leitores concorrentes veem o plano antigo ou o novo inteiro
+        self._calendar = (base, today, tuple(plans))
+    
+    def _evaluate_day_plan(self, date: datetime.date) -> DayPlan:
+        """Calcula o plano de uma data fora do período compilado, testando cada regra"""
+        template = self._slot_templates[date.weekday()]
+        absent: FrozenSet[str] = frozenset()
+        reason = ""
+        for rule in self.calendar_rules:
+            if rule.matches(date):
+                template, absent = self._apply_calendar_rule(rule, template, absent)
+                reason = rule.reason
+        return DayPlan(template, absent, reason)
+    
+    def _day_plan(self, date: datetime.date) -> DayPlan:
+        """Retorna o plano da data (consulta O(1) no calendário compilado)"""
+        base, compiled_on, plans = self._calendar
+        offset = date.toordinal() - base
+        if 0 <= offset < len(plans):
+            return plans[offset]
+        if compiled_on != datetime.date.today():
+            # A janela avançou desde a compilação: recompila (datas já cobertas não mudam)
+            self._compile_calendar()
+            return self._day_plan(date)
+        return self._evaluate_day_plan(date)
+    
+    def update_calendar(self, entries: List[Dict]):
+        """Substitui o calendário de exceções e recompila as grades de cada dia"""
+        rules = parse_calendar_rules(entries)
+        with self._locked_dates():
+            self.calendar_rules = rules
+            self._compile_calendar()
+            # Grades e barbeiros dos dias mudaram: reconstrói intervalos e mapas de ocupação
+            self._rebuild_indexes()
+        
+        logger.info(f"Calendário de exceções recompilado ({len(rules)} regras)")
+    
+    def update_working_hours(self, working_hours: Optional[Dict] = None, 
+                             appointment_duration: Optional[int] = None, 
+                             buffer_time: Optional[int] = None, 
+                             service_durations: Optional[Dict[str, int]] = None):
+        """Atualiza a configuração de horários e recompila as grades de cada dia"""
+        if working_hours is not None:
+            self.working_hours = working_hours
+        if appointment_duration is not None:
+            self.appointment_duration = appointment_duration
+        if buffer_time is not None:
+            self.buffer_time = buffer_time
+        if service_durations is not None:
+            self.service_durations = service_durations
+        
+        with self._locked_dates():
+            self._slot_templates = self._build_slot_templates()
+            self._compile_calendar()
+            
+            # Grade e durações mudaram: reconstrói intervalos e mapas de ocupação
+            self._rebuild_indexes()
+        
+        logger.info("Grades de horários recompiladas")
+    
+    @contextmanager
+    def _locked_dates(self, *dates: datetime.date):
+        """
+        Adquire os locks das datas informadas (sem datas, todos os locks)
+        
+        Os locks são adquiridos sempre na mesma ordem para evitar deadlock entre
+        remarcações que envolvem dois dias.
+        """
+        if dates:
+            stripes = sorted({date.toordinal() % len(self._date_locks) for date in dates})
+        else:
+            stripes = range(len(self._date_locks))
+        locks = [self._date_locks[stripe] for stripe in stripes]
+        
+        for lock in locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+    
+    def _store_appointment(self, appointment: Appointment):
+        """Grava o agendamento no armazenamento (necessário para backends persistentes)"""
+        with self._index_lock:
+            self.appointments[appointment.id] = appointment
+    
+    def _get_slot_template(self, date: datetime.date) -> Optional[SlotTemplate]:
+        """Retorna a grade pré-calculada da data (horário semanal com as exceções do calendário)"""
+        return self._day_plan(date).template
+    
+    @staticmethod
+    def _to_minutes(time: datetime.time) -> int:
+        """Converte um horário em minutos desde a meia-noite"""
+        return time.hour * 60 + time.minute
+    
+    def get_service_duration(self, service: Optional[str] = None) -> int:
+        """Retorna a duração em minutos de um serviço"""
+        if service is None:
+            return self.appointment_duration
+        return self.service_durations.get(service, self.appointment_duration)
         
     def is_working_day(self, date: datetime.date) -> bool:
         """Verifica se é um dia de trabalho"""
-        weekday = date.strftime("%A").lower()
-        return weekday in self.working_hours
+        return self._get_slot_template(date) is not None
     
     def get_working_hours_for_date(self, date: datetime.date) -> Tuple[datetime.time, datetime.time]:
         """Retorna horário de início e fim para uma data específica"""
-        weekday = date.strftime("%A").lower()
-        if weekday in self.working_hours:
-            start_str = self.working_hours[weekday]["start"]
-            end_str = self.working_hours[weekday]["end"]
-            start_time = datetime.datetime.strptime(start_str, "%H:%M").time()
-            end_time = datetime.datetime.strptime(end_str, "%H:%M").time()
-            return start_time, end_time
+        template = self._get_slot_template(date)
+        if template is not None:
+            return template.start, template.end
         return None, None
     
-    def generate_time_slots(self, date: datetime.date) -> List[TimeSlot]:
-        """Gera todos os horários possíveis para uma data"""
-        start_time, end_time = self.get_working_hours_for_date(date)
-        if not start_time or not end_time:
+    def _cached(self, date: datetime.date, key: str, compute) -> List[TimeSlot]:
+        """Consulta o cache de disponibilidade da data (ou calcula direto, sem cache)"""
+        if self.availability_cache is None:
+            return compute()
+        # Cópia da lista: quem chama pode alterá-la sem afetar o cache
+        return list(self.availability_cache.get_or_compute(date, key, compute))
+    
+    def _invalidate_availability(self, date: datetime.date):
+        """Descarta do cache os horários de uma data (chamado após alterar seus intervalos)"""
+        if self.availability_cache is not None:
+            self.availability_cache.invalidate(date)
+    
+    def get_cache_statistics(self) -> Dict:
+        """Retorna os contadores do cache de disponibilidade"""
+        if self.availability_cache is None:
+            return {}
+        return self.availability_cache.get_stats()
+    
+    def generate_time_slots(self, date: datetime.date, barber_id: Optional[str] = None) -> List[TimeSlot]:
+        """
+        Gera todos os horários possíveis para uma data
+        
+        Sem barbeiro informado, o horário fica disponível se algum barbeiro estiver livre.
+        """
+        return self._cached(date, f"slots:{barber_id or '*'}", 
+                            lambda: self._compute_time_slots(date, barber_id))
+    
+    def _compute_time_slots(self, date: datetime.date, barber_id: Optional[str] = None) -> List[TimeSlot]:
+        template = self._get_slot_template(date)
+        if template is None:
             return []
         
+        step = self.appointment_duration + self.buffer_time
+        _, free = self._free_slot_mask(date, barber_id)
+        
         slots = []
-        current_time = start_time
+        for position, slot_time in enumerate(template.times):
+            if free >> position & 1:
+                slots.append(TimeSlot(time=slot_time, available=True))
+            else:
+                slot_minutes = template.minutes[position]
+                appointment_id = self._find_conflict_any(date, slot_minutes, slot_minutes + step, barber_id)
+                slots.append(TimeSlot(time=slot_time, available=False, appointment_id=appointment_id))
         
-        while current_time < end_time:
-            # Verifica se o horário não está ocupado
-            available = self.is_time_slot_available(date, current_time)
-            appointment_id = self.get_appointment_id_for_time(date, current_time)
+        return slots
+    
+    def _resolve_barbers(self, date: datetime.date, barber_id: Optional[str] = None) -> List[str]:
+        """Retorna o barbeiro informado ou todos os barbeiros, exceto os ausentes na data (folga, férias)"""
+        absent = self._day_plan(date).absent_barbers
+        barbers = [barber_id] if barber_id is not None else list(self.barbers)
+        return [barber for barber in barbers if barber not in absent] if absent else barbers
+    
+    def _find_conflict_any(self, date: datetime.date, start: int, end: int, 
+                           barber_id: Optional[str] = None) -> Optional[str]:
+        """Retorna um agendamento em conflito se o barbeiro (ou todos, se não informado) estiver ocupado"""
+        appointment_id = None
+        for barber in self._resolve_barbers(date, barber_id):
+            appointment_id = self._find_conflict(barber, date, start, end)
+            if appointment_id is None:
+                return None
+        return appointment_id
+    
+    def _find_conflict(self, barber_id: str, date: datetime.date, start: int, end: int, 
+                       ignore_id: Optional[str] = None) -> Optional[str]:
+        """
+        Retorna o ID de um agendamento que se sobrepõe ao intervalo [start, end) em O(log n)
+        
+        Os intervalos de um dia nunca se sobrepõem entre si, então basta verificar
+        o intervalo anterior ao ponto de inserção e os seguintes que começam antes de end.
+        """
+        intervals = self._intervals.get((barber_id, date))
+        if not intervals:
+            return None
+        
+        i = bisect.bisect_left(intervals, start, key=lambda interval: interval[0])
+        if i > 0:
+            i -= 1
+        
+        while i < len(intervals) and intervals[i][0] < end:
+            interval_start, interval_end, appointment_id = intervals[i]
+            if interval_end > start and appointment_id != ignore_id:
+                return appointment_id
+            i += 1
+        return None
+    
+    def _appointment_interval(self, appointment: Appointment) -> Tuple[int, int]:
+        """Retorna o intervalo ocupado pelo agendamento (duração do serviço + buffer)"""
+        start = self._to_minutes(appointment.time)
+        return start, start + self.get_service_duration(appointment.service) + self.buffer_time
+    
+    def _appointment_barber(self, appointment: Appointment) -> str:
+        """Retorna o barbeiro do agendamento (registros antigos ficam com o barbeiro padrão)"""
+        return appointment.barber_id or self.default_barber_id
+    
+    def _refresh_occupancy(self, barber_id: str, date: datetime.date, start: int, end: int):
+        """Recalcula os bits da grade que se sobrepõem ao intervalo [start, end)"""
+        template = self._get_slot_template(date)
+        if template is None:
+            return
+        
+        step = self.appointment_duration + self.buffer_time
+        first = bisect.bisect_right(template.minutes, start - step)
+        last = bisect.bisect_left(template.minutes, end)
+        
+        key = (barber_id, date)
+        mask = self._occupancy.get(key, 0)
+        for position in range(first, last):
+            slot_minutes = template.minutes[position]
+            if self._find_conflict(barber_id, date, slot_minutes, slot_minutes + step):
+                mask |= 1 << position
+            else:
+                mask &= ~(1 << position)
+        
+        if mask:
+            self._occupancy[key] = mask
+        else:
+            self._occupancy.pop(key, None)
+    
+    def _update_barber_load(self, barber_id: str, date: datetime.date, delta: int):
+        """Atualiza a carga do barbeiro no dia e registra a nova carga no heap do dia"""
+        loads = self._barber_loads.setdefault(date, Counter())
+        loads[barber_id] += delta
+        
+        heap = self._load_heaps.get(date)
+        if heap is not None:
+            heapq.heappush(heap, (loads[barber_id], barber_id))
+            # Descarta entradas obsoletas quando o heap cresce demais
+            if len(heap) > 4 * len(self.barbers):
+                del self._load_heaps[date]
+        
+        if not any(loads.values()):
+            del self._barber_loads[date]
+            self._load_heaps.pop(date, None)
+    
+    def _pick_barber(self, date: datetime.date, start: int, end: int, 
+                     ignore_id: Optional[str] = None) -> Optional[str]:
+        """Escolhe o barbeiro menos ocupado no dia (e presente) que esteja livre no intervalo [start, end)"""
+        loads = self._barber_loads.get(date, Counter())
+        heap = self._load_heaps.get(date)
+        if heap is None:
+            heap = [(loads[barber], barber) for barber in self.barbers]
+            heapq.heapify(heap)
+            self._load_heaps[date] = heap
+        
+        absent = self._day_plan(date).absent_barbers
+        chosen = None
+        popped = []
+        while heap:
+            load, barber = heapq.heappop(heap)
+            if barber not in self.barbers or load != loads[barber]:
+                # Entrada obsoleta (remoção preguiçosa)
+                continue
+            popped.append((load, barber))
+            if barber not in absent and self._find_conflict(barber, date, start, end, ignore_id) is None:
+                chosen = barber
+                break
+        
+        for entry in popped:
+            heapq.heappush(heap, entry)
+        return chosen
+    
+    def _update_counters(self, appointment: Appointment, delta: int):
+        """Soma (ou subtrai) a contribuição de um agendamento nos contadores de status"""
+        with self._stats_lock:
+            self._status_counts[appointment.status] += delta
             
-            slot = TimeSlot(
-                time=current_time,
-                available=available,
-                appointment_id=appointment_id
-            )
-            slots.append(slot)
+            for counters, key in ((self._day_counts, appointment.date), 
+                                  (self._service_counts, appointment.service)):
+                bucket = counters.get(key)
+                if bucket is None:
+                    bucket = counters[key] = Counter()
+                bucket[appointment.status] += delta
+                if not any(bucket.values()):
+                    del counters[key]
+    
+    def _index_appointment(self, appointment: Appointment):
+        """Registra um agendamento nos contadores e nos índices de horários e de clientes"""
+        self._update_counters(appointment, 1)
+        self._day_ids.setdefault(appointment.date, set()).add(appointment.id)
+        
+        if appointment.status == 'cancelled':
+            return
+        phone = normalize_phone_number(appointment.client_phone)
+        with self._index_lock:
+            self._phone_index.setdefault(phone, set()).add(appointment.id)
+        
+        if appointment.status != 'confirmed':
+            return
+        barber_id = self._appointment_barber(appointment)
+        start, end = self._appointment_interval(appointment)
+        bisect.insort(self._intervals.setdefault((barber_id, appointment.date), []), (start, end, appointment.id))
+        self._refresh_occupancy(barber_id, appointment.date, start, end)
+        self._update_barber_load(barber_id, appointment.date, 1)
+        self._invalidate_availability(appointment.date)
+        
+        appointment_datetime = datetime.datetime.combine(appointment.date, appointment.time)
+        with self._index_lock:
+            bisect.insort(self._timeline, (appointment_datetime, appointment.id))
+    
+    def _unindex_appointment(self, appointment: Appointment):
+        """Remove um agendamento dos contadores e dos índices de horários e de clientes"""
+        self._update_counters(appointment, -1)
+        
+        day_ids = self._day_ids.get(appointment.date)
+        if day_ids is not None:
+            day_ids.discard(appointment.id)
+            if not day_ids:
+                del self._day_ids[appointment.date]
+        
+        phone = normalize_phone_number(appointment.client_phone)
+        key = (datetime.datetime.combine(appointment.date, appointment.time), appointment.id)
+        with self._index_lock:
+            client_ids = self._phone_index.get(phone)
+            if client_ids is not None:
+                client_ids.discard(appointment.id)
+                if not client_ids:
+                    del self._phone_index[phone]
             
-            # Avança para o próximo horário (incluindo buffer)
-            current_minutes = current_time.hour * 60 + current_time.minute
-            next_minutes = current_minutes + self.appointment_duration + self.buffer_time
-            current_time = datetime.time(
-                hour=next_minutes // 60,
-                minute=next_minutes % 60
-            )
+            position = bisect.bisect_left(self._timeline, key)
+            if position < len(self._timeline) and self._timeline[position] == key:
+                del self._timeline[position]
         
-        return slots
+        barber_id = self._appointment_barber(appointment)
+        intervals = self._intervals.get((barber_id, appointment.date))
+        if intervals is None:
+            return
+        start = self._to_minutes(appointment.time)
+        position = bisect.bisect_left(intervals, start, key=lambda interval: interval[0])
+        while position < len(intervals) and intervals[position][0] == start:
+            if intervals[position][2] == appointment.id:
+                _, end, _ = intervals.pop(position)
+                if not intervals:
+                    del self._intervals[(barber_id, appointment.date)]
+                self._refresh_occupancy(barber_id, appointment.date, start, end)
+                self._update_barber_load(barber_id, appointment.date, -1)
+                self._invalidate_availability(appointment.date)
+                self._freed_slots.append((appointment.date, start, end))
+                break
+            position += 1
     
-    def is_time_slot_available(self, date: datetime.date, time: datetime.time) -> bool:
-        """Verifica se um horário específico está disponível"""
-        for appointment in self.appointments.values():
-            if (appointment.date == date and 
-                appointment.time == time and 
-                appointment.status == 'confirmed'):
-                return False
-        return True
+    def _free_slot_mask(self, date: datetime.date, barber_id: Optional[str] = None, 
+                        duration: Optional[int] = None) -> Tuple[Tuple[datetime.time, ...], int]:
+        """
+        Retorna a grade do dia e o mapa de bits dos horários livres
+        
+        Sem barbeiro informado, combina os mapas de todos os barbeiros (livre em algum deles).
+        Com o ledger, os bitmaps do dia vêm do Redis em uma única leitura e a
+        duração do serviço já é considerada (padrão: appointment_duration).
+        """
+        template = self._get_slot_template(date)
+        if template is None:
+            return (), 0
+        
+        if self.ledger is not None:
+            step = (duration or self.appointment_duration) + self.buffer_time
+            bitmaps = self.ledger.read_day(date, self._resolve_barbers(date, barber_id)).values()
+            free = 0
+            for position, minutes in enumerate(template.minutes):
+                if any(self.ledger.is_free(bitmap, minutes, minutes + step) for bitmap in bitmaps):
+                    free |= 1 << position
+            return template.times, free
+        
+        full_mask = (1 << len(template.times)) - 1
+        free = 0
+        for barber in self._resolve_barbers(date, barber_id):
+            free |= full_mask & ~self._occupancy.get((barber, date), 0)
+            if free == full_mask:
+                break
+        return template.times, free
     
-    def get_appointment_id_for_time(self, date: datetime.date, time: datetime.time) -> Optional[str]:
-        """Retorna o ID do agendamento para um horário específico"""
-        for appointment in self.appointments.values():
-            if (appointment.date == date and 
-                appointment.time == time and 
-                appointment.status == 'confirmed'):
-                return appointment.id
-        return None
+    def _booking_window(self, start_date: Optional[datetime.date] = None) -> List[datetime.date]:
+        """Retorna as datas da janela de agendamento antecipado"""
+        today = datetime.date.today()
+        first_date = max(start_date or today, today)
+        last_date = today + datetime.timedelta(days=self.advance_booking_days)
+        return [
+            first_date + datetime.timedelta(days=offset)
+            for offset in range((last_date - first_date).days + 1)
+        ]
+    
+    def find_free_slots(self, limit: int = 5, 
+                        start_date: Optional[datetime.date] = None, 
+                        barber_id: Optional[str] = None) -> List[Tuple[datetime.date, datetime.time]]:
+        """
+        Retorna os primeiros horários livres dentro da janela de agendamento
+        
+        Args:
+            limit: Quantidade máxima de horários retornados
+            start_date: Data inicial da busca (padrão: hoje)
+            barber_id: Barbeiro desejado (padrão: qualquer barbeiro)
+            
+        Returns:
+            List[Tuple[datetime.date, datetime.time]]: (data, horário) em ordem cronológica
+        """
+        found = []
+        for date in self._booking_window(start_date):
+            grid, free = self._free_slot_mask(date, barber_id)
+            while free and len(found) < limit:
+                lowest = free & -free
+                found.append((date, grid[lowest.bit_length() - 1]))
+                free ^= lowest
+            if len(found) >= limit:
+                break
+        return found
+    
+    def get_days_with_availability(self, start_date: Optional[datetime.date] = None, 
+                                   limit: Optional[int] = None, 
+                                   barber_id: Optional[str] = None) -> List[datetime.date]:
+        """Retorna as datas da janela de agendamento que têm algum horário livre"""
+        days = []
+        for date in self._booking_window(start_date):
+            _, free = self._free_slot_mask(date, barber_id)
+            if free:
+                days.append(date)
+                if limit is not None and len(days) >= limit:
+                    break
+        return days
+    
+    def find_fitting_times(self, date: datetime.date, service: Optional[str] = None, 
+                           duration: Optional[int] = None, 
+                           barber_id: Optional[str] = None) -> List[datetime.time]:
+        """
+        Retorna os horários em que um serviço cabe na agenda do dia
+        
+        Args:
+            date: Data desejada
+            service: Nome do serviço (define a duração)
+            duration: Duração em minutos (tem prioridade sobre o serviço)
+            barber_id: Barbeiro desejado (padrão: qualquer barbeiro)
+            
+        Returns:
+            List[datetime.time]: Horários de início possíveis, a cada time_granularity minutos
+        """
+        template = self._get_slot_template(date)
+        if template is None:
+            return []
+        
+        if duration is None:
+            duration = self.get_service_duration(service)
+        day_start = self._to_minutes(template.start)
+        day_end = self._to_minutes(template.end)
+        
+        if self.ledger is not None:
+            bitmaps = self.ledger.read_day(date, self._resolve_barbers(date, barber_id)).values()
+            return [
+                datetime.time(hour=minutes // 60, minute=minutes % 60)
+                for minutes in range(day_start, day_end - duration + 1, self.time_granularity)
+                if any(self.ledger.is_free(bitmap, minutes, minutes + duration + self.buffer_time) 
+                       for bitmap in bitmaps)
+            ]
+        
+        # Percorre as lacunas entre os intervalos ocupados (já ordenados) de cada barbeiro
+        fitting = set()
+        for barber in self._resolve_barbers(date, barber_id):
+            gap_start = day_start
+            intervals = self._intervals.get((barber, date), []) + [(day_end + self.buffer_time, None, None)]
+            for interval_start, interval_end, _ in intervals:
+                candidate = day_start + -(-(gap_start - day_start) // self.time_granularity) * self.time_granularity
+                while candidate + duration + self.buffer_time <= interval_start and candidate + duration <= day_end:
+                    fitting.add(candidate)
+                    candidate += self.time_granularity
+                if interval_end is not None:
+                    gap_start = max(gap_start, interval_end)
+        
+        return [datetime.time(hour=minutes // 60, minute=minutes % 60) for minutes in sorted(fitting)]
+    
+    def is_time_slot_available(self, date: datetime.date, time: datetime.time, 
+                               service: Optional[str] = None, 
+                               barber_id: Optional[str] = None) -> bool:
+        """Verifica se um horário está disponível para o serviço (com o barbeiro ou com qualquer um)"""
+        start = self._to_minutes(time)
+        end = start + self.get_service_duration(service) + self.buffer_time
+        barbers = self._resolve_barbers(date, barber_id)
+        if self.ledger is not None:
+            bitmaps = self.ledger.read_day(date, barbers).values()
+            return any(self.ledger.is_free(bitmap, start, end) for bitmap in bitmaps)
+        return any(self._find_conflict(barber, date, start, end) is None for barber in barbers)
     
-    def get_available_slots(self, date: datetime.date) -> List[TimeSlot]:
+    def get_appointment_id_for_time(self, date: datetime.date, time: datetime.time, 
+                                    barber_id: Optional[str] = None) -> Optional[str]:
+        """Retorna o ID do agendamento que ocupa um horário específico"""
+        start = self._to_minutes(time)
+        return self._find_conflict_any(date, start, start + self.appointment_duration + self.buffer_time, barber_id)
+    
+    def get_available_slots(self, date: datetime.date, service: Optional[str] = None, 
+                            barber_id: Optional[str] = None) -> List[TimeSlot]:
         """Retorna apenas os horários disponíveis para uma data"""
-        all_slots = self.generate_time_slots(date)
-        return [slot for slot in all_slots if slot.available]
+        # Serviços com a mesma duração compartilham a entrada do cache
+        duration = self.get_service_duration(service)
+        return self._cached(date, f"available:{duration}:{barber_id or '*'}", 
+                            lambda: self._compute_available_slots(date, service, barber_id))
+    
+    def _compute_available_slots(self, date: datetime.date, service: Optional[str] = None, 
+                                 barber_id: Optional[str] = None) -> List[TimeSlot]:
+        duration = self.get_service_duration(service)
+        grid, free = self._free_slot_mask(date, barber_id, duration)
+        available_slots = [
+            TimeSlot(time=slot_time, available=True)
+            for position, slot_time in enumerate(grid) if free >> position & 1
+        ]
+        if duration == self.appointment_duration or self.ledger is not None:
+            return available_slots
+        
+        if duration < self.appointment_duration:
+            # Serviços mais curtos podem caber em horários da grade ocupados para a duração padrão
+            return [
+                TimeSlot(time=slot_time, available=True)
+                for slot_time in grid if self.is_time_slot_available(date, slot_time, service, barber_id)
+            ]
+        
+        # Serviços mais longos precisam que o intervalo inteiro esteja livre
+        return [
+            slot for slot in available_slots 
+            if self.is_time_slot_available(date, slot.time, service, barber_id)
+        ]
     
     def can_book_advance(self, date: datetime.date) -> bool:
         """Verifica se pode agendar com antecedência"""
@@ -118,45 +845,231 @@ class BarberScheduler:
         max_date = today + datetime.timedelta(days=self.advance_booking_days)
         return date <= max_date
     
+    def _validate_booking(self, date: datetime.date, barber_id: Optional[str] = None, 
+                          time: Optional[datetime.time] = None) -> Optional[str]:
+        """
+        Valida dia, horário, antecedência e barbeiro de uma reserva (retorna a mensagem de erro, se houver)
+        
+        Usada por criação e remarcação (inclusive em lote). O horário precisa estar
+        no expediente do dia, como os horários da grade.
+        """
+        plan = self._day_plan(date)
+        if plan.template is None:
+            if plan.reason:
+                return f"Desculpe, não abriremos neste dia ({plan.reason})."
+            return "Desculpe, não trabalhamos neste dia da semana."
+        
+        if time is not None and not plan.template.start <= time < plan.template.end:
+            return (f"Desculpe, neste dia atendemos das {plan.template.start.strftime('%H:%M')} "
+                    f"às {plan.template.end.strftime('%H:%M')}.")
+        
+        if not self.can_book_advance(date):
+            return f"Desculpe, só aceitamos agendamentos com até {self.advance_booking_days} dias de antecedência."
+        
+        if barber_id is not None and barber_id not in self.barbers:
+            return "Desculpe, não encontrei este barbeiro."
+        if barber_id in plan.absent_barbers:
+            return "Desculpe, este barbeiro não atende neste dia."
+        return None
+    
+    def _shared_interval(self, appointment: Appointment) -> Optional[Tuple[str, datetime.date, int, int]]:
+        """Retorna o intervalo do agendamento no ledger (None se ele não ocupa horário)"""
+        if appointment.status != 'confirmed':
+            return None
+        start, end = self._appointment_interval(appointment)
+        return self._appointment_barber(appointment), appointment.date, start, end
+    
+    def _claim_slot(self, appointment_id: str, date: datetime.date, start: int, end: int, 
+                    barber_id: Optional[str] = None, preferred: Optional[str] = None, 
+                    old: Optional[Tuple[str, datetime.date, int, int]] = None) -> Optional[str]:
+        """
+        Escolhe o barbeiro do intervalo [start, end) e, com o ledger, reserva o horário nele
+        
+        Com barbeiro informado, só ele é considerado; senão, o preferido (barbeiro
+        atual na remarcação) e depois os menos ocupados do dia. Com o ledger, a
+        reserva (ou a troca a partir de old) é atômica no Redis, então vale também
+        contra reservas feitas por outros processos.
+        """
+        if self.ledger is None:
+            if barber_id is not None:
+                return None if self._find_conflict(barber_id, date, start, end, ignore_id=appointment_id) else barber_id
+            if (preferred is not None and preferred not in self._day_plan(date).absent_barbers and 
+                    not self._find_conflict(preferred, date, start, end, ignore_id=appointment_id)):
+                return preferred
+            return self._pick_barber(date, start, end, ignore_id=appointment_id)
+        
+        loads = self._barber_loads.get(date, Counter())
+        candidates = [barber_id] if barber_id is not None else sorted(
+            self._resolve_barbers(date), key=lambda barber: (barber != preferred, loads[barber], barber)
+        )
+        for candidate in candidates:
+            if self.ledger.transition(appointment_id, old, (candidate, date, start, end)):
+                return candidate
+        return None
+    
+    def _create_locked(self, client_name: str, client_phone: str, date: datetime.date, 
+                       time: datetime.time, service: str, barber_id: Optional[str]):
+        """
+        Cria o agendamento (o lock da data já deve estar adquirido)
+        
+        Returns:
+            ((sucesso, mensagem, appointment_id), função que desfaz a criação ou None)
+        """
+        error = self._validate_booking(date, barber_id, time)
+        if error:
+            return (False, error, None), None
+        
+        start = self._to_minutes(time)
+        end = start + self.get_service_duration(service) + self.buffer_time
+        appointment_id = id_allocator.next_id()
+        barber_id = self._claim_slot(appointment_id, date, start, end, barber_id)
+        
+        if barber_id is None:
+            return (False, "Desculpe, este horário não está mais disponível.", None), None
+        
+        appointment = Appointment(
+            id=appointment_id,
+            client_name=client_name,
+            client_phone=client_phone,
+            date=date,
+            time=time,
+            service=service,
+            status='confirmed',
+            created_at=datetime.datetime.now(),
+            updated_at=datetime.datetime.now(),
+            barber_id=barber_id
+        )
+        
+        self._store_appointment(appointment)
+        self._index_appointment(appointment)
+        logger.info(f"Agendamento criado: {appointment_id} para {client_name} em {date} às {time}")
+        
+        def undo():
+            if self.ledger is not None:
+                self.ledger.transition(appointment_id, (barber_id, date, start, end), None)
+            self._unindex_appointment(self.appointments[appointment_id])
+            with self._index_lock:
+                del self.appointments[appointment_id]
+        
+        return (True, "Agendamento realizado com sucesso!", appointment_id), undo
+    
+    def _undo_changes(self, appointment: Appointment):
+        """Retorna uma função que restaura os campos mutáveis do agendamento ao estado atual"""
+        appointment_id = appointment.id
+        previous = {field: getattr(appointment, field) 
+                    for field in ('date', 'time', 'status', 'barber_id', 'updated_at')}
+        previous_interval = self._shared_interval(appointment)
+        
+        def undo():
+            current = self.appointments[appointment_id]
+            if (self.ledger is not None and 
+                    not self.ledger.transition(appointment_id, self._shared_interval(current), previous_interval)):
+                logger.error(f"Não foi possível restaurar o horário de {appointment_id} no ledger: ocupado por outro processo")
+            self._unindex_appointment(current)
+            for field, value in previous.items():
+                setattr(current, field, value)
+            self._index_appointment(current)
+            self._store_appointment(current)
+        
+        return undo
+    
+    def _cancel_locked(self, appointment_id: str):
+        """Cancela o agendamento (o lock da data do agendamento já deve estar adquirido)"""
+        appointment = self.appointments.get(appointment_id)
+        if appointment is None:
+            return (False, "Agendamento não encontrado."), None
+        if appointment.status == 'cancelled':
+            return (False, "Este agendamento já foi cancelado."), None
+        
+        undo = self._undo_changes(appointment)
+        if self.ledger is not None:
+            self.ledger.transition(appointment_id, self._shared_interval(appointment), None)
+        self._unindex_appointment(appointment)
+        appointment.status = 'cancelled'
+        appointment.updated_at = datetime.datetime.now()
+        self._index_appointment(appointment)
+        self._store_appointment(appointment)
+        
+        logger.info(f"Agendamento cancelado: {appointment_id}")
+        return (True, "Agendamento cancelado com sucesso!"), undo
+    
+    def _reschedule_locked(self, appointment_id: str, new_date: datetime.date, 
+                           new_time: datetime.time, new_barber_id: Optional[str]):
+        """Remarca o agendamento (os locks da data atual e da nova data já devem estar adquiridos)"""
+        # Mesmas regras da criação: dia aberto, expediente, antecedência e barbeiro
+        error = self._validate_booking(new_date, new_barber_id, new_time)
+        if error:
+            return (False, error), None
+        
+        appointment = self.appointments.get(appointment_id)
+        if appointment is None:
+            return (False, "Agendamento não encontrado."), None
+        if appointment.status == 'cancelled':
+            return (False, "Não é possível remarcar um agendamento cancelado."), None
+        
+        # Verifica se o novo horário está disponível (ignorando o próprio agendamento)
+        new_start = self._to_minutes(new_time)
+        new_end = new_start + self.get_service_duration(appointment.service) + self.buffer_time
+        undo = self._undo_changes(appointment)
+        candidate = self._claim_slot(
+            appointment_id, new_date, new_start, new_end, new_barber_id, 
+            preferred=self._appointment_barber(appointment), old=self._shared_interval(appointment)
+        )
+        
+        if candidate is None:
+            return (False, "Desculpe, este horário não está disponível."), None
+        
+        # Atualiza o agendamento
+        old_date = appointment.date
+        old_time = appointment.time
+        
+        self._unindex_appointment(appointment)
+        appointment.date = new_date
+        appointment.time = new_time
+        appointment.barber_id = candidate
+        appointment.updated_at = datetime.datetime.now()
+        self._index_appointment(appointment)
+        self._store_appointment(appointment)
+        
+        logger.info(f"Agendamento remarcado: {appointment_id} de {old_date} {old_time} para {new_date} {new_time}")
+        return (True, "Agendamento remarcado com sucesso!"), undo
+    
+    def _current_dates(self, appointment_ids: List[str]) -> Dict[str, datetime.date]:
+        """Lê a data atual de cada agendamento existente (para saber quais locks adquirir)"""
+        dates = {}
+        for appointment_id in appointment_ids:
+            appointment = self.appointments.get(appointment_id)
+            if appointment is not None:
+                dates[appointment_id] = appointment.date
+        return dates
+    
+    def _dates_unchanged(self, dates: Dict[str, datetime.date]) -> bool:
+        """Confere, já com os locks, se nenhum agendamento mudou de data desde a leitura"""
+        for appointment_id, date in dates.items():
+            appointment = self.appointments.get(appointment_id)
+            if appointment is None or appointment.date != date:
+                return False
+        return True
+    
     def create_appointment(self, client_name: str, client_phone: str, 
                          date: datetime.date, time: datetime.time, 
-                         service: str = "Corte") -> Tuple[bool, str, Optional[str]]:
+                         service: str = "Corte", 
+                         barber_id: Optional[str] = None) -> Tuple[bool, str, Optional[str]]:
         """
         Cria um novo agendamento
         
+        Sem barbeiro informado, o agendamento vai para o barbeiro menos ocupado no dia
+        que esteja livre no horário.
+        
         Returns:
             Tuple[bool, str, Optional[str]]: (sucesso, mensagem, appointment_id)
         """
         try:
-            # Validações
-            if not self.is_working_day(date):
-                return False, "Desculpe, não trabalhamos neste dia da semana.", None
-            
-            if not self.can_book_advance(date):
-                return False, f"Desculpe, só aceitamos agendamentos com até {self.advance_booking_days} dias de antecedência.", None
-            
-            if not self.is_time_slot_available(date, time):
-                return False, "Desculpe, este horário não está mais disponível.", None
-            
-            # Cria o agendamento
-            appointment_id = f"apt_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}_{client_phone[-4:]}"
-            
-            appointment = Appointment(
-                id=appointment_id,
-                client_name=client_name,
-                client_phone=client_phone,
-                date=date,
-                time=time,
-                service=service,
-                status='confirmed',
-                created_at=datetime.datetime.now(),
-                updated_at=datetime.datetime.now()
-            )
-            
-            self.appointments[appointment_id] = appointment
-            logger.info(f"Agendamento criado: {appointment_id} para {client_name} em {date} às {time}")
-            
-            return True, "Agendamento realizado com sucesso!", appointment_id
+            # Verificação e inserção sob o lock da data: duas reservas do mesmo
+            # horário não passam juntas pela verificação
+            with self._locked_dates(date):
+                result, _ = self._create_locked(client_name, client_phone, date, time, service, barber_id)
+            return result
             
         except Exception as e:
             logger.error(f"Erro ao criar agendamento: {str(e)}")
@@ -165,112 +1078,627 @@ class BarberScheduler:
     def cancel_appointment(self, appointment_id: str) -> Tuple[bool, str]:
         """Cancela um agendamento existente"""
         try:
-            if appointment_id not in self.appointments:
-                return False, "Agendamento não encontrado."
-            
-            appointment = self.appointments[appointment_id]
-            if appointment.status == 'cancelled':
-                return False, "Este agendamento já foi cancelado."
-            
-            appointment.status = 'cancelled'
-            appointment.updated_at = datetime.datetime.now()
+            while True:
+                dates = self._current_dates([appointment_id])
+                if not dates:
+                    return False, "Agendamento não encontrado."
+                
+                with self._locked_dates(*dates.values()):
+                    if not self._dates_unchanged(dates):
+                        # Remarcado ou removido por outra requisição antes do lock: tenta de novo
+                        continue
+                    result, _ = self._cancel_locked(appointment_id)
+                break
             
-            logger.info(f"Agendamento cancelado: {appointment_id}")
-            return True, "Agendamento cancelado com sucesso!"
+            self._offer_freed_slots()
+            return result
             
         except Exception as e:
             logger.error(f"Erro ao cancelar agendamento: {str(e)}")
             return False, "Desculpe, ocorreu um erro ao cancelar o agendamento."
     
     def reschedule_appointment(self, appointment_id: str, new_date: datetime.date, 
-                             new_time: datetime.time) -> Tuple[bool, str]:
-        """Remarca um agendamento existente"""
+                             new_time: datetime.time, 
+                             new_barber_id: Optional[str] = None) -> Tuple[bool, str]:
+        """
+        Remarca um agendamento existente
+        
+        Sem barbeiro informado, mantém o barbeiro atual se ele estiver livre no novo horário;
+        caso contrário, passa para o barbeiro menos ocupado que esteja livre.
+        """
         try:
-            if appointment_id not in self.appointments:
-                return False, "Agendamento não encontrado."
+            while True:
+                dates = self._current_dates([appointment_id])
+                if not dates:
+                    return False, "Agendamento não encontrado."
+                
+                # Trava o dia de origem e o de destino (na mesma ordem em todas as threads)
+                with self._locked_dates(*dates.values(), new_date):
+                    if not self._dates_unchanged(dates):
+                        # Remarcado ou removido por outra requisição antes do lock: tenta de novo
+                        continue
+                    result, _ = self._reschedule_locked(appointment_id, new_date, new_time, new_barber_id)
+                break
             
-            appointment = self.appointments[appointment_id]
-            if appointment.status == 'cancelled':
-                return False, "Não é possível remarcar um agendamento cancelado."
+            self._offer_freed_slots()
+            return result
             
-            # Verifica se o novo horário está disponível
-            if not self.is_time_slot_available(new_date, new_time):
-                return False, "Desculpe, este horário não está disponível."
+        except Exception as e:
+            logger.error(f"Erro ao remarcar agendamento: {str(e)}")
+            return False, "Desculpe, ocorreu um erro ao remarcar o agendamento."
+    
+    def _apply_batch(self, steps: List[Callable[[], tuple]], atomic: bool, 
+                     error_result: tuple) -> List[tuple]:
+        """
+        Executa os passos de um lote (os locks de todas as datas já devem estar adquiridos)
+        
+        Sem atomic, cada item tem o próprio resultado. Com atomic, a primeira falha
+        desfaz os itens já aplicados (em ordem inversa) e interrompe o lote.
+        """
+        results = []
+        undo_steps = []
+        # Armazenamento SQL: as escritas do lote (e as reversões) vão ao banco juntas, ao final
+        batch = getattr(self.appointments, "batch", None)
+        with batch() if batch is not None else nullcontext():
+            for step in steps:
+                try:
+                    result, undo = step()
+                except Exception as e:
+                    logger.error(f"Erro em item do lote: {str(e)}")
+                    result, undo = error_result, None
+                results.append(result)
+                if undo is not None:
+                    undo_steps.append(undo)
+                if atomic and not result[0]:
+                    break
+            
+            if atomic and not all(result[0] for result in results):
+                for undo in reversed(undo_steps):
+                    undo()
+                aborted = (False, "Item não aplicado: outro item do lote falhou.") + (None,) * (len(error_result) - 2)
+                results = [result if not result[0] else aborted for result in results]
+                results += [aborted] * (len(steps) - len(results))
+                logger.info(f"Lote desfeito: {len(undo_steps)} item(ns) revertido(s)")
+        
+        return results
+    
+    def create_appointments(self, bookings: List[Dict], 
+                            atomic: bool = False) -> List[Tuple[bool, str, Optional[str]]]:
+        """
+        Cria vários agendamentos de uma vez (ex: lista de clientes sem hora marcada do dia)
+        
+        Cada item tem as chaves de create_appointment: client_name, client_phone, date,
+        time e, opcionalmente, service e barber_id. Todos os itens são validados sob os
+        mesmos locks, então o lote vê um estado consistente (incluindo os itens anteriores
+        do próprio lote).
+        
+        Returns:
+            List[Tuple[bool, str, Optional[str]]]: (sucesso, mensagem, appointment_id) por item
+        """
+        steps = [
+            lambda booking=booking: self._create_locked(
+                booking["client_name"], booking["client_phone"], booking["date"], booking["time"],
+                booking.get("service", "Corte"), booking.get("barber_id")
+            )
+            for booking in bookings
+        ]
+        error_result = (False, "Desculpe, ocorreu um erro ao criar o agendamento. Tente novamente.", None)
+        if not bookings:
+            return []
+        
+        with self._locked_dates(*{booking["date"] for booking in bookings}):
+            results = self._apply_batch(steps, atomic, error_result)
+        # Lote atômico desfeito libera os horários reservados
+        self._offer_freed_slots()
+        return results
+    
+    def cancel_appointments(self, appointment_ids: List[str], 
+                            atomic: bool = False) -> List[Tuple[bool, str]]:
+        """Cancela vários agendamentos de uma vez (resultado por item, ver create_appointments)"""
+        steps = [lambda appointment_id=appointment_id: self._cancel_locked(appointment_id)
+                 for appointment_id in appointment_ids]
+        error_result = (False, "Desculpe, ocorreu um erro ao cancelar o agendamento.")
+        if not appointment_ids:
+            return []
+        
+        while True:
+            dates = self._current_dates(appointment_ids)
+            with self._locked_dates(*dates.values()):
+                if self._dates_unchanged(dates):
+                    results = self._apply_batch(steps, atomic, error_result)
+                    break
+        self._offer_freed_slots()
+        return results
+    
+    def reschedule_appointments(self, moves: List[Dict], 
+                                atomic: bool = False) -> List[Tuple[bool, str]]:
+        """
+        Remarca vários agendamentos de uma vez (ex: clientes de um barbeiro que faltou)
+        
+        Cada item tem as chaves de reschedule_appointment: appointment_id, new_date,
+        new_time e, opcionalmente, new_barber_id.
+        """
+        steps = [
+            lambda move=move: self._reschedule_locked(
+                move["appointment_id"], move["new_date"], move["new_time"], move.get("new_barber_id")
+            )
+            for move in moves
+        ]
+        error_result = (False, "Desculpe, ocorreu um erro ao remarcar o agendamento.")
+        if not moves:
+            return []
+        new_dates = {move["new_date"] for move in moves}
+        
+        while True:
+            dates = self._current_dates([move["appointment_id"] for move in moves])
+            with self._locked_dates(*dates.values(), *new_dates):
+                if self._dates_unchanged(dates):
+                    results = self._apply_batch(steps, atomic, error_result)
+                    break
+        self._offer_freed_slots()
+        return results
+    
+    def _waitlist_minutes(self, date: datetime.date, earliest: datetime.time, 
+                          latest: datetime.time) -> List[int]:
+        """Horários da grade da data (em minutos) dentro da janela [earliest, latest]"""
+        template = self._get_slot_template(date)
+        if template is None:
+            return []
+        first = bisect.bisect_left(template.minutes, self._to_minutes(earliest))
+        last = bisect.bisect_right(template.minutes, self._to_minutes(latest))
+        return list(template.minutes[first:last])
+    
+    def join_waitlist(self, client_name: str, client_phone: str, date: datetime.date, 
+                      earliest: Optional[datetime.time] = None, 
+                      latest: Optional[datetime.time] = None, 
+                      service: str = "Corte", 
+                      barber_id: Optional[str] = None) -> Tuple[bool, str, Optional[str]]:
+        """
+        Coloca o cliente na lista de espera de uma data
+        
+        Quando um cancelamento ou remarcação libera um horário da janela
+        [earliest, latest] (padrão: o dia todo), o cliente mais antigo da lista
+        em que o serviço caiba recebe a oferta (ver waitlist_notifier).
+        
+        Returns:
+            Tuple[bool, str, Optional[str]]: (sucesso, mensagem, ID da entrada)
+        """
+        try:
+            error = self._validate_booking(date, barber_id)
+            if error:
+                return False, error, None
             
-            # Atualiza o agendamento
-            old_date = appointment.date
-            old_time = appointment.time
+            template = self._get_slot_template(date)
+            minutes = self._waitlist_minutes(date, earliest or template.start, latest or template.end)
+            if not minutes:
+                return False, "Desculpe, não há horários nesta faixa de horário.", None
             
-            appointment.date = new_date
-            appointment.time = new_time
-            appointment.updated_at = datetime.datetime.now()
+            self.expire_waitlist_offers()
+            with self._waitlist_lock:
+                sequence = next(self._waitlist_sequence)
+                entry = WaitlistEntry(
+                    id=f"wl_{sequence}",
+                    client_name=client_name,
+                    client_phone=client_phone,
+                    date=date,
+                    earliest=earliest or template.start,
+                    latest=latest or template.end,
+                    service=service,
+                    status='waiting',
+                    created_at=datetime.datetime.now(),
+                    barber_id=barber_id
+                )
+                self._waitlist[entry.id] = entry
+                for slot_minutes in minutes:
+                    heapq.heappush(self._waitlist_heaps.setdefault((date, slot_minutes), []), (sequence, entry.id))
             
-            logger.info(f"Agendamento remarcado: {appointment_id} de {old_date} {old_time} para {new_date} {new_time}")
-            return True, "Agendamento remarcado com sucesso!"
+            logger.info(f"Cliente {client_name} na lista de espera de {date} ({entry.id})")
+            return True, "Você está na lista de espera! Avisaremos se um horário vagar.", entry.id
             
         except Exception as e:
-            logger.error(f"Erro ao remarcar agendamento: {str(e)}")
-            return False, "Desculpe, ocorreu um erro ao remarcar o agendamento."
+            logger.error(f"Erro ao entrar na lista de espera: {str(e)}")
+            return False, "Desculpe, ocorreu um erro ao entrar na lista de espera.", None
+    
+    def leave_waitlist(self, entry_id: str) -> Tuple[bool, str]:
+        """Remove o cliente da lista de espera (as entradas nos heaps saem de forma preguiçosa)"""
+        with self._waitlist_lock:
+            entry = self._waitlist.pop(entry_id, None)
+            if entry is None:
+                return False, "Entrada da lista de espera não encontrada."
+            entry.status = 'cancelled'
+            offer = self._discard_offer(entry_id)
+        
+        if offer is not None:
+            self._reoffer(offer)
+        logger.info(f"Entrada removida da lista de espera: {entry_id}")
+        return True, "Você saiu da lista de espera."
+    
+    def get_waitlist_offer(self, client_phone: str) -> Optional[WaitlistOffer]:
+        """Retorna a oferta em aberto para o telefone do cliente, se houver"""
+        self.expire_waitlist_offers()
+        with self._waitlist_lock:
+            entry_id = self._offers_by_phone.get(normalize_phone_number(client_phone))
+            return self._waitlist_offers.get(entry_id) if entry_id is not None else None
+    
+    def accept_waitlist_offer(self, entry_id: str) -> Tuple[bool, str, Optional[str]]:
+        """
+        Aceita a oferta: reserva o horário oferecido para o cliente
+        
+        Returns:
+            Tuple[bool, str, Optional[str]]: (sucesso, mensagem, appointment_id)
+        """
+        self.expire_waitlist_offers()
+        with self._waitlist_lock:
+            offer = self._discard_offer(entry_id)
+            entry = self._waitlist.get(entry_id)
+            if offer is None or entry is None:
+                return False, "Desculpe, esta oferta expirou.", None
+        
+        success, message, appointment_id = self.create_appointment(
+            entry.client_name, entry.client_phone, offer.date, offer.time, offer.service, offer.barber_id
+        )
+        
+        with self._waitlist_lock:
+            if success:
+                entry.status = 'booked'
+                self._waitlist.pop(entry_id, None)
+            elif entry.status == 'offered':
+                # Horário tomado antes da resposta: continua na lista para os próximos
+                entry.status = 'waiting'
+        
+        if success:
+            logger.info(f"Oferta da lista de espera aceita: {entry_id} -> {appointment_id}")
+        return success, message, appointment_id
+    
+    def decline_waitlist_offer(self, entry_id: str) -> Tuple[bool, str]:
+        """Recusa a oferta (o cliente continua na lista) e oferece o horário ao próximo"""
+        with self._waitlist_lock:
+            offer = self._discard_offer(entry_id)
+            entry = self._waitlist.get(entry_id)
+            if offer is None:
+                return False, "Esta oferta não está mais em aberto."
+            if entry is not None:
+                entry.status = 'waiting'
+        
+        self._reoffer(offer)
+        return True, "Tudo bem! Você continua na lista de espera."
+    
+    def expire_waitlist_offers(self):
+        """
+        Expira as ofertas vencidas e oferece os horários aos próximos da lista
+        
+        Só olha o topo do heap de expiração: O(1) quando nada venceu, então pode
+        ser chamado a cada mensagem recebida.
+        """
+        if not self._offer_expiry or self._offer_expiry[0][0] > datetime.datetime.now():
+            return
+        
+        expired = []
+        with self._waitlist_lock:
+            now = datetime.datetime.now()
+            while self._offer_expiry and self._offer_expiry[0][0] <= now:
+                expires_at, entry_id = heapq.heappop(self._offer_expiry)
+                offer = self._waitlist_offers.get(entry_id)
+                if offer is None or offer.expires_at != expires_at:
+                    # Oferta já aceita, recusada ou substituída
+                    continue
+                self._discard_offer(entry_id)
+                entry = self._waitlist.get(entry_id)
+                if entry is not None:
+                    entry.status = 'waiting'
+                expired.append(offer)
+        
+        for offer in expired:
+            logger.info(f"Oferta da lista de espera expirada: {offer.entry_id}")
+            self._reoffer(offer)
+    
+    def _discard_offer(self, entry_id: str) -> Optional[WaitlistOffer]:
+        """Remove a oferta em aberto da entrada (o _waitlist_lock já deve estar adquirido)"""
+        offer = self._waitlist_offers.pop(entry_id, None)
+        if offer is not None:
+            phone = normalize_phone_number(offer.client_phone)
+            if self._offers_by_phone.get(phone) == entry_id:
+                del self._offers_by_phone[phone]
+        return offer
+    
+    def _reoffer(self, offer: WaitlistOffer):
+        """Oferece aos próximos da lista um horário cuja oferta não foi aproveitada"""
+        start = self._to_minutes(offer.time)
+        self._freed_slots.append((offer.date, start, start + self.get_service_duration(offer.service) + self.buffer_time))
+        self._offer_freed_slots()
+    
+    def _offer_freed_slots(self):
+        """
+        Oferece à lista de espera os intervalos liberados por cancelamentos e remarcações
+        
+        Chamado depois de soltar os locks das datas (o envio da oferta é lento).
+        Cada horário da grade que se sobrepõe ao intervalo liberado é consultado
+        no seu heap: O(log n) por horário, sem percorrer a lista de espera.
+        """
+        self.expire_waitlist_offers()
+        offers = []
+        while self._freed_slots:
+            try:
+                date, start, end = self._freed_slots.popleft()
+            except IndexError:
+                break
+            if not self._waitlist_heaps or date < datetime.date.today():
+                continue
+            with self._locked_dates(date):
+                offers += self._match_waitlist(date, start, end)
+        
+        for offer in offers:
+            self._notify_waitlist(offer)
+    
+    def _match_waitlist(self, date: datetime.date, start: int, end: int) -> List[WaitlistOffer]:
+        """Escolhe os clientes da lista para os horários livres em [start, end) (lock da data adquirido)"""
+        template = self._get_slot_template(date)
+        if template is None:
+            return []
+        # Horários que começam antes do intervalo também ganham espaço para serviços longos
+        longest = max([self.appointment_duration, *self.service_durations.values()]) + self.buffer_time
+        first = bisect.bisect_right(template.minutes, start - longest)
+        last = bisect.bisect_left(template.minutes, end)
+        
+        offers = []
+        offered_until = 0
+        with self._waitlist_lock:
+            for slot_minutes in template.minutes[first:last]:
+                heap = self._waitlist_heaps.get((date, slot_minutes))
+                if not heap or slot_minutes < offered_until:
+                    continue
+                
+                slot_time = datetime.time(hour=slot_minutes // 60, minute=slot_minutes % 60)
+                chosen = None
+                skipped = []
+                while heap:
+                    sequence, entry_id = heapq.heappop(heap)
+                    entry = self._waitlist.get(entry_id)
+                    if entry is None:
+                        # Entrada que saiu da lista (remoção preguiçosa)
+                        continue
+                    skipped.append((sequence, entry_id))
+                    # Uma oferta em aberto por telefone
+                    if (entry.status == 'waiting' and 
+                            normalize_phone_number(entry.client_phone) not in self._offers_by_phone and 
+                            self.is_time_slot_available(date, slot_time, entry.service, entry.barber_id)):
+                        chosen = entry
+                        # Quem recebe a oferta sai do heap deste horário
+                        skipped.pop()
+                        break
+                
+                for item in skipped:
+                    heapq.heappush(heap, item)
+                if not heap:
+                    del self._waitlist_heaps[(date, slot_minutes)]
+                if chosen is None:
+                    continue
+                
+                offer = WaitlistOffer(
+                    entry_id=chosen.id,
+                    client_phone=chosen.client_phone,
+                    date=date,
+                    time=slot_time,
+                    service=chosen.service,
+                    expires_at=datetime.datetime.now() + datetime.timedelta(seconds=self.waitlist_offer_ttl),
+                    barber_id=chosen.barber_id
+                )
+                chosen.status = 'offered'
+                self._waitlist_offers[chosen.id] = offer
+                self._offers_by_phone[normalize_phone_number(chosen.client_phone)] = chosen.id
+                heapq.heappush(self._offer_expiry, (offer.expires_at, chosen.id))
+                offers.append(offer)
+                # Não oferece horários sobrepostos ao já oferecido
+                offered_until = slot_minutes + self.get_service_duration(chosen.service) + self.buffer_time
+        
+        return offers
+    
+    def _notify_waitlist(self, offer: WaitlistOffer):
+        """Envia a oferta ao cliente pelo notificador registrado"""
+        logger.info(f"Horário {offer.date} {offer.time} oferecido à lista de espera ({offer.entry_id})")
+        if self.waitlist_notifier is None:
+            return
+        try:
+            self.waitlist_notifier(offer)
+        except Exception as e:
+            logger.error(f"Erro ao enviar oferta da lista de espera: {str(e)}")
     
     def get_appointment_by_client(self, client_phone: str) -> List[Appointment]:
         """Retorna todos os agendamentos de um cliente"""
-        return [
-            apt for apt in self.appointments.values() 
-            if apt.client_phone == client_phone and apt.status != 'cancelled'
-        ]
+        find_by_phone = getattr(self.appointments, "find_by_phone", None)
+        if find_by_phone is not None:
+            # Armazenamento SQL: consulta no banco, que também vê os outros processos
+            return sorted(find_by_phone(client_phone), key=lambda x: (x.date, x.time))
+        with self._index_lock:
+            client_ids = list(self._phone_index.get(normalize_phone_number(client_phone), ()))
+        appointments = [self.appointments[apt_id] for apt_id in client_ids]
+        return sorted(appointments, key=lambda x: (x.date, x.time))
     
     def get_appointment_by_date(self, date: datetime.date) -> List[Appointment]:
         """Retorna todos os agendamentos de uma data específica"""
-        return [
-            apt for apt in self.appointments.values() 
-            if apt.date == date and apt.status == 'confirmed'
-        ]
+        find_by_date = getattr(self.appointments, "find_by_date", None)
+        if find_by_date is not None:
+            return sorted(find_by_date(date), key=lambda x: x.time)
+        with self._locked_dates(date):
+            appointments = [
+                self.appointments[apt_id]
+                for barber in self.barbers
+                for _, _, apt_id in self._intervals.get((barber, date), [])
+            ]
+        return sorted(appointments, key=lambda x: x.time)
     
     def get_upcoming_appointments(self, hours_ahead: int = 24) -> List[Appointment]:
         """Retorna agendamentos próximos (próximas X horas)"""
         now = datetime.datetime.now()
         cutoff_time = now + datetime.timedelta(hours=hours_ahead)
         
-        upcoming = []
-        for appointment in self.appointments.values():
-            if appointment.status != 'confirmed':
-                continue
-                
-            appointment_datetime = datetime.datetime.combine(appointment.date, appointment.time)
-            if now <= appointment_datetime <= cutoff_time:
-                upcoming.append(appointment)
+        # Busca binária na linha do tempo: O(log n + k)
+        with self._index_lock:
+            first = bisect.bisect_left(self._timeline, now, key=lambda entry: entry[0])
+            last = bisect.bisect_right(self._timeline, cutoff_time, lo=first, key=lambda entry: entry[0])
+            upcoming = self._timeline[first:last]
         
-        return sorted(upcoming, key=lambda x: (x.date, x.time))
+        return [self.appointments[apt_id] for _, apt_id in upcoming]
     
     def get_appointment_statistics(self) -> Dict:
         """Retorna estatísticas dos agendamentos"""
-        total = len(self.appointments)
-        confirmed = len([apt for apt in self.appointments.values() if apt.status == 'confirmed'])
-        cancelled = len([apt for apt in self.appointments.values() if apt.status == 'cancelled'])
-        completed = len([apt for apt in self.appointments.values() if apt.status == 'completed'])
+        with self._stats_lock:
+            return self._build_statistics(self._status_counts)
+    
+    def get_day_statistics(self, date: datetime.date) -> Dict:
+        """Retorna estatísticas dos agendamentos de uma data"""
+        with self._stats_lock:
+            return self._build_statistics(self._day_counts.get(date, Counter()))
+    
+    def get_service_statistics(self, service: str) -> Dict:
+        """Retorna estatísticas dos agendamentos de um serviço"""
+        with self._stats_lock:
+            return self._build_statistics(self._service_counts.get(service, Counter()))
+    
+    def get_statistics_snapshot(self) -> Dict:
+        """Retorna uma cópia consistente de todos os contadores (total, por dia e por serviço)"""
+        with self._stats_lock:
+            return {
+                'totals': self._build_statistics(self._status_counts),
+                'by_day': {day: dict(+counts) for day, counts in self._day_counts.items()},
+                'by_service': {service: dict(+counts) for service, counts in self._service_counts.items()}
+            }
+    
+    @staticmethod
+    def _build_statistics(counts: Counter) -> Dict:
+        """Monta o dicionário de estatísticas a partir de um contador de status"""
+        total = sum(counts.values())
+        confirmed = counts['confirmed']
         
         return {
             'total': total,
             'confirmed': confirmed,
-            'cancelled': cancelled,
-            'completed': completed,
+            'cancelled': counts['cancelled'],
+            'completed': counts['completed'],
             'occupancy_rate': (confirmed / total * 100) if total > 0 else 0
         }
     
-    def cleanup_old_appointments(self, days_to_keep: int = 90):
-        """Remove agendamentos antigos para limpeza do sistema"""
+    def get_appointment_history(self, start_date: datetime.date, end_date: datetime.date, 
+                                include_archived: bool = False) -> List[Appointment]:
+        """
+        Retorna os agendamentos (de qualquer status) entre start_date e end_date, inclusive
+        
+        Só percorre as partições dos dias do intervalo; com include_archived, inclui
+        também os agendamentos já arquivados pela limpeza.
+        """
+        appointments = []
+        date = start_date
+        while date <= end_date:
+            with self._locked_dates(date):
+                appointments.extend(self.appointments[apt_id] for apt_id in self._day_ids.get(date, ()))
+            date += datetime.timedelta(days=1)
+        
+        if include_archived:
+            # Import local: agents.archive depende deste módulo
+            from agents.archive import read_archive
+            appointments.extend(read_archive(start_date, end_date))
+        
+        return sorted(appointments, key=lambda x: (x.date, x.time))
+    
+    def _drop_day(self, date: datetime.date, appointments: List[Appointment]):
+        """Descarta de uma vez os índices e contadores de um dia inteiro"""
+        for barber_id in {self._appointment_barber(appointment) for appointment in appointments}:
+            self._intervals.pop((barber_id, date), None)
+            self._occupancy.pop((barber_id, date), None)
+        self._barber_loads.pop(date, None)
+        self._load_heaps.pop(date, None)
+        self._day_ids.pop(date, None)
+        self._invalidate_availability(date)
+        if self.ledger is not None:
+            self.ledger.drop_day(date, {self._appointment_barber(appointment) for appointment in appointments})
+        
+        with self._stats_lock:
+            self._status_counts.subtract(self._day_counts.pop(date, Counter()))
+            for appointment in appointments:
+                bucket = self._service_counts.get(appointment.service)
+                if bucket is not None:
+                    bucket[appointment.status] -= 1
+                    if not any(bucket.values()):
+                        del self._service_counts[appointment.service]
+        
+        for appointment in appointments:
+            if appointment.status == 'cancelled':
+                continue
+            phone = normalize_phone_number(appointment.client_phone)
+            client_ids = self._phone_index.get(phone)
+            if client_ids is not None:
+                client_ids.discard(appointment.id)
+                if not client_ids:
+                    del self._phone_index[phone]
+    
+    def cleanup_old_appointments(self, days_to_keep: int = 90, archive: bool = False):
+        """
+        Remove agendamentos antigos para limpeza do sistema
+        
+        Descarta partições (dias) inteiras anteriores ao limite, sem percorrer os
+        demais agendamentos. Com archive=True, os agendamentos removidos são antes
+        gravados no arquivo comprimido (ver agents.archive.read_archive).
+        """
         cutoff_date = datetime.date.today() - datetime.timedelta(days=days_to_keep)
         
-        to_remove = []
-        for appointment_id, appointment in self.appointments.items():
-            if appointment.date < cutoff_date:
-                to_remove.append(appointment_id)
+        # Manutenção rara: trava todos os dias enquanto descarta as partições
+        with self._locked_dates(), self._index_lock:
+            old_days = [date for date in self._day_ids if date < cutoff_date]
+            partitions = {
+                date: [self.appointments[apt_id] for apt_id in self._day_ids[date]]
+                for date in old_days
+            }
+            
+            if archive and partitions:
+                from agents.archive import archive_appointments
+                archive_appointments(
+                    appointment for appointments in partitions.values() for appointment in appointments
+                )
+            
+            for date, appointments in partitions.items():
+                self._drop_day(date, appointments)
+            
+            # A linha do tempo é ordenada: os dias removidos formam um prefixo
+            cutoff = datetime.datetime.combine(cutoff_date, datetime.time.min)
+            del self._timeline[:bisect.bisect_left(self._timeline, cutoff, key=lambda entry: entry[0])]
+            
+            # Armazenamento SQL: os dias removidos vão ao banco juntos (DELETE ... IN), não linha a linha
+            removed = 0
+            batch = getattr(self.appointments, "batch", None)
+            with batch() if batch is not None else nullcontext():
+                for appointments in partitions.values():
+                    for appointment in appointments:
+                        del self.appointments[appointment.id]
+                    removed += len(appointments)
         
-        for appointment_id in to_remove:
-            del self.appointments[appointment_id]
+        # Listas de espera de dias que já passaram
+        today = datetime.date.today()
+        with self._waitlist_lock:
+            for key in [key for key in self._waitlist_heaps if key[0] < today]:
+                for _, entry_id in self._waitlist_heaps.pop(key):
+                    self._waitlist.pop(entry_id, None)
         
-        logger.info(f"Removidos {len(to_remove)} agendamentos antigos")
-        return len(to_remove)
+        logger.info(f"Removidos {removed} agendamentos antigos de {len(partitions)} dia(s)")
+        return removed
+
+def _create_default_store() -> Optional[MutableMapping[str, Appointment]]:
+    """Retorna o armazenamento da instância global (banco SQL ou journal, se habilitados)"""
+    backend = DATABASE_CONFIG["backend"]
+    if backend in ("postgres", "sqlite"):
+        if JOURNAL_CONFIG["enabled"]:
+            logger.warning("JOURNAL_ENABLED ignorado: os agendamentos já são gravados no banco")
+        # Import local: agents.sql_store depende deste módulo
+        from agents.sql_store import PostgresAppointmentStore, SQLiteAppointmentStore
+        if backend == "postgres":
+            return PostgresAppointmentStore()
+        return SQLiteAppointmentStore()
+    if backend != "memory":
+        logger.error(f"DB_BACKEND desconhecido: {backend} (usando memória)")
+    if JOURNAL_CONFIG["enabled"]:
+        # Import local: agents.journal depende deste módulo
+        from agents.journal import JournaledAppointmentStore
+        return JournaledAppointmentStore.open(JOURNAL_CONFIG["directory"])
+    return None
 
 # Instância global do scheduler
-scheduler = BarberScheduler()
\ No newline at end of file
+scheduler = BarberScheduler(store=_create_default_store())
\ No newline at end of file
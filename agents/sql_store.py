@@ -0,0 +1,463 @@
+"""
+Persistência de Agendamentos em Banco SQL
+Backend PostgreSQL (pool de conexões psycopg2) e equivalente em SQLite para testes locais
+"""
+
+import atexit
+import datetime
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import abstractmethod
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from config.settings import DATABASE_CONFIG
+from agents.scheduling_logic import Appointment, normalize_phone_number
+from agents.appointment_ids import appointment_id_range
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+COLUMNS = (
+    "id", "client_name", "client_phone", "phone_key", "date", "time",
+    "service", "status", "created_at", "updated_at", "barber_id"
+)
+
+SCHEMA_STATEMENTS = (
+    """
+    CREATE TABLE IF NOT EXISTS appointments (
+        id TEXT PRIMARY KEY,
+        client_name TEXT NOT NULL,
+        client_phone TEXT NOT NULL,
+        phone_key TEXT NOT NULL,
+        date DATE NOT NULL,
+        time TIME NOT NULL,
+        service TEXT NOT NULL,
+        status TEXT NOT NULL,
+        created_at TIMESTAMP NOT NULL,
+        updated_at TIMESTAMP NOT NULL,
+        barber_id TEXT
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_appointments_date ON appointments (date, status)",
+    "CREATE INDEX IF NOT EXISTS idx_appointments_phone ON appointments (phone_key)"
+)
+
+class SQLAppointmentStore(MutableMapping):
+    """
+    Armazenamento de agendamentos em banco SQL
+
+    Pode ser usado no lugar do dict padrão do BarberScheduler:
+        BarberScheduler(store=PostgresAppointmentStore())
+    ou escolhido por DATABASE_CONFIG["backend"] (DB_BACKEND=postgres|sqlite).
+
+    - Cada escrita é gravada na hora (write-through): nada se perde num reinício
+      e os outros processos veem o agendamento em seguida.
+    - Dentro de batch() as escritas são acumuladas e gravadas em lote (INSERT de
+      várias linhas com ON CONFLICT / DELETE ... IN) ao sair do bloco; as APIs
+      em lote do scheduler usam esse modo.
+    - Leituras passam por um cache em memória (agendamentos por ID e resultados
+      das consultas por data e por telefone), invalidado pelas escritas deste
+      processo; as consultas valem por query_cache_ttl segundos, o que limita
+      quanto tempo uma escrita de outro processo fica invisível.
+    - O lock protege só as estruturas em memória; as consultas rodam em paralelo
+      (cada uma com sua conexão do pool). Só as gravações são serializadas, para
+      duas versões do mesmo agendamento não chegarem ao banco fora de ordem.
+    """
+
+    placeholder = "?"
+
+    def __init__(self, write_batch_size: Optional[int] = None, query_cache_ttl: Optional[float] = None):
+        self.write_batch_size = write_batch_size or DATABASE_CONFIG["write_batch_size"]
+        self.query_cache_ttl = (DATABASE_CONFIG["query_cache_ttl"]
+                                if query_cache_ttl is None else query_cache_ttl)
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()
+        self._cache: Dict[str, Appointment] = {}
+        # (tipo, chave) -> (instante da consulta, IDs)
+        self._query_cache: Dict[Tuple[str, Any], Tuple[float, List[str]]] = {}
+        # Incrementado a cada escrita: consultas iniciadas antes não entram no cache
+        self._generation = 0
+        self._pending_upserts: Dict[str, Appointment] = {}
+        self._pending_deletes: Set[str] = set()
+        self._batch_depth = 0
+        self._closed = False
+        self._create_schema()
+        # Escritas de um lote em andamento e conexões são finalizadas ao fim do processo
+        atexit.register(self.close)
+
+    # Métodos específicos de cada banco
+
+    @abstractmethod
+    def _connection(self):
+        """Context manager que fornece uma conexão com o banco (commit ao final, rollback em caso de erro)"""
+
+    def _run_hot_query(self, cursor, name: str, sql: str, params: tuple):
+        """Executa uma consulta frequente (subclasses podem usar statements preparados)"""
+        cursor.execute(sql, params)
+
+    def _to_db_value(self, value):
+        """Converte um valor de Appointment para o tipo gravado no banco"""
+        return value
+
+    def _from_db_value(self, column: str, value):
+        """Converte um valor lido do banco para o tipo usado em Appointment"""
+        return value
+
+    # Esquema e conversões
+
+    def _create_schema(self):
+        with self._connection() as connection:
+            cursor = connection.cursor()
+            for statement in SCHEMA_STATEMENTS:
+                cursor.execute(statement)
+
+    def _to_row(self, appointment: Appointment) -> tuple:
+        return tuple(self._to_db_value(value) for value in (
+            appointment.id,
+            appointment.client_name,
+            appointment.client_phone,
+            normalize_phone_number(appointment.client_phone),
+            appointment.date,
+            appointment.time,
+            appointment.service,
+            appointment.status,
+            appointment.created_at,
+            appointment.updated_at,
+            appointment.barber_id
+        ))
+
+    def _from_row(self, row: tuple) -> Appointment:
+        values = {
+            column: self._from_db_value(column, value)
+            for column, value in zip(COLUMNS, row)
+        }
+        del values["phone_key"]
+        return Appointment(**values)
+
+    def _select_sql(self, where: str) -> str:
+        return f"SELECT {', '.join(COLUMNS)} FROM appointments WHERE {where}"
+
+    # Escritas
+
+    @contextmanager
+    def batch(self):
+        """Acumula as escritas do bloco e grava tudo em lote ao final"""
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                outermost = self._batch_depth == 0
+            if outermost:
+                self.flush()
+
+    def flush(self):
+        """Grava no banco as escritas pendentes"""
+        with self._write_lock:
+            with self._lock:
+                if not self._pending_upserts and not self._pending_deletes:
+                    return
+                pending_upserts, pending_deletes = self._pending_upserts, self._pending_deletes
+                self._pending_upserts, self._pending_deletes = {}, set()
+            upserts = list(pending_upserts.values())
+            deletes = list(pending_deletes)
+
+            try:
+                self._write(upserts, deletes)
+            except Exception:
+                # Devolve ao buffer (sem sobrepor escritas mais novas) para a próxima tentativa
+                with self._lock:
+                    for appointment_id, appointment in pending_upserts.items():
+                        if appointment_id not in self._pending_deletes:
+                            self._pending_upserts.setdefault(appointment_id, appointment)
+                    for appointment_id in pending_deletes:
+                        if appointment_id not in self._pending_upserts:
+                            self._pending_deletes.add(appointment_id)
+                raise
+
+            logger.debug(f"Gravados {len(upserts)} agendamentos e removidos {len(deletes)} em lote")
+
+    def _write(self, upserts: List[Appointment], deletes: List[str]):
+        with self._connection() as connection:
+            cursor = connection.cursor()
+
+            for start in range(0, len(deletes), self.write_batch_size):
+                chunk = deletes[start:start + self.write_batch_size]
+                marks = ", ".join([self.placeholder] * len(chunk))
+                cursor.execute(f"DELETE FROM appointments WHERE id IN ({marks})", tuple(chunk))
+
+            row_marks = "(" + ", ".join([self.placeholder] * len(COLUMNS)) + ")"
+            updates = ", ".join(f"{column} = excluded.{column}" for column in COLUMNS[1:])
+            for start in range(0, len(upserts), self.write_batch_size):
+                chunk = upserts[start:start + self.write_batch_size]
+                params = [value for appointment in chunk for value in self._to_row(appointment)]
+                cursor.execute(
+                    f"INSERT INTO appointments ({', '.join(COLUMNS)}) "
+                    f"VALUES {', '.join([row_marks] * len(chunk))} "
+                    f"ON CONFLICT (id) DO UPDATE SET {updates}",
+                    tuple(params)
+                )
+
+    def _invalidate_queries(self, appointment: Appointment):
+        """Descarta as consultas em cache afetadas por um agendamento (chamado com o lock)"""
+        self._generation += 1
+        self._query_cache.pop(("date", appointment.date), None)
+        self._query_cache.pop(("phone", normalize_phone_number(appointment.client_phone)), None)
+
+    def __setitem__(self, appointment_id: str, appointment: Appointment):
+        with self._lock:
+            previous = self._cache.get(appointment_id)
+            if previous is not None and previous is not appointment:
+                # Data ou telefone podem ter mudado: a consulta antiga também fica inválida
+                self._invalidate_queries(previous)
+            self._cache[appointment_id] = appointment
+            self._invalidate_queries(appointment)
+            self._pending_deletes.discard(appointment_id)
+            self._pending_upserts[appointment_id] = appointment
+            write_now = self._batch_depth == 0 or len(self._pending_upserts) >= self.write_batch_size
+        if write_now:
+            self.flush()
+
+    def __delitem__(self, appointment_id: str):
+        appointment = self[appointment_id]
+        with self._lock:
+            self._cache.pop(appointment_id, None)
+            self._invalidate_queries(appointment)
+            self._pending_upserts.pop(appointment_id, None)
+            self._pending_deletes.add(appointment_id)
+            write_now = self._batch_depth == 0 or len(self._pending_deletes) >= self.write_batch_size
+        if write_now:
+            self.flush()
+
+    # Leituras
+
+    def __getitem__(self, appointment_id: str) -> Appointment:
+        with self._lock:
+            if appointment_id in self._pending_deletes:
+                raise KeyError(appointment_id)
+            appointment = self._cache.get(appointment_id)
+            if appointment is not None:
+                return appointment
+
+        with self._connection() as connection:
+            cursor = connection.cursor()
+            self._run_hot_query(
+                cursor, "appointment_by_id",
+                self._select_sql(f"id = {self.placeholder}"), (appointment_id,)
+            )
+            row = cursor.fetchone()
+
+        if row is None:
+            raise KeyError(appointment_id)
+        with self._lock:
+            return self._cache.setdefault(appointment_id, self._from_row(row))
+
+    def __iter__(self) -> Iterator[str]:
+        self.flush()
+        with self._connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute("SELECT id FROM appointments")
+            ids = [row[0] for row in cursor.fetchall()]
+        return iter(ids)
+
+    def __len__(self) -> int:
+        self.flush()
+        with self._connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute("SELECT COUNT(*) FROM appointments")
+            return cursor.fetchone()[0]
+
+    def values(self) -> List[Appointment]:
+        """Carrega todos os agendamentos em uma única consulta (usado ao reconstruir índices)"""
+        return self._select_appointments("1 = 1")
+
+    def find_by_created_range(self, start: datetime.datetime, end: datetime.datetime) -> List[Appointment]:
+        """
+        Retorna os agendamentos criados em [start, end), em ordem de criação
+
+        Os IDs são ordenados pelo instante de criação, então a consulta é uma
+        varredura de intervalo na chave primária (sem índice extra).
+        """
+        lowest, highest = appointment_id_range(start, end)
+        return self._select_appointments(
+            f"id >= {self.placeholder} AND id < {self.placeholder} ORDER BY id", (lowest, highest)
+        )
+
+    def _select_appointments(self, where: str, params: tuple = ()) -> List[Appointment]:
+        self.flush()
+        with self._connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute(self._select_sql(where), params)
+            rows = cursor.fetchall()
+
+        appointments = []
+        with self._lock:
+            for row in rows:
+                appointment = self._cache.get(row[0])
+                if appointment is None:
+                    appointment = self._from_row(row)
+                    self._cache[appointment.id] = appointment
+                appointments.append(appointment)
+        return appointments
+
+    def _cached_query(self, key: Tuple[str, Any], name: str, where: str, params: tuple) -> List[Appointment]:
+        with self._lock:
+            cached = self._query_cache.get(key)
+            if cached is not None and time.monotonic() - cached[0] < self.query_cache_ttl:
+                return [self._cache[apt_id] for apt_id in cached[1] if apt_id in self._cache]
+            generation = self._generation
+
+        self.flush()
+        queried_at = time.monotonic()
+        with self._connection() as connection:
+            cursor = connection.cursor()
+            self._run_hot_query(cursor, name, self._select_sql(where), params)
+            rows = cursor.fetchall()
+
+        with self._lock:
+            appointments = []
+            for row in rows:
+                if row[0] in self._pending_deletes:
+                    continue
+                appointments.append(self._cache.setdefault(row[0], self._from_row(row)))
+            if generation == self._generation:
+                # Sem escritas durante a consulta: o resultado pode ir para o cache
+                self._query_cache[key] = (queried_at, [appointment.id for appointment in appointments])
+        return appointments
+
+    def find_by_date(self, date: datetime.date) -> List[Appointment]:
+        """Retorna os agendamentos confirmados de uma data (consulta de disponibilidade)"""
+        appointments = self._cached_query(
+            ("date", date), "appointments_by_date",
+            f"date = {self.placeholder} AND status = 'confirmed'", (self._to_db_value(date),)
+        )
+        # Agendamentos alterados em memória depois da consulta são filtrados aqui
+        return [apt for apt in appointments if apt.date == date and apt.status == 'confirmed']
+
+    def find_by_phone(self, client_phone: str) -> List[Appointment]:
+        """Retorna os agendamentos não cancelados de um cliente"""
+        phone_key = normalize_phone_number(client_phone)
+        appointments = self._cached_query(
+            ("phone", phone_key), "appointments_by_phone",
+            f"phone_key = {self.placeholder} AND status <> 'cancelled'", (phone_key,)
+        )
+        return [apt for apt in appointments if apt.status != 'cancelled']
+
+    def close(self):
+        """Grava as escritas pendentes e libera as conexões"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self.flush()
+        atexit.unregister(self.close)
+
+class SQLiteAppointmentStore(SQLAppointmentStore):
+    """
+    Backend SQLite com a mesma interface do PostgreSQL (para testes e desenvolvimento)
+
+    O sqlite3 mantém os statements compilados em cache por conexão, então as
+    consultas frequentes são reaproveitadas como statements preparados.
+    """
+
+    placeholder = "?"
+
+    def __init__(self, path: Optional[str] = None, write_batch_size: Optional[int] = None,
+                 query_cache_ttl: Optional[float] = None):
+        path = path or DATABASE_CONFIG["sqlite_path"]
+        directory = os.path.dirname(path)
+        if path != ":memory:" and not path.startswith("file:") and directory:
+            # O sqlite3 cria o arquivo, mas não o diretório (padrão: data/appointments.db)
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        # Uma única conexão SQLite: o acesso a ela é serializado
+        self._db_lock = threading.Lock()
+        super().__init__(write_batch_size, query_cache_ttl)
+
+    @contextmanager
+    def _connection(self):
+        with self._db_lock:
+            try:
+                yield self._db
+                self._db.commit()
+            except Exception:
+                self._db.rollback()
+                raise
+
+    def _to_db_value(self, value):
+        # SQLite não tem tipos de data/hora: grava em ISO 8601
+        if isinstance(value, (datetime.date, datetime.time)):
+            return value.isoformat()
+        return value
+
+    def _from_db_value(self, column: str, value):
+        if value is None or column not in ("date", "time", "created_at", "updated_at"):
+            return value
+        if column == "date":
+            return datetime.date.fromisoformat(value)
+        if column == "time":
+            return datetime.time.fromisoformat(value)
+        return datetime.datetime.fromisoformat(value)
+
+    def close(self):
+        super().close()
+        self._db.close()
+
+class PostgresAppointmentStore(SQLAppointmentStore):
+    """Backend PostgreSQL com pool de conexões e statements preparados para as consultas frequentes"""
+
+    placeholder = "%s"
+
+    def __init__(self, config: Optional[Dict] = None, write_batch_size: Optional[int] = None,
+                 query_cache_ttl: Optional[float] = None):
+        # Import local: psycopg2 só é necessário quando este backend é usado
+        from psycopg2.pool import ThreadedConnectionPool
+
+        config = config or DATABASE_CONFIG
+        self._pool = ThreadedConnectionPool(
+            config["pool_min_connections"],
+            config["pool_max_connections"],
+            host=config["host"],
+            port=config["port"],
+            dbname=config["database"],
+            user=config["user"],
+            password=config["password"]
+        )
+        # Statements já preparados em cada conexão do pool
+        self._prepared: Dict[int, Set[str]] = {}
+        super().__init__(write_batch_size, query_cache_ttl)
+
+    @contextmanager
+    def _connection(self):
+        connection = self._pool.getconn()
+        try:
+            yield connection
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            self._pool.putconn(connection)
+
+    def _run_hot_query(self, cursor, name: str, sql: str, params: tuple):
+        prepared = self._prepared.setdefault(id(cursor.connection), set())
+        if name not in prepared:
+            numbered = sql
+            for position in range(1, len(params) + 1):
+                numbered = numbered.replace("%s", f"${position}", 1)
+            cursor.execute(f"PREPARE {name} AS {numbered}")
+            prepared.add(name)
+        marks = ", ".join(["%s"] * len(params))
+        cursor.execute(f"EXECUTE {name} ({marks})", params)
+
+    def close(self):
+        super().close()
+        self._pool.closeall()
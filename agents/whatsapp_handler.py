@@ -8,7 +8,7 @@ import requests
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 from config.settings import WHATSAPP_CONFIG, MESSAGE_TEMPLATES
-from agents.scheduling_logic import scheduler
+from agents.scheduling_logic import normalize_phone_number, WaitlistOffer
 
 # Configuração de logging
 logging.basicConfig(level=logging.INFO)
@@ -219,14 +219,7 @@ class WhatsAppHandler:
     
     def _format_phone_number(self, phone_number: str) -> str:
         """Formata o número do telefone para o formato do WhatsApp"""
-        # Remove caracteres especiais
-        cleaned = ''.join(filter(str.isdigit, phone_number))
-        
-        # Adiciona código do país se não existir
-        if not cleaned.startswith('55'):
-            cleaned = '55' + cleaned
-            
-        return cleaned
+        return normalize_phone_number(phone_number)
     
     # Métodos específicos para agendamento
     
@@ -417,6 +410,32 @@ class WhatsAppHandler:
             }
         ])
     
+    def send_waitlist_offer(self, phone_number: str, offer: WaitlistOffer) -> Tuple[bool, str]:
+        """Envia ao cliente da lista de espera a oferta de um horário que vagou"""
+        minutes = max(1, round((offer.expires_at - datetime.now()).total_seconds() / 60))
+        message = MESSAGE_TEMPLATES["waitlist_offer"].format(
+            date=offer.date.strftime("%d/%m/%Y"), 
+            time=offer.time.strftime("%H:%M"), 
+            minutes=minutes
+        )
+        
+        return self.send_quick_reply(phone_number, message, [
+            {
+                "type": "reply",
+                "reply": {
+                    "id": "waitlist_accept",
+                    "title": "✅ Quero"
+                }
+            },
+            {
+                "type": "reply",
+                "reply": {
+                    "id": "waitlist_decline",
+                    "title": "❌ Não quero"
+                }
+            }
+        ])
+    
     def send_help_message(self, phone_number: str) -> Tuple[bool, str]:
         """Envia mensagem de ajuda"""
         message = MESSAGE_TEMPLATES["help"]
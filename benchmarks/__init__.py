@@ -0,0 +1,6 @@
+"""
+Microbenchmarks do sistema de agendamento
+
+Executar a partir da raiz do projeto, por exemplo:
+    python -m benchmarks.bench_slot_grid
+"""
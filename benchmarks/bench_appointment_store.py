@@ -0,0 +1,83 @@
+"""
+Benchmark de memória: bytes por agendamento no dict de Appointment e no ColumnarAppointmentStore
+
+Gera agendamentos sintéticos (IDs no formato do create_appointment, datas de vários
+anos, nomes e telefones de uma base de clientes recorrentes) e mede com tracemalloc
+a memória retida por cada armazenamento, incluindo as chaves.
+
+    python -m benchmarks.bench_appointment_store [--records 1000000] [--clients 50000]
+
+Com tracemalloc ativo a carga fica bem mais lenta (alguns minutos para 1M).
+"""
+
+import argparse
+import datetime
+import gc
+import random
+import time
+import tracemalloc
+from typing import Callable, Iterator, MutableMapping, Tuple
+
+from agents.appointment_store import ColumnarAppointmentStore
+from agents.scheduling_logic import Appointment
+
+STATUSES = ('completed', 'completed', 'completed', 'cancelled', 'confirmed')
+SERVICES = ('Corte', 'Barba', 'Corte e barba')
+
+def synthetic_appointments(records: int, clients: int, seed: int = 7) -> Iterator[Appointment]:
+    """Agendamentos dos últimos anos, um por vez (os objetos de entrada não ficam retidos)"""
+    rng = random.Random(seed)
+    first_day = datetime.date.today() - datetime.timedelta(days=3 * 365)
+    for sequence in range(records):
+        client = rng.randrange(clients)
+        date = first_day + datetime.timedelta(days=rng.randrange(3 * 365))
+        minute = 8 * 60 + 15 * rng.randrange(40)
+        created_at = datetime.datetime.combine(date, datetime.time(7)) - datetime.timedelta(
+            minutes=rng.randrange(30 * 24 * 60)
+        )
+        yield Appointment(
+            # Sufixo sequencial no lugar dos 4 dígitos do telefone, para não colidir
+            id=f"apt_{created_at:%Y%m%d_%H%M%S}_{sequence:04d}",
+            # Strings novas a cada registro, como chegariam do webhook ou do banco
+            client_name=" ".join(["Cliente", str(client)]),
+            client_phone="".join(["119", str(10**7 + client)]),
+            date=date,
+            time=datetime.time(minute // 60, minute % 60),
+            service=rng.choice(SERVICES),
+            status=rng.choice(STATUSES),
+            created_at=created_at,
+            updated_at=created_at + datetime.timedelta(minutes=rng.randrange(120))
+        )
+
+def measure(factory: Callable[[], MutableMapping], records: int, clients: int) -> Tuple[int, float]:
+    """Bytes retidos pelo armazenamento preenchido e tempo de carga (s)"""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    store = factory()
+    for appointment in synthetic_appointments(records, clients):
+        store[appointment.id] = appointment
+    elapsed = time.perf_counter() - started
+    del appointment
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(store) == records
+    del store
+    gc.collect()
+    return retained, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=1_000_000)
+    parser.add_argument("--clients", type=int, default=50_000)
+    args = parser.parse_args()
+
+    print(f"{args.records} agendamentos, {args.clients} clientes (tracemalloc, inclui as chaves)")
+    print(f"{'armazenamento':<28} {'bytes/agendamento':>18} {'total (MB)':>12} {'carga (s)':>10}")
+    for name, factory in (("dict de Appointment", dict), ("ColumnarAppointmentStore", ColumnarAppointmentStore)):
+        retained, elapsed = measure(factory, args.records, args.clients)
+        print(f"{name:<28} {retained / args.records:>18.1f} {retained / 2**20:>12.1f} {elapsed:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Benchmark do interpretador de datas e horários (agents.datetime_parser)
+
+Compara as expressões originais do BarberAgent (só "hoje/amanhã" e DD/MM/AAAA),
+o parser atual sem cache (primeira vez que a mensagem aparece) e com cache, e uma
+ida e volta HTTP em localhost, o limite inferior de repassar a mensagem ao
+SuperAgentes/Make para interpretação (a chamada real ainda soma rede e o modelo).
+
+    python -m benchmarks.bench_datetime_parser [--rounds 200] [--http-calls 200]
+"""
+
+import argparse
+import json
+import re
+import threading
+import timeit
+from datetime import date, time, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+import requests
+
+from agents.datetime_parser import _parse_date_normalized, _parse_time_normalized, parse_date, parse_time
+
+DATE_MESSAGES = [
+    "amanhã", "hoje", "depois de amanhã", "15/11/2026", "15/11", "dia 15", "sexta que vem",
+    "pode ser na próxima terça?", "sábado de manhã", "quinta-feira da semana que vem",
+    "daqui a 3 dias", "20 de dezembro", "dia 3 de março de 2027", "25-12-2026",
+    "Queria marcar pra segunda se tiver horário", "hj", "semana que vem", "qualquer dia",
+]
+
+TIME_MESSAGES = [
+    "15h30", "15:30", "às 3 da tarde", "10h", "as 9 da manhã", "meio-dia", "meio dia e meia",
+    "14", "pode ser 16h?", "lá pelas 5 e meia da tarde", "às 18 horas", "9.45", "de manhã cedo",
+    "depois do almoço", "8 da noite", "à tarde, umas 4",
+]
+
+_LEGACY_DATE_PATTERNS = [
+    r'(\d{1,2})/(\d{1,2})/(\d{4})',
+    r'(\d{1,2})-(\d{1,2})-(\d{4})',
+    r'(\d{1,2})\.(\d{1,2})\.(\d{4})',
+]
+
+_LEGACY_TIME_PATTERNS = [
+    r'(\d{1,2}):(\d{2})',
+    r'(\d{1,2})h(\d{2})?',
+    r'(\d{1,2})\.(\d{2})',
+]
+
+def legacy_parse_date(message: str) -> Optional[date]:
+    """_parse_date_input original do BarberAgent"""
+    message_lower = message.lower().strip()
+    if message_lower in ['hoje', 'agora']:
+        return date.today()
+    elif message_lower == 'amanhã':
+        return date.today() + timedelta(days=1)
+    elif message_lower == 'depois de amanhã':
+        return date.today() + timedelta(days=2)
+    for pattern in _LEGACY_DATE_PATTERNS:
+        match = re.search(pattern, message)
+        if match:
+            day, month, year = map(int, match.groups())
+            try:
+                return date(year, month, day)
+            except ValueError:
+                continue
+    return None
+
+def legacy_parse_time(message: str) -> Optional[time]:
+    """_parse_time_input original do BarberAgent"""
+    message_clean = message.strip()
+    for pattern in _LEGACY_TIME_PATTERNS:
+        match = re.search(pattern, message_clean)
+        if match:
+            hour = int(match.group(1))
+            minute = int(match.group(2)) if match.group(2) else 0
+            if 0 <= hour <= 23 and 0 <= minute <= 59:
+                return time(hour, minute)
+    return None
+
+def per_message_us(function, messages, rounds: int, before=None) -> float:
+    def run():
+        if before is not None:
+            before()
+        for message in messages:
+            function(message)
+    return timeit.Timer(run).timeit(rounds) / (rounds * len(messages)) * 1e6
+
+class _EchoHandler(BaseHTTPRequestHandler):
+    """Responde a mensagem recebida, como um webhook que devolve a interpretação"""
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        payload = json.dumps({"message": json.loads(body)["message"], "date": None}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+def http_round_trip_us(messages, calls: int) -> float:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _EchoHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/interpret"
+    try:
+        with requests.Session() as session:
+            index = iter(range(calls))
+            timer = timeit.Timer(
+                lambda: session.post(url, json={"message": messages[next(index) % len(messages)]}).json()
+            )
+            return timer.timeit(calls) / calls * 1e6
+    finally:
+        server.shutdown()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--http-calls", type=int, default=200)
+    args = parser.parse_args()
+
+    def clear_caches():
+        _parse_date_normalized.cache_clear()
+        _parse_time_normalized.cache_clear()
+
+    rows = [
+        ("data", "original (regex por chamada)", per_message_us(legacy_parse_date, DATE_MESSAGES, args.rounds)),
+        ("data", "parse_date sem cache", per_message_us(parse_date, DATE_MESSAGES, args.rounds, clear_caches)),
+        ("data", "parse_date com cache", per_message_us(parse_date, DATE_MESSAGES, args.rounds)),
+        ("horário", "original (regex por chamada)", per_message_us(legacy_parse_time, TIME_MESSAGES, args.rounds)),
+        ("horário", "parse_time sem cache", per_message_us(parse_time, TIME_MESSAGES, args.rounds, clear_caches)),
+        ("horário", "parse_time com cache", per_message_us(parse_time, TIME_MESSAGES, args.rounds)),
+        ("data", "HTTP localhost (ida e volta)", http_round_trip_us(DATE_MESSAGES, args.http_calls)),
+    ]
+
+    print(f"{'tipo':<8} {'implementação':<30} {'us/mensagem':>12}")
+    for kind, variant, elapsed in rows:
+        print(f"{kind:<8} {variant:<30} {elapsed:>12.2f}")
+
+    legacy_dates = sum(legacy_parse_date(message) is not None for message in DATE_MESSAGES)
+    dates = sum(parse_date(message) is not None for message in DATE_MESSAGES)
+    legacy_times = sum(legacy_parse_time(message) is not None for message in TIME_MESSAGES)
+    times = sum(parse_time(message) is not None for message in TIME_MESSAGES)
+    print(f"\nDatas reconhecidas: {legacy_dates}/{len(DATE_MESSAGES)} (original), {dates}/{len(DATE_MESSAGES)} (atual)")
+    print(f"Horários reconhecidos: {legacy_times}/{len(TIME_MESSAGES)} (original), {times}/{len(TIME_MESSAGES)} (atual)")
+
+if __name__ == "__main__":
+    main()
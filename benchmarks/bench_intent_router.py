@@ -0,0 +1,124 @@
+"""
+Benchmark do roteador de intenções sobre um corpus de mensagens reais em português
+
+Compara as cadeias originais de any(palavra in mensagem) do BarberAgent com o
+IntentRouter (uma expressão em trie por intenção), com a tabela de INTENT_KEYWORDS
+e com uma tabela ampliada (sinônimos e variações), onde as cadeias crescem
+linearmente e o trie quase não muda. As duas classificações têm que coincidir.
+
+    python -m benchmarks.bench_intent_router [--rounds 200]
+"""
+
+import argparse
+import timeit
+from typing import Dict, List, Optional
+
+from config.settings import INTENT_KEYWORDS
+from agents.intent_router import IntentRouter
+
+# Mensagens recebidas pelo WhatsApp (anonimizadas), com e sem acentos, gírias e erros
+CORPUS = [
+    "Oi, boa tarde! Queria agendar um corte pra sexta",
+    "bom dia quero marcar horario amanha",
+    "Olá, vocês tem horário livre hoje à tarde?",
+    "tem horarios disponiveis no sabado?",
+    "Preciso cancelar meu horário de amanhã, surgiu um imprevisto",
+    "cancelamento do agendamento das 15h por favor",
+    "Dá pra remarcar pra semana que vem?",
+    "quero mudar meu horario pra mais tarde",
+    "posso alterar o dia do corte?",
+    "ajuda",
+    "o que pode fazer?",
+    "help",
+    "Oi",
+    "Boa noite",
+    "Quanto custa o corte + barba?",
+    "vcs abrem domingo?",
+    "obrigado, até mais!",
+    "Sim",
+    "sim, confirmo",
+    "nao",
+    "Não, obrigado",
+    "assim fica melhor pra mim",
+    "Confirmar ✅",
+    "❌",
+    "🔄 quero alterar",
+    "e aí, consigo encaixe hoje ainda?",
+    "Queria saber se tem vaga livre pra pigmentação na quinta",
+    "Bom dia! Gostaria de verificar a disponibilidade para o dia 15",
+    "meu filho quer cortar o cabelo, tem horário pra criança?",
+    "Vou me atrasar uns 10 minutos, tudo bem?",
+    "Vocês aceitam pix?",
+    "qual o endereço da barbearia?",
+    "Oi! Sou o João, marquei pra hoje às 16h, ainda está de pé?",
+    "Preciso desmarcar, desculpa",
+    "da pra trocar o horario?",
+    "Tem como fazer barba e sobrancelha junto?",
+    "BOA TARDE QUERO AGENDAR",
+    "Agendar corte amanhã 10h",
+    "queria marcar com o barbeiro principal",
+    "Tem disponível agora?",
+    "Olá, tudo bem? Gostaria de agendar um horário para cortar o cabelo e fazer a barba no próximo sábado pela manhã, se possível com o mesmo barbeiro da última vez.",
+    "Boa tarde, eu tinha um agendamento para amanhã às 14h mas vou precisar remarcar porque vou viajar a trabalho, vocês teriam algum horário livre na terça ou quarta?",
+    "oi",
+    "👍",
+    "ok",
+    "blz, valeu",
+    "Confirmo sim!",
+    "não vou poder ir",
+    "kkkk beleza",
+    "Quero cancelar",
+]
+
+# Sinônimos e variações comuns: com eles a tabela fica do tamanho de uma tabela real de produção
+EXTRA_KEYWORDS = {
+    "schedule": ["agendamento", "marcação", "reservar", "reserva", "encaixe", "cortar", "barba",
+                 "sobrancelha", "pigmentação", "quero cortar", "quero fazer", "tem vaga", "vaga"],
+    "check_availability": ["disponibilidade", "disponíveis", "agenda", "tem horário", "vagas",
+                           "abrem", "aberto", "funcionam"],
+    "cancel": ["desmarcar", "desmarca", "não vou poder", "não vou conseguir", "cancela", "cancele"],
+    "reschedule": ["trocar", "troca", "mudança", "adiar", "antecipar", "outro dia", "outro horário"],
+    "help": ["menu", "opções", "informação", "informações", "dúvida", "como funciona", "atendente"],
+}
+
+def legacy_route(table: Dict[str, List[str]], message: str) -> Optional[str]:
+    """Classificação original: uma varredura de substring por palavra, na ordem de prioridade"""
+    message_lower = message.lower()
+    for intent, keywords in table.items():
+        if any(word in message_lower for word in keywords):
+            return intent
+    return None
+
+def expanded_table() -> Dict[str, List[str]]:
+    table = {intent: list(keywords) for intent, keywords in INTENT_KEYWORDS["idle"].items()}
+    for intent, keywords in EXTRA_KEYWORDS.items():
+        table[intent].extend(keywords)
+    return table
+
+def per_message_us(function, rounds: int) -> float:
+    def run():
+        for message in CORPUS:
+            function(message)
+    return timeit.Timer(run).timeit(rounds) / (rounds * len(CORPUS)) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{len(CORPUS)} mensagens, {args.rounds} rodadas")
+    print(f"{'tabela':<22} {'palavras':>8} {'any() (us/msg)':>15} {'router (us/msg)':>16} {'divergências':>13}")
+    for name, table in (("INTENT_KEYWORDS idle", INTENT_KEYWORDS["idle"]), ("ampliada", expanded_table())):
+        router = IntentRouter({"idle": table})
+        legacy = per_message_us(lambda message: legacy_route(table, message), args.rounds)
+        compiled = per_message_us(lambda message: router.route("idle", message), args.rounds)
+        differences = sum(legacy_route(table, message) != router.route("idle", message) for message in CORPUS)
+        keywords = sum(len(words) for words in table.values())
+        print(f"{name:<22} {keywords:>8} {legacy:>15.2f} {compiled:>16.2f} {differences:>13}")
+
+    router = IntentRouter()
+    match_all = per_message_us(lambda message: router.match("idle", message), args.rounds)
+    print(f"\nmatch() com todas as ocorrências e posições (INTENT_KEYWORDS idle): {match_all:.2f} us/msg")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Benchmark da grade de horários pré-calculada (get_available_slots por chamada)
+
+Compara a implementação original (strftime/strptime a cada chamada e varredura de
+todos os agendamentos por horário) com a atual (grade por dia da semana montada no
+construtor e índices por data), sem cache e com o cache de disponibilidade.
+
+    python -m benchmarks.bench_slot_grid [--days-of-history 365] [--calls 2000]
+"""
+
+import argparse
+import datetime
+import random
+import timeit
+from typing import Dict, List, Optional, Tuple
+
+from config.settings import SCHEDULING_CONFIG
+from agents.availability_cache import InProcessAvailabilityCache
+from agents.scheduling_logic import Appointment, BarberScheduler, TimeSlot
+
+class LegacyScheduler:
+    """Cálculo de horários da versão original do BarberScheduler (referência do "antes")"""
+
+    def __init__(self, appointments: Dict[str, Appointment]):
+        self.appointments = appointments
+        self.working_hours = SCHEDULING_CONFIG["working_hours"]
+        self.appointment_duration = SCHEDULING_CONFIG["appointment_duration"]
+        self.buffer_time = SCHEDULING_CONFIG["buffer_time"]
+
+    def get_working_hours_for_date(self, date: datetime.date) -> Tuple[datetime.time, datetime.time]:
+        weekday = date.strftime("%A").lower()
+        if weekday in self.working_hours:
+            start_time = datetime.datetime.strptime(self.working_hours[weekday]["start"], "%H:%M").time()
+            end_time = datetime.datetime.strptime(self.working_hours[weekday]["end"], "%H:%M").time()
+            return start_time, end_time
+        return None, None
+
+    def _appointment_at(self, date: datetime.date, time: datetime.time) -> Optional[str]:
+        for appointment in self.appointments.values():
+            if appointment.date == date and appointment.time == time and appointment.status == 'confirmed':
+                return appointment.id
+        return None
+
+    def generate_time_slots(self, date: datetime.date) -> List[TimeSlot]:
+        start_time, end_time = self.get_working_hours_for_date(date)
+        if not start_time or not end_time:
+            return []
+        slots = []
+        current_time = start_time
+        while current_time < end_time:
+            appointment_id = self._appointment_at(date, current_time)
+            slots.append(TimeSlot(time=current_time, available=appointment_id is None,
+                                  appointment_id=appointment_id))
+            next_minutes = current_time.hour * 60 + current_time.minute + self.appointment_duration + self.buffer_time
+            current_time = datetime.time(hour=next_minutes // 60, minute=next_minutes % 60)
+        return slots
+
+    def get_available_slots(self, date: datetime.date) -> List[TimeSlot]:
+        return [slot for slot in self.generate_time_slots(date) if slot.available]
+
+def synthetic_appointments(days_of_history: int, seed: int = 7) -> Dict[str, Appointment]:
+    """Agendamentos dos últimos dias (concluídos) e dos próximos 30 (confirmados), metade da grade ocupada"""
+    rng = random.Random(seed)
+    grid = LegacyScheduler({})
+    today = datetime.date.today()
+    appointments = {}
+    for offset in range(-days_of_history, 31):
+        date = today + datetime.timedelta(days=offset)
+        for slot in grid.generate_time_slots(date):
+            if rng.random() < 0.5:
+                continue
+            appointment_id = f"apt_{len(appointments):08d}"
+            created_at = datetime.datetime.combine(date, slot.time) - datetime.timedelta(days=2)
+            appointments[appointment_id] = Appointment(
+                id=appointment_id, client_name=f"Cliente {len(appointments)}",
+                client_phone=f"11{rng.randrange(10**8, 10**9)}", date=date, time=slot.time,
+                service="Corte", status='confirmed' if offset >= 0 else 'completed',
+                created_at=created_at, updated_at=created_at
+            )
+    return appointments
+
+def per_call_us(function, dates: List[datetime.date], calls: int) -> float:
+    """Tempo médio por chamada, em microssegundos, alternando entre as datas"""
+    index = iter(range(calls))
+    timer = timeit.Timer(lambda: function(dates[next(index) % len(dates)]))
+    return timer.timeit(calls) / calls * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--days-of-history", type=int, default=365)
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+
+    appointments = synthetic_appointments(args.days_of_history)
+    today = datetime.date.today()
+    dates = [today + datetime.timedelta(days=offset) for offset in range(1, 31)]
+
+    legacy = LegacyScheduler(appointments)
+    uncached = BarberScheduler(store=dict(appointments))
+    uncached.availability_cache = None
+    cached = BarberScheduler(store=dict(appointments), cache=InProcessAvailabilityCache())
+
+    for date in dates:
+        expected = [slot.time for slot in legacy.get_available_slots(date)]
+        assert [slot.time for slot in uncached.get_available_slots(date)] == expected, date
+
+    # A versão original varre todos os agendamentos por horário: limita as chamadas
+    legacy_calls = max(10, min(args.calls, 200000 // max(1, len(appointments))))
+    rows = [
+        ("get_working_hours_for_date", "original", per_call_us(legacy.get_working_hours_for_date, dates, args.calls)),
+        ("get_working_hours_for_date", "grade pré-calculada", per_call_us(uncached.get_working_hours_for_date, dates, args.calls)),
+        ("get_available_slots", "original", per_call_us(legacy.get_available_slots, dates, legacy_calls)),
+        ("get_available_slots", "grade + índices, sem cache", per_call_us(uncached.get_available_slots, dates, args.calls)),
+        ("get_available_slots", "grade + índices, com cache", per_call_us(cached.get_available_slots, dates, args.calls)),
+    ]
+
+    print(f"{len(appointments)} agendamentos ({args.days_of_history} dias de histórico + 30 dias à frente)")
+    print(f"{'método':<28} {'implementação':<28} {'us/chamada':>12}")
+    for method, variant, elapsed in rows:
+        print(f"{method:<28} {variant:<28} {elapsed:>12.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -31,11 +31,17 @@ WHATSAPP_CONFIG = {
 
 # Configurações do Banco de Dados
 DATABASE_CONFIG = {
+    "backend": os.getenv("DB_BACKEND", "memory"),  # memory, postgres ou sqlite
+    "sqlite_path": os.getenv("DB_SQLITE_PATH", "data/appointments.db"),
     "host": os.getenv("DB_HOST", "localhost"),
     "port": int(os.getenv("DB_PORT", "5432")),
     "database": os.getenv("DB_NAME", "barber_scheduling"),
     "user": os.getenv("DB_USER", "postgres"),
-    "password": os.getenv("DB_PASSWORD", "")
+    "password": os.getenv("DB_PASSWORD", ""),
+    "pool_min_connections": int(os.getenv("DB_POOL_MIN", "1")),
+    "pool_max_connections": int(os.getenv("DB_POOL_MAX", "10")),
+    "write_batch_size": int(os.getenv("DB_WRITE_BATCH_SIZE", "50")),  # escritas agrupadas por INSERT
+    "query_cache_ttl": float(os.getenv("DB_QUERY_CACHE_TTL", "5"))  # segundos
 }
 
 # Configurações de Horários
@@ -51,10 +57,42 @@ SCHEDULING_CONFIG = {
     },
     "appointment_duration": 30,  # minutos
     "buffer_time": 15,  # minutos entre agendamentos
+    "service_durations": {  # minutos por serviço (os demais usam appointment_duration)
+        "Corte": 30,
+        "Corte de Cabelo": 30,
+        "Barba": 30,
+        "Corte + Barba": 60,
+        "Sobrancelha": 15,
+        "Pigmentação": 75
+    },
+    "time_granularity": 15,  # minutos entre horários sugeridos para serviços longos
+    "barbers": {  # ID -> nome de cada barbeiro (cadeira) da barbearia
+        "principal": "Barbeiro Principal"
+    },
     "advance_booking_days": 30,  # dias para agendamento antecipado
+    # Calendário de exceções (feriados, horários especiais, folgas e férias), por exemplo:
+    #   {"date": "2026-11-02", "reason": "Finados"}
+    #   {"month_day": "12-25", "reason": "Natal"}
+    #   {"start": "2026-12-15", "end": "2026-12-23", "hours": {"start": "08:00", "end": "21:00"}, "reason": "Horário de Natal"}
+    #   {"start": "2027-01-04", "end": "2027-01-18", "barber_id": "principal", "reason": "Férias"}
+    "calendar_exceptions": [],
+    "waitlist_offer_ttl": 300,  # segundos para o cliente da lista de espera aceitar o horário vago
+    "lock_stripes": 64,  # locks por data (reservas em dias diferentes rodam em paralelo)
+    "node_id": int(os.getenv("NODE_ID", "0")),  # identifica a instância nos IDs de agendamento
+    "archive_directory": os.getenv("ARCHIVE_DIR", "data/archive"),  # partições antigas arquivadas (gzip)
+    "ledger_backend": os.getenv("SCHEDULER_LEDGER", "none"),  # ocupação compartilhada entre processos: redis ou none
     "reminder_hours": [24, 2]  # horas antes do agendamento para lembrete
 }
 
+# Configurações do Journal (durabilidade do scheduler em memória)
+JOURNAL_CONFIG = {
+    "enabled": os.getenv("JOURNAL_ENABLED", "false").lower() == "true",
+    "directory": os.getenv("JOURNAL_DIR", "data/journal"),
+    "fsync_batch_size": 64,  # registros acumulados antes de um fsync
+    "fsync_interval": 0.05,  # segundos máximos entre fsyncs
+    "snapshot_every": 50000  # registros no journal antes de gerar novo snapshot
+}
+
 # Configurações de Mensagens
 MESSAGE_TEMPLATES = {
     "welcome": "Olá! Sou o assistente virtual da barbearia. Como posso ajudá-lo hoje?",
@@ -66,9 +104,36 @@ MESSAGE_TEMPLATES = {
     "time_suggestion": "🕐 Horários disponíveis para {date}: {times}",
     "no_availability": "😔 Não há horários disponíveis para {date}. Gostaria de ver outras datas?",
     "confirmation_request": "🤔 Confirma que vai comparecer ao agendamento de {date} às {time}?",
+    "waitlist_offer": "🔔 Vagou um horário em {date} às {time}! Quer ficar com ele? A oferta vale por {minutes} minutos.",
     "help": "💡 Posso ajudá-lo com:\n• Agendamento\n• Verificar disponibilidade\n• Cancelar agendamento\n• Remarcar horário\n• Confirmação de presença"
 }
 
+# Palavras-chave de intenção por etapa da conversa (agents/intent_router.py)
+# Em cada etapa, as intenções estão em ordem de prioridade (vale a primeira encontrada);
+# maiúsculas são ignoradas, acentos não: variantes sem acento entram na lista
+INTENT_KEYWORDS = {
+    "idle": {
+        "schedule": ["agendar", "marcar", "horário", "corte"],
+        "check_availability": ["verificar", "disponível", "horários", "livre"],
+        "cancel": ["cancelar", "cancelamento"],
+        "reschedule": ["remarcar", "mudar", "alterar"],
+        "help": ["ajuda", "help", "o que pode fazer"]
+    },
+    "waitlist_offer": {
+        "decline": ["não quero", "nao quero", "recusar", "não", "nao"],
+        "accept": ["quero", "aceito", "sim"]
+    },
+    "waitlist_invite": {
+        "decline": ["não quero", "nao quero", "não", "nao"],
+        "accept": ["sim", "quero", "lista"]
+    },
+    "confirmation": {
+        "confirm": ["sim", "confirmar", "✅", "confirmo"],
+        "deny": ["não", "cancelar", "❌"],
+        "change": ["alterar", "🔄"]
+    }
+}
+
 # Configurações de Log
 LOGGING_CONFIG = {
     "level": os.getenv("LOG_LEVEL", "INFO"),
@@ -94,11 +159,28 @@ NOTIFICATION_CONFIG = {
 
 # Configurações de Cache
 CACHE_CONFIG = {
+    "backend": os.getenv("CACHE_BACKEND", "memory"),  # cache de disponibilidade: memory, redis ou none
     "redis_url": os.getenv("REDIS_URL", "redis://localhost:6379"),
     "ttl": 300,  # 5 minutos
     "max_size": 1000
 }
 
+# Configurações dos Contextos de Conversa (BarberAgent)
+CONVERSATION_CONFIG = {
+    "backend": os.getenv("CONVERSATION_BACKEND", "memory"),  # contextos: memory ou redis (entre processos)
+    "idle_ttl": 1800,  # segundos sem mensagens até a conversa ser descartada (no Redis, EXPIRE da chave)
+    "max_entries": 10000,  # conversas em memória (acima disso sai a usada há mais tempo)
+    "key_prefix": "session"  # chaves no Redis: <prefixo>:<conversation_id>
+}
+
+# Configurações da Fila de Envio (mensagens do WhatsApp fora da thread do webhook)
+OUTBOUND_CONFIG = {
+    "async": os.getenv("OUTBOUND_ASYNC", "true").lower() == "true",  # false: envia na hora, na thread de quem chamou
+    "workers": int(os.getenv("OUTBOUND_WORKERS", "8")),  # threads de envio (cada cliente fica sempre na mesma)
+    "queue_size": 1000,  # envios pendentes por thread (com a fila cheia, quem enfileira espera)
+    "shutdown_timeout": 5  # segundos para esvaziar as filas ao encerrar o processo
+}
+
 # Configurações de Monitoramento
 MONITORING_CONFIG = {
     "enabled": os.getenv("MONITORING_ENABLED", "true").lower() == "true",
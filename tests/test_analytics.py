@@ -0,0 +1,145 @@
+"""
+Testes das análises de agendamentos: mapa de ocupação, taxa de cancelamento e
+mix de serviços comparados com contagens diretas
+"""
+
+import datetime
+import random
+from collections import Counter
+
+import pytest
+
+from config.settings import SCHEDULING_CONFIG
+from agents.analytics import OCCUPYING_STATUSES, SchedulingAnalytics, appointments_frame, store_frame
+from agents.appointment_store import ColumnarAppointmentStore
+from agents.scheduling_logic import Appointment, BarberScheduler, WEEKDAY_NAMES
+
+SERVICES = ("Corte", "Barba", "Corte + Barba", "Sobrancelha")
+STATUSES = ("confirmed", "completed", "cancelled", "cancelled", "pending")
+BARBERS = ("ana", "bruno")
+
+TODAY = datetime.date.today()
+START = TODAY - datetime.timedelta(days=20)
+END = TODAY + datetime.timedelta(days=10)
+
+@pytest.fixture(autouse=True)
+def two_barbers(monkeypatch):
+    monkeypatch.setitem(SCHEDULING_CONFIG, "barbers", {barber: barber.title() for barber in BARBERS})
+
+def _appointments(count: int = 300, seed: int = 5):
+    rng = random.Random(seed)
+    now = datetime.datetime.now()
+    appointments = []
+    for index in range(count):
+        appointments.append(Appointment(
+            id=f"apt_{index:04d}", client_name=f"Cliente {index}", client_phone=f"119{index:08d}",
+            date=START + datetime.timedelta(days=rng.randrange((END - START).days + 1)),
+            time=datetime.time(rng.randrange(8, 19), rng.choice((0, 30))),
+            service=rng.choice(SERVICES), status=rng.choice(STATUSES),
+            created_at=now, updated_at=now, barber_id=rng.choice(BARBERS)
+        ))
+    return appointments
+
+@pytest.fixture(params=["dict", "columnar"])
+def scheduler(request):
+    store = {} if request.param == "dict" else ColumnarAppointmentStore()
+    for apt in _appointments():
+        store[apt.id] = apt
+    return BarberScheduler(store=store, ledger=None)
+
+@pytest.fixture
+def analytics(scheduler):
+    return SchedulingAnalytics(scheduler, include_archived=False)
+
+def _in_range(scheduler, start_date, end_date):
+    return [apt for apt in scheduler.appointments.values() if start_date <= apt.date <= end_date]
+
+def test_frames_match_appointments(scheduler):
+    frame = store_frame(scheduler.appointments)
+    expected = appointments_frame(scheduler.appointments.values())
+    key = ["day", "hour", "status", "service", "barber_id"]
+    as_rows = lambda df: sorted(map(tuple, df[key].astype(str).to_numpy().tolist()))
+    assert as_rows(frame) == as_rows(expected)
+    assert (frame["weekday"] == [datetime.date.fromordinal(int(day)).weekday() for day in frame["day"]]).all()
+
+def test_heatmap_matches_direct_count(scheduler, analytics):
+    occurrences = Counter(WEEKDAY_NAMES[(START + datetime.timedelta(days=offset)).weekday()]
+                          for offset in range((END - START).days + 1))
+
+    for barber_id in (None, "ana"):
+        counts = Counter(
+            (WEEKDAY_NAMES[apt.date.weekday()], apt.time.hour)
+            for apt in _in_range(scheduler, START, END)
+            if apt.status in OCCUPYING_STATUSES and barber_id in (None, apt.barber_id)
+        )
+        heatmap = analytics.occupancy_heatmap(START, END, barber_id=barber_id)
+        assert list(heatmap.index) == list(WEEKDAY_NAMES)
+        assert set(heatmap.columns) == {hour for _, hour in counts}
+        for weekday in WEEKDAY_NAMES:
+            for hour in heatmap.columns:
+                expected = counts[(weekday, hour)] / occurrences[weekday]
+                assert heatmap.loc[weekday, hour] == pytest.approx(expected)
+
+def test_cancellation_rate_matches_direct_count(scheduler, analytics):
+    appointments = _in_range(scheduler, START, END)
+    cancelled = [apt for apt in appointments if apt.status == "cancelled"]
+    assert analytics.cancellation_rate(START, END) == pytest.approx(len(cancelled) / len(appointments) * 100)
+
+    for by, key in (("weekday", lambda apt: WEEKDAY_NAMES[apt.date.weekday()]),
+                    ("hour", lambda apt: apt.time.hour),
+                    ("service", lambda apt: apt.service),
+                    ("barber_id", lambda apt: apt.barber_id),
+                    ("month", lambda apt: apt.date.strftime("%Y-%m"))):
+        totals = Counter(key(apt) for apt in appointments)
+        cancelled_by = Counter(key(apt) for apt in cancelled)
+        rates = analytics.cancellation_rate(START, END, by=by)
+        assert set(rates.index) == set(totals)
+        for group, total in totals.items():
+            assert rates[group] == pytest.approx(cancelled_by[group] / total * 100)
+
+def test_service_mix_matches_direct_count(scheduler, analytics):
+    counts = Counter(apt.service for apt in _in_range(scheduler, START, END) if apt.status in OCCUPYING_STATUSES)
+    mix = analytics.service_mix(START, END)
+    assert dict(mix["count"]) == dict(counts)
+    assert list(mix["count"]) == sorted(counts.values(), reverse=True)
+    assert mix["share"].sum() == pytest.approx(100)
+
+    report = analytics.report(START, END)
+    assert {service: row["count"] for service, row in report["service_mix"].items()} == dict(counts)
+    assert report["cancellation_rate"] == round(analytics.cancellation_rate(START, END), 2)
+
+def test_sub_ranges_reuse_closed_day_cube(scheduler, analytics):
+    # Primeiro um intervalo maior (agrega os dias fechados), depois recortes dele
+    analytics.service_mix(START, END)
+    middle = START + datetime.timedelta(days=7)
+    for first, last in ((START, middle), (middle, TODAY), (START + datetime.timedelta(days=3), END)):
+        counts = Counter(apt.service for apt in _in_range(scheduler, first, last)
+                         if apt.status in OCCUPYING_STATUSES)
+        assert dict(analytics.service_mix(first, last)["count"]) == dict(counts)
+
+def test_closed_days_are_cached_until_invalidated(scheduler, analytics):
+    yesterday = TODAY - datetime.timedelta(days=1)
+    before = analytics.service_mix(yesterday, yesterday)["count"].sum()
+
+    # Baixa tardia de um dia fechado: só aparece depois de invalidate(date)
+    now = datetime.datetime.now()
+    late = Appointment(id="apt_tardio", client_name="Tardio", client_phone="11900000000", date=yesterday,
+                       time=datetime.time(10), service="Corte", status="completed",
+                       created_at=now, updated_at=now, barber_id="ana")
+    scheduler.appointments[late.id] = late
+    scheduler._index_appointment(late)
+    assert analytics.service_mix(yesterday, yesterday)["count"].sum() == before
+
+    analytics.invalidate(yesterday)
+    assert analytics.service_mix(yesterday, yesterday)["count"].sum() == before + 1
+
+def test_open_days_are_always_recomputed(scheduler, analytics):
+    date = TODAY + datetime.timedelta(days=11)
+    while not scheduler.is_working_day(date):
+        date += datetime.timedelta(days=1)
+    assert analytics.service_mix(date, date).empty
+
+    time = scheduler.get_available_slots(date)[0].time
+    assert scheduler.create_appointment("Ana", "11911112222", date, time, service="Corte")[0]
+    assert dict(analytics.service_mix(date, date)["count"]) == {"Corte": 1}
+    assert analytics.cancellation_rate(date, date) == 0.0
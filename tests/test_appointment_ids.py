@@ -0,0 +1,54 @@
+"""
+Testes do gerador de IDs de agendamento
+"""
+
+import datetime
+import threading
+
+from agents.appointment_ids import (
+    AppointmentIdAllocator, appointment_id_created_at, appointment_id_range
+)
+
+def test_ids_are_unique_and_ordered_across_threads():
+    allocator = AppointmentIdAllocator(node_id=3)
+    generated = [[] for _ in range(8)]
+
+    def worker(ids):
+        for _ in range(2000):
+            ids.append(allocator.next_id())
+
+    threads = [threading.Thread(target=worker, args=(ids,)) for ids in generated]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    all_ids = [appointment_id for ids in generated for appointment_id in ids]
+    assert len(set(all_ids)) == len(all_ids)
+    assert len({len(appointment_id) for appointment_id in all_ids}) == 1
+    # Em cada thread, os IDs saem em ordem crescente
+    assert all(ids == sorted(ids) for ids in generated)
+
+def test_nodes_never_collide():
+    first, second = AppointmentIdAllocator(node_id=1), AppointmentIdAllocator(node_id=2)
+    first_ids = {first.next_id() for _ in range(1000)}
+    second_ids = {second.next_id() for _ in range(1000)}
+    assert not first_ids & second_ids
+
+def test_created_at_and_range_from_id():
+    before = datetime.datetime.now() - datetime.timedelta(milliseconds=1)
+    appointment_id = AppointmentIdAllocator().next_id()
+    after = datetime.datetime.now() + datetime.timedelta(milliseconds=1)
+
+    created_at = appointment_id_created_at(appointment_id)
+    assert before <= created_at <= after
+    low, high = appointment_id_range(before, after)
+    assert low <= appointment_id < high
+    low, high = appointment_id_range(after, after + datetime.timedelta(hours=1))
+    assert not low <= appointment_id < high
+
+def test_legacy_ids_have_no_creation_time():
+    assert appointment_id_created_at("apt_20260101_093015_0001") is None
+    assert appointment_id_created_at("apt_xyz") is None
+    low, high = appointment_id_range(datetime.datetime(2020, 1, 1), datetime.datetime(2030, 1, 1))
+    assert not low <= "apt_20260101_093015_0001" < high
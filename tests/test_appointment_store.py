@@ -0,0 +1,136 @@
+"""
+Testes do armazenamento colunar de agendamentos
+"""
+
+import datetime
+import random
+
+import pytest
+
+from config.settings import SCHEDULING_CONFIG
+from agents.appointment_store import ColumnarAppointmentStore
+from agents.scheduling_logic import Appointment, BarberScheduler
+
+def _appointment(index: int, barber_id="barbeiro_0") -> Appointment:
+    created_at = datetime.datetime(2026, 10, 1, 9, 30, 15, 123456) + datetime.timedelta(hours=index)
+    return Appointment(
+        id=f"apt_{index:04d}", client_name=f"Cliente {index % 5}", client_phone=f"119000{index % 7:05d}",
+        date=datetime.date(2026, 11, 3) + datetime.timedelta(days=index % 10),
+        time=datetime.time(8 + index % 10, 15 * (index % 4)), service=("Corte", "Barba")[index % 2],
+        status=("confirmed", "cancelled", "completed")[index % 3],
+        created_at=created_at, updated_at=created_at + datetime.timedelta(seconds=index),
+        barber_id=barber_id
+    )
+
+def test_round_trip_and_removal_keep_other_rows():
+    store = ColumnarAppointmentStore()
+    appointments = {f"apt_{index:04d}": _appointment(index) for index in range(50)}
+    appointments["apt_0007"] = _appointment(7, barber_id=None)
+    for appointment_id, appointment in appointments.items():
+        store[appointment_id] = appointment
+
+    # Remoções no meio trocam a última linha de posição
+    for appointment_id in ("apt_0000", "apt_0025", "apt_0049", "apt_0010"):
+        del store[appointment_id]
+        del appointments[appointment_id]
+
+    assert len(store) == len(appointments) and set(store) == set(appointments)
+    assert {appointment_id: store[appointment_id].to_appointment() for appointment_id in store} == appointments
+    assert store["apt_0007"].barber_id is None
+    assert "apt_0000" not in store
+    with pytest.raises(KeyError):
+        store["apt_0000"]
+    with pytest.raises(KeyError):
+        del store["apt_0000"]
+
+def test_view_writes_go_to_the_columns():
+    store = ColumnarAppointmentStore()
+    store["apt_0001"] = _appointment(1)
+    view = store["apt_0001"]
+
+    view.status = "cancelled"
+    view.time = datetime.time(17, 45)
+    view.date = datetime.date(2026, 12, 24)
+    view.barber_id = "barbeiro_1"
+
+    stored = store["apt_0001"].to_appointment()
+    assert (stored.status, stored.time, stored.date, stored.barber_id) == (
+        "cancelled", datetime.time(17, 45), datetime.date(2026, 12, 24), "barbeiro_1"
+    )
+
+    # Sobrescrever o registro atualiza a mesma linha
+    store["apt_0001"] = _appointment(1)
+    assert len(store) == 1 and store["apt_0001"].to_appointment() == _appointment(1)
+
+def test_failed_insert_leaves_columns_aligned():
+    store = ColumnarAppointmentStore()
+    # A coluna de status guarda códigos de 1 byte: o 257º status distinto não cabe
+    for index in range(256):
+        appointment = _appointment(index)
+        appointment.status = f"status_{index}"
+        store[appointment.id] = appointment
+
+    overflow = _appointment(300)
+    overflow.status = "status_300"
+    with pytest.raises(OverflowError):
+        store[overflow.id] = overflow
+    assert overflow.id not in store and len(store) == 256
+    assert all(len(column) == 256 for column in store._columns())
+
+    # Atualização que falha restaura a linha anterior
+    before = store["apt_0003"].to_appointment()
+    changed = _appointment(3)
+    changed.status = "status_301"
+    with pytest.raises(OverflowError):
+        store["apt_0003"] = changed
+    assert store["apt_0003"].to_appointment() == before
+
+def test_export_and_reload_columns():
+    store = ColumnarAppointmentStore()
+    for index in range(30):
+        store[f"apt_{index:04d}"] = _appointment(index)
+    del store["apt_0004"]
+
+    reloaded = ColumnarAppointmentStore.from_columns(store.export_columns())
+    assert set(reloaded) == set(store) and len(reloaded) == len(store)
+    assert all(reloaded[appointment_id].to_appointment() == store[appointment_id].to_appointment()
+               for appointment_id in store)
+    reloaded["apt_0100"] = _appointment(100)
+    assert reloaded["apt_0100"].to_appointment() == _appointment(100)
+
+def test_scheduler_behaves_the_same_on_columnar_store(monkeypatch):
+    monkeypatch.setitem(SCHEDULING_CONFIG, "barbers", {"barbeiro_0": "Barbeiro 0", "barbeiro_1": "Barbeiro 1"})
+    schedulers = [BarberScheduler(store={}, ledger=None),
+                  BarberScheduler(store=ColumnarAppointmentStore(), ledger=None)]
+    days = []
+    date = datetime.date.today() + datetime.timedelta(days=1)
+    while len(days) < 3:
+        if schedulers[0].is_working_day(date):
+            days.append(date)
+        date += datetime.timedelta(days=1)
+
+    # Mesma sequência de operações nos dois armazenamentos
+    for scheduler in schedulers:
+        rng = random.Random(5)
+        for index in range(150):
+            booked = [appointment_id for appointment_id in scheduler.appointments
+                      if scheduler.appointments[appointment_id].status == "confirmed"]
+            date = rng.choice(days)
+            time = rng.choice(scheduler.generate_time_slots(date)).time
+            action = rng.random()
+            if action < 0.6 or not booked:
+                scheduler.create_appointment(f"Cliente {index}", f"119{index:08d}", date, time)
+            elif action < 0.8:
+                scheduler.cancel_appointment(rng.choice(booked))
+            else:
+                scheduler.reschedule_appointment(rng.choice(booked), date, time)
+
+    in_memory, columnar = schedulers
+    assert columnar.get_appointment_statistics() == in_memory.get_appointment_statistics()
+    for date in days:
+        assert [slot.time for slot in columnar.get_available_slots(date)] == [
+            slot.time for slot in in_memory.get_available_slots(date)
+        ]
+        assert [(apt.time, apt.barber_id) for apt in columnar.get_appointment_by_date(date)] == [
+            (apt.time, apt.barber_id) for apt in in_memory.get_appointment_by_date(date)
+        ]
@@ -0,0 +1,203 @@
+"""
+Testes da disponibilidade do BarberScheduler: índice de horários por data
+comparado a um cálculo direto sobre os agendamentos armazenados
+"""
+
+import datetime
+import random
+
+import pytest
+
+from config.settings import SCHEDULING_CONFIG
+from agents.scheduling_logic import WEEKDAY_NAMES, BarberScheduler
+
+SERVICES = ("Corte", "Barba", "Corte + Barba", "Sobrancelha", "Pigmentação")
+
+@pytest.fixture(autouse=True)
+def one_barber(monkeypatch):
+    monkeypatch.setitem(SCHEDULING_CONFIG, "barbers", {"barbeiro_0": "Barbeiro 0"})
+
+@pytest.fixture
+def scheduler():
+    return BarberScheduler(store={}, ledger=None)
+
+def _working_days(scheduler: BarberScheduler, count: int):
+    days = []
+    date = datetime.date.today() + datetime.timedelta(days=1)
+    while len(days) < count:
+        if scheduler.is_working_day(date):
+            days.append(date)
+        date += datetime.timedelta(days=1)
+    return days
+
+def _minutes(value: datetime.time) -> int:
+    return value.hour * 60 + value.minute
+
+def _busy_intervals(scheduler: BarberScheduler, date: datetime.date):
+    """Intervalos ocupados na data, lidos direto dos agendamentos confirmados"""
+    return [
+        (_minutes(apt.time), _minutes(apt.time) + scheduler.get_service_duration(apt.service) + scheduler.buffer_time, apt.id)
+        for apt in scheduler.appointments.values()
+        if apt.date == date and apt.status == "confirmed"
+    ]
+
+def _expected_available(scheduler: BarberScheduler, date: datetime.date):
+    """Horários da grade sem nenhum agendamento confirmado sobreposto (varredura completa)"""
+    step = scheduler.appointment_duration + scheduler.buffer_time
+    start, end = scheduler.get_working_hours_for_date(date)
+    busy = _busy_intervals(scheduler, date)
+    available = []
+    minutes = _minutes(start)
+    while minutes < _minutes(end):
+        if not any(busy_start < minutes + step and busy_end > minutes for busy_start, busy_end, _ in busy):
+            available.append(datetime.time(minutes // 60, minutes % 60))
+        minutes += step
+    return available
+
+def _random_operations(scheduler: BarberScheduler, days, operations: int, seed: int = 7):
+    """Reservas, cancelamentos e remarcações aleatórias (muitas falham por conflito)"""
+    rng = random.Random(seed)
+    for index in range(operations):
+        action = rng.random()
+        booked = [apt.id for apt in scheduler.appointments.values() if apt.status == "confirmed"]
+        date = rng.choice(days)
+        grid = [slot.time for slot in scheduler.generate_time_slots(date)]
+        if action < 0.6 or not booked:
+            scheduler.create_appointment(f"Cliente {index}", f"119{index:08d}", date, rng.choice(grid),
+                                         service=rng.choice(SERVICES))
+        elif action < 0.8:
+            scheduler.cancel_appointment(rng.choice(booked))
+        else:
+            scheduler.reschedule_appointment(rng.choice(booked), date, rng.choice(grid))
+
+def test_available_slots_match_full_scan(scheduler):
+    days = _working_days(scheduler, 4)
+    for checkpoint in range(4):
+        _random_operations(scheduler, days, 60, seed=checkpoint)
+        for date in days:
+            available = [slot.time for slot in scheduler.get_available_slots(date)]
+            assert available == _expected_available(scheduler, date)
+            slots = scheduler.generate_time_slots(date)
+            assert [slot.time for slot in slots if slot.available] == available
+
+def test_occupied_slot_points_to_its_appointment(scheduler):
+    days = _working_days(scheduler, 2)
+    _random_operations(scheduler, days, 80)
+    step = scheduler.appointment_duration + scheduler.buffer_time
+
+    for date in days:
+        busy = _busy_intervals(scheduler, date)
+        for slot in scheduler.generate_time_slots(date):
+            start = _minutes(slot.time)
+            overlapping = {apt_id for busy_start, busy_end, apt_id in busy
+                           if busy_start < start + step and busy_end > start}
+            if slot.available:
+                assert not overlapping
+            else:
+                assert slot.appointment_id in overlapping
+                assert scheduler.get_appointment_id_for_time(date, slot.time) in overlapping
+
+        expected = sorted((apt for apt in scheduler.appointments.values()
+                           if apt.date == date and apt.status == "confirmed"), key=lambda apt: apt.time)
+        assert [apt.id for apt in scheduler.get_appointment_by_date(date)] == [apt.id for apt in expected]
+
+def test_indexes_rebuilt_from_existing_store(scheduler):
+    days = _working_days(scheduler, 3)
+    _random_operations(scheduler, days, 120)
+
+    reloaded = BarberScheduler(store=scheduler.appointments, ledger=None)
+    for date in days:
+        assert reloaded.get_available_slots(date) == scheduler.get_available_slots(date)
+        assert reloaded.generate_time_slots(date) == scheduler.generate_time_slots(date)
+
+def test_free_slot_search_across_days(scheduler):
+    days = _working_days(scheduler, 3)
+    _random_operations(scheduler, days, 90)
+
+    expected = [
+        (date, slot_time)
+        for date in scheduler._booking_window()
+        if scheduler.is_working_day(date)
+        for slot_time in _expected_available(scheduler, date)
+    ]
+    assert scheduler.find_free_slots(limit=25) == expected[:25]
+    assert scheduler.find_free_slots(limit=5, start_date=days[1]) == [
+        (date, slot_time) for date, slot_time in expected if date >= days[1]
+    ][:5]
+
+def test_fully_booked_days_are_skipped(scheduler):
+    first, second = _working_days(scheduler, 2)
+    for index, slot in enumerate(scheduler.get_available_slots(first)):
+        assert scheduler.create_appointment(f"Cliente {index}", f"119{index:08d}", first, slot.time)[0]
+
+    assert first not in scheduler.get_days_with_availability(start_date=first)
+    assert scheduler.get_days_with_availability(start_date=first, limit=1) == [second]
+    assert scheduler.find_free_slots(limit=1, start_date=first) == [
+        (second, scheduler.get_available_slots(second)[0].time)
+    ]
+
+    # Um cancelamento devolve o dia à busca
+    appointment_id = scheduler.get_appointment_by_date(first)[0].id
+    assert scheduler.cancel_appointment(appointment_id)[0]
+    assert scheduler.get_days_with_availability(start_date=first, limit=1) == [first]
+
+def test_days_with_availability_respect_booking_window(scheduler):
+    window = scheduler._booking_window()
+    days = scheduler.get_days_with_availability()
+    assert days == [date for date in window if scheduler.is_working_day(date)]
+    assert days[-1] <= datetime.date.today() + datetime.timedelta(days=scheduler.advance_booking_days)
+    assert scheduler.get_days_with_availability(limit=3) == days[:3]
+
+def _grid_by_loop(start: str, end: str, step: int):
+    """Grade gerada como no cálculo original: de start a end, a cada step minutos"""
+    current = datetime.datetime.strptime(start, "%H:%M")
+    end_time = datetime.datetime.strptime(end, "%H:%M")
+    grid = []
+    while current < end_time:
+        grid.append(current.time())
+        current += datetime.timedelta(minutes=step)
+    return grid
+
+def test_precompiled_grid_matches_working_hours(scheduler):
+    step = scheduler.appointment_duration + scheduler.buffer_time
+    date = datetime.date.today()
+    for _ in range(7):
+        hours = scheduler.working_hours.get(WEEKDAY_NAMES[date.weekday()])
+        slots = [slot.time for slot in scheduler.generate_time_slots(date)]
+        if hours is None:
+            assert slots == [] and not scheduler.is_working_day(date)
+        else:
+            assert slots == _grid_by_loop(hours["start"], hours["end"], step)
+            assert scheduler.get_working_hours_for_date(date) == (
+                datetime.time.fromisoformat(hours["start"]), datetime.time.fromisoformat(hours["end"])
+            )
+        date += datetime.timedelta(days=1)
+
+    # Dias com o mesmo expediente compartilham a grade
+    templates = [template for template in scheduler._slot_templates if template is not None]
+    assert len({id(template) for template in templates}) == len(
+        {(hours["start"], hours["end"]) for hours in scheduler.working_hours.values()}
+    )
+
+def test_working_hours_update_recompiles_grid(scheduler):
+    date = _working_days(scheduler, 1)[0]
+    kept = scheduler.get_available_slots(date)[2].time
+    assert scheduler.create_appointment("Ana", "11911112222", date, kept)[0]
+
+    weekday = WEEKDAY_NAMES[date.weekday()]
+    working_hours = dict(scheduler.working_hours)
+    working_hours[weekday] = {"start": "07:00", "end": "12:00"}
+    scheduler.update_working_hours(working_hours=working_hours, buffer_time=0)
+
+    assert [slot.time for slot in scheduler.generate_time_slots(date)] == _grid_by_loop("07:00", "12:00", 30)
+    assert scheduler.get_available_slots(date) == [
+        slot for slot in scheduler.generate_time_slots(date) if slot.available
+    ]
+    # O agendamento existente continua ocupando o horário na nova grade
+    assert kept not in [slot.time for slot in scheduler.get_available_slots(date)]
+    assert [slot.time for slot in scheduler.get_available_slots(date)] == _expected_available(scheduler, date)
+
+    del working_hours[weekday]
+    scheduler.update_working_hours(working_hours=working_hours)
+    assert not scheduler.is_working_day(date)
+    assert scheduler.generate_time_slots(date) == []
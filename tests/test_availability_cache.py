@@ -0,0 +1,116 @@
+"""
+Testes do cache de disponibilidade (em memória e no Redis) e da invalidação
+pelas alterações do scheduler
+"""
+
+import datetime
+
+import pytest
+
+from config.settings import SCHEDULING_CONFIG
+from agents.availability_cache import (
+    InProcessAvailabilityCache, RedisAvailabilityCache, dumps_slots, loads_slots
+)
+from agents.scheduling_logic import BarberScheduler, TimeSlot
+
+DAY = datetime.date(2026, 11, 3)
+OTHER_DAY = datetime.date(2026, 11, 4)
+
+def _slots(*hours):
+    return [TimeSlot(time=datetime.time(hour), available=True) for hour in hours]
+
+@pytest.fixture(params=["memory", "redis"])
+def cache(request):
+    if request.param == "memory":
+        return InProcessAvailabilityCache(max_size=100, ttl=60)
+    fakeredis = pytest.importorskip("fakeredis")
+    return RedisAvailabilityCache(client=fakeredis.FakeStrictRedis(), max_size=100, ttl=60)
+
+@pytest.fixture(autouse=True)
+def one_barber(monkeypatch):
+    monkeypatch.setitem(SCHEDULING_CONFIG, "barbers", {"barbeiro_0": "Barbeiro 0"})
+
+def test_hits_and_per_date_invalidation(cache):
+    calls = []
+
+    def compute(date, hours):
+        def run():
+            calls.append(date)
+            return _slots(*hours)
+        return run
+
+    assert cache.get_or_compute(DAY, "available", compute(DAY, (9, 10))) == _slots(9, 10)
+    assert cache.get_or_compute(DAY, "available", compute(DAY, (11,))) == _slots(9, 10)
+    assert cache.get_or_compute(OTHER_DAY, "available", compute(OTHER_DAY, (14,))) == _slots(14)
+
+    cache.invalidate(DAY)
+    assert cache.get_or_compute(DAY, "available", compute(DAY, (11,))) == _slots(11)
+    assert cache.get_or_compute(OTHER_DAY, "available", compute(OTHER_DAY, (15,))) == _slots(14)
+    assert calls == [DAY, OTHER_DAY, DAY]
+
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["invalidations"]) == (2, 3, 1)
+
+def test_value_computed_across_an_invalidation_is_not_stored(cache):
+    def stale():
+        # Reserva no meio do cálculo
+        cache.invalidate(DAY)
+        return _slots(9, 10)
+
+    assert cache.get_or_compute(DAY, "available", stale) == _slots(9, 10)
+    assert cache.get_or_compute(DAY, "available", lambda: _slots(10)) == _slots(10)
+
+    def cleared():
+        cache.clear()
+        return _slots(8)
+
+    cache.invalidate(DAY)
+    cache.get_or_compute(DAY, "available", cleared)
+    assert cache.get_or_compute(DAY, "available", lambda: _slots(12)) == _slots(12)
+
+def test_least_recently_used_entries_are_evicted():
+    cache = InProcessAvailabilityCache(max_size=2, ttl=60)
+    cache.get_or_compute(DAY, "a", lambda: _slots(9))
+    cache.get_or_compute(OTHER_DAY, "a", lambda: _slots(10))
+    cache.get_or_compute(DAY, "a", lambda: _slots(11))
+    cache.get_or_compute(OTHER_DAY + datetime.timedelta(days=1), "a", lambda: _slots(12))
+
+    assert cache.get_stats()["evictions"] == 1 and cache.get_stats()["size"] == 2
+    assert cache.get_or_compute(DAY, "a", lambda: _slots(13)) == _slots(9)
+    assert cache.get_or_compute(OTHER_DAY, "a", lambda: _slots(14)) == _slots(14)
+
+def test_redis_cache_evicts_least_recent_dates():
+    fakeredis = pytest.importorskip("fakeredis")
+    cache = RedisAvailabilityCache(client=fakeredis.FakeStrictRedis(), max_size=2, ttl=60)
+    for offset in range(3):
+        cache.get_or_compute(DAY + datetime.timedelta(days=offset), "a", lambda: _slots(9))
+
+    assert cache.get_stats()["evictions"] == 1
+    assert cache.client.zcard(cache._lru_key) == 2
+    assert not cache.client.exists(cache._data_key(DAY))
+
+def test_slots_are_serialized_as_plain_json():
+    slots = [TimeSlot(time=datetime.time(9, 45), available=False, appointment_id="apt_1")] + _slots(10)
+    raw = dumps_slots(slots)
+    assert raw.startswith(b'[["09:45:00",false,"apt_1"]')
+    assert loads_slots(raw) == slots
+
+def test_scheduler_bookings_invalidate_cached_availability(cache):
+    scheduler = BarberScheduler(store={}, cache=cache, ledger=None)
+    date = datetime.date.today() + datetime.timedelta(days=1)
+    while not scheduler.is_working_day(date):
+        date += datetime.timedelta(days=1)
+
+    slots = scheduler.get_available_slots(date)
+    # A lista devolvida é uma cópia: alterá-la não afeta o cache
+    slots.clear()
+    slots = scheduler.get_available_slots(date)
+    assert slots and cache.get_stats()["hits"] == 1
+
+    _, _, appointment_id = scheduler.create_appointment("Ana", "11911112222", date, slots[0].time)
+    assert slots[0].time not in [slot.time for slot in scheduler.get_available_slots(date)]
+    assert not scheduler.generate_time_slots(date)[0].available
+
+    assert scheduler.cancel_appointment(appointment_id)[0]
+    assert slots[0].time in [slot.time for slot in scheduler.get_available_slots(date)]
+    assert scheduler.get_cache_statistics()["invalidations"] >= 2
@@ -0,0 +1,93 @@
+"""
+Testes da agenda com vários barbeiros: distribuição para o menos ocupado,
+barbeiro escolhido pelo cliente e folgas
+"""
+
+import datetime
+from collections import Counter
+
+import pytest
+
+from config.settings import SCHEDULING_CONFIG
+from agents.scheduling_logic import BarberScheduler
+
+BARBERS = {"ana": "Ana", "bruno": "Bruno", "carla": "Carla"}
+
+@pytest.fixture(autouse=True)
+def three_barbers(monkeypatch):
+    monkeypatch.setitem(SCHEDULING_CONFIG, "barbers", dict(BARBERS))
+
+@pytest.fixture
+def scheduler():
+    return BarberScheduler(store={}, ledger=None)
+
+def _next_working_day(scheduler: BarberScheduler) -> datetime.date:
+    date = datetime.date.today() + datetime.timedelta(days=1)
+    while not scheduler.is_working_day(date):
+        date += datetime.timedelta(days=1)
+    return date
+
+def _loads(scheduler: BarberScheduler, date: datetime.date) -> Counter:
+    return Counter(apt.barber_id for apt in scheduler.appointments.values()
+                   if apt.date == date and apt.status == "confirmed")
+
+def test_bookings_go_to_least_loaded_free_barber(scheduler):
+    date = _next_working_day(scheduler)
+    grid = [slot.time for slot in scheduler.generate_time_slots(date)]
+
+    # Um horário comporta os três barbeiros; o quarto cliente fica sem vaga
+    results = [scheduler.create_appointment(f"Cliente {index}", f"119{index:08d}", date, grid[0])
+               for index in range(4)]
+    assert [success for success, _, _ in results] == [True, True, True, False]
+    assert set(_loads(scheduler, date)) == set(BARBERS)
+    assert grid[0] not in [slot.time for slot in scheduler.get_available_slots(date)]
+
+    # Horários seguintes: a carga fica equilibrada entre os barbeiros
+    for index, time in enumerate(grid[1:7]):
+        assert scheduler.create_appointment(f"Outro {index}", f"118{index:08d}", date, time)[0]
+        loads = _loads(scheduler, date)
+        assert max(loads.values()) - min(loads.values()) <= 1
+
+def test_requested_barber_is_kept(scheduler):
+    date = _next_working_day(scheduler)
+    time = scheduler.get_available_slots(date)[0].time
+
+    success, _, appointment_id = scheduler.create_appointment("Cliente", "11911112222", date, time, barber_id="carla")
+    assert success and scheduler.appointments[appointment_id].barber_id == "carla"
+    assert time not in [slot.time for slot in scheduler.get_available_slots(date, barber_id="carla")]
+    assert time in [slot.time for slot in scheduler.get_available_slots(date)]
+
+    success, message, _ = scheduler.create_appointment("Outro", "11933334444", date, time, barber_id="carla")
+    assert not success and message
+    success, message, _ = scheduler.create_appointment("Outro", "11933334444", date, time, barber_id="diego")
+    assert not success and "barbeiro" in message
+
+def test_reschedule_keeps_barber_when_free(scheduler):
+    date = _next_working_day(scheduler)
+    grid = [slot.time for slot in scheduler.generate_time_slots(date)]
+    _, _, appointment_id = scheduler.create_appointment("Cliente", "11911112222", date, grid[0], barber_id="bruno")
+
+    assert scheduler.reschedule_appointment(appointment_id, date, grid[3])[0]
+    assert scheduler.appointments[appointment_id].barber_id == "bruno"
+
+    # Bruno ocupado no novo horário: passa para outro barbeiro livre
+    scheduler.create_appointment("Outro", "11933334444", date, grid[5], barber_id="bruno")
+    assert scheduler.reschedule_appointment(appointment_id, date, grid[5])[0]
+    assert scheduler.appointments[appointment_id].barber_id in {"ana", "carla"}
+
+def test_absent_barber_is_not_booked(scheduler):
+    date = _next_working_day(scheduler)
+    scheduler.update_calendar([{"date": date.isoformat(), "barber_id": "ana", "closed": True, "reason": "Folga"}])
+    grid = [slot.time for slot in scheduler.generate_time_slots(date)]
+
+    results = [scheduler.create_appointment(f"Cliente {index}", f"119{index:08d}", date, grid[0])
+               for index in range(3)]
+    assert [success for success, _, _ in results] == [True, True, False]
+    assert "ana" not in _loads(scheduler, date)
+    assert scheduler.get_available_slots(date, barber_id="ana") == []
+
+    success, message, _ = scheduler.create_appointment("Outro", "11933334444", date, grid[1], barber_id="ana")
+    assert not success and message
+    # Nos outros dias a barbeira atende normalmente
+    other_day = date + datetime.timedelta(days=7)
+    assert scheduler.get_available_slots(other_day, barber_id="ana")
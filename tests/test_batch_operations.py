@@ -0,0 +1,133 @@
+"""
+Testes das operações em lote do scheduler e das ações do webhook do Make
+"""
+
+import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from config.settings import SCHEDULING_CONFIG
+from agents.scheduling_logic import BarberScheduler
+from workflows.webhooks.make_webhook import MakeWebhook
+
+@pytest.fixture(autouse=True)
+def one_barber(monkeypatch):
+    monkeypatch.setitem(SCHEDULING_CONFIG, "barbers", {"barbeiro_0": "Barbeiro 0"})
+
+@pytest.fixture
+def scheduler():
+    return BarberScheduler(store={}, ledger=None)
+
+@pytest.fixture
+def webhook(scheduler, monkeypatch):
+    webhook = MakeWebhook()
+    webhook.barber_agent = SimpleNamespace(scheduler=scheduler)
+    webhook.sent = []
+    monkeypatch.setattr(webhook, "send_whatsapp_response",
+                        lambda phone_number, message, quick_replies=None: webhook.sent.append(message) or True)
+    return webhook
+
+def _next_working_day(scheduler: BarberScheduler) -> datetime.date:
+    date = datetime.date.today() + datetime.timedelta(days=1)
+    while not scheduler.get_available_slots(date):
+        date += datetime.timedelta(days=1)
+    return date
+
+def _booking(name: str, phone: str, date: datetime.date, time: datetime.time) -> dict:
+    return {"client_name": name, "client_phone": phone, "date": date, "time": time}
+
+def test_atomic_create_applies_nothing_when_one_item_fails(scheduler):
+    date = _next_working_day(scheduler)
+    first, second = [slot.time for slot in scheduler.get_available_slots(date)][:2]
+    bookings = [
+        _booking("Ana", "11911112222", date, first),
+        _booking("Bia", "11933334444", date, second),
+        _booking("Caio", "11955556666", date, first),
+    ]
+
+    results = scheduler.create_appointments(bookings, atomic=True)
+    assert [success for success, _, _ in results] == [False, False, False]
+    assert all(appointment_id is None for _, _, appointment_id in results)
+    assert not scheduler.appointments
+    assert {first, second} <= {slot.time for slot in scheduler.get_available_slots(date)}
+
+    # Sem atomic, cada item tem o próprio resultado
+    results = scheduler.create_appointments(bookings, atomic=False)
+    assert [success for success, _, _ in results] == [True, True, False]
+    assert len(scheduler.appointments) == 2
+
+def test_atomic_cancel_and_reschedule_are_undone(scheduler):
+    date = _next_working_day(scheduler)
+    times = [slot.time for slot in scheduler.get_available_slots(date)][:3]
+    ids = [appointment_id for _, _, appointment_id in scheduler.create_appointments([
+        _booking("Ana", "11911112222", date, times[0]),
+        _booking("Bia", "11933334444", date, times[1]),
+    ])]
+
+    results = scheduler.cancel_appointments([ids[0], "apt_inexistente"], atomic=True)
+    assert [success for success, _ in results] == [False, False]
+    assert scheduler.appointments[ids[0]].status == "confirmed"
+    assert times[0] not in [slot.time for slot in scheduler.get_available_slots(date)]
+
+    # O segundo item tenta o horário que o primeiro acabou de ocupar
+    results = scheduler.reschedule_appointments([
+        {"appointment_id": ids[0], "new_date": date, "new_time": times[2]},
+        {"appointment_id": ids[1], "new_date": date, "new_time": times[2]},
+    ], atomic=True)
+    assert [success for success, _ in results] == [False, False]
+    assert [scheduler.appointments[appointment_id].time for appointment_id in ids] == times[:2]
+    assert times[2] in [slot.time for slot in scheduler.get_available_slots(date)]
+
+@pytest.mark.parametrize("value, expected", [
+    (True, True), (False, False), (1, True), (0, False),
+    ("true", True), ("False", False), (" TRUE ", True), ("1", True), ("0", False),
+])
+def test_parse_flag_accepts_booleans(value, expected):
+    assert MakeWebhook._parse_flag(value) is expected
+
+@pytest.mark.parametrize("value", ["yes", "", "falso", 2, None, 1.0])
+def test_parse_flag_rejects_other_values(value):
+    with pytest.raises(ValueError):
+        MakeWebhook._parse_flag(value)
+
+def test_batch_action_reports_items_and_rejects_invalid_flag(webhook, scheduler):
+    date = _next_working_day(scheduler)
+    first = scheduler.get_available_slots(date)[0].time.strftime("%H:%M")
+    items = [
+        {"client_name": "Ana", "phone_number": "11911112222", "date": date.isoformat(), "time": first},
+        {"client_name": "Bia", "phone_number": "11933334444", "date": date.isoformat(), "time": first},
+    ]
+
+    response = webhook.handle_batch_scheduling_request({"items": items, "atomic": "yes"})
+    assert not response["success"] and "atomic" in response["error"]
+    assert not scheduler.appointments
+
+    # "false" como texto não pode virar lote atômico
+    response = webhook.handle_batch_scheduling_request({"items": items, "atomic": "false"})
+    assert (response["atomic"], response["applied"], response["failed"]) == (False, 1, 1)
+    assert response["results"][0]["appointment_id"] in scheduler.appointments
+
+def test_single_cancel_action_reports_scheduler_result(webhook, scheduler):
+    date = _next_working_day(scheduler)
+    time = scheduler.get_available_slots(date)[0].time
+    _, _, appointment_id = scheduler.create_appointment("Ana", "11911112222", date, time)
+
+    response = webhook.handle_cancellation_request({"phone_number": "11911112222", "appointment_id": appointment_id})
+    assert response["success"] and scheduler.appointments[appointment_id].status == "cancelled"
+
+    response = webhook.handle_cancellation_request({"phone_number": "11911112222", "appointment_id": "apt_inexistente"})
+    assert not response["success"] and response["error"]
+    assert len(webhook.sent) == 1
+
+def test_availability_action_parses_date(webhook, scheduler):
+    date = _next_working_day(scheduler)
+    slots = scheduler.get_available_slots(date)
+
+    response = webhook.handle_availability_check({"phone_number": "11911112222", "date": date.isoformat()})
+    assert response["success"] and response["available_slots"] == len(slots)
+    assert date.strftime("%d/%m/%Y") in webhook.sent[0]
+    assert slots[0].time.strftime("%H:%M") in webhook.sent[0]
+
+    response = webhook.handle_availability_check({"phone_number": "11911112222", "date": "amanhã"})
+    assert not response["success"] and response["error"]
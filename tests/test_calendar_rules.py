@@ -0,0 +1,71 @@
+"""
+Testes do calendário de exceções: validação das regras e efeito nas grades do dia
+"""
+
+import datetime
+
+import pytest
+
+from config.settings import SCHEDULING_CONFIG
+from agents.calendar_rules import parse_calendar_rule, parse_calendar_rules
+from agents.scheduling_logic import BarberScheduler
+
+def _working_days(scheduler: BarberScheduler, count: int):
+    """Próximos dias com expediente (a partir de amanhã)"""
+    days = []
+    date = datetime.date.today() + datetime.timedelta(days=1)
+    while len(days) < count:
+        if scheduler.get_available_slots(date):
+            days.append(date)
+        date += datetime.timedelta(days=1)
+    return days
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    monkeypatch.setitem(SCHEDULING_CONFIG, "barbers", {"barbeiro_0": "Barbeiro 0", "barbeiro_1": "Barbeiro 1"})
+    return BarberScheduler(store={}, ledger=None)
+
+@pytest.mark.parametrize("entry", [
+    {"date": "2026-12-24", "closed": False},
+    {"date": "2026-12-24", "hours": {"start": "18:00", "end": "09:00"}},
+    {"date": "2026-12-24", "hours": {"start": "12:00", "end": "12:00"}},
+    {"date": "2026-12-24", "hours": {"start": "9h", "end": "12:00"}},
+    {"date": "2026-12-24", "barber_id": "barbeiro_0", "hours": {"start": "09:00", "end": "12:00"}},
+    {"closed": True},
+])
+def test_invalid_rules_raise_value_error(entry):
+    with pytest.raises(ValueError):
+        parse_calendar_rule(entry)
+
+def test_invalid_rules_are_skipped_and_specific_rules_applied_last():
+    rules = parse_calendar_rules([
+        {"date": "2026-12-24", "hours": {"start": "09:00", "end": "13:00"}},
+        {"date": "2026-12-31", "closed": False},
+        {"start": "2026-12-20", "end": "2026-12-31", "closed": True},
+        {"weekday": "monday", "closed": True},
+    ])
+
+    assert [rule.priority for rule in rules] == [0, 1, 2]
+    assert rules[2].hours == ("09:00", "13:00") and not rules[2].closed
+
+def test_calendar_closes_day_changes_hours_and_removes_absent_barber(scheduler):
+    closed_day, short_day, vacation_day = _working_days(scheduler, 3)
+
+    scheduler.update_calendar([
+        {"date": closed_day.isoformat(), "closed": True, "reason": "Feriado"},
+        {"date": short_day.isoformat(), "hours": {"start": "09:00", "end": "12:00"}},
+        {"date": vacation_day.isoformat(), "barber_id": "barbeiro_0", "closed": True},
+    ])
+
+    assert scheduler.get_available_slots(closed_day) == []
+    success, _, _ = scheduler.create_appointment("Cliente", "11988887777", closed_day, datetime.time(10))
+    assert not success
+
+    times = [slot.time for slot in scheduler.get_available_slots(short_day)]
+    assert times and times[0] >= datetime.time(9) and times[-1] < datetime.time(12)
+
+    success, _, appointment_id = scheduler.create_appointment(
+        "Cliente", "11988886666", vacation_day, scheduler.get_available_slots(vacation_day)[0].time
+    )
+    assert success
+    assert scheduler.appointments[appointment_id].barber_id == "barbeiro_1"
@@ -0,0 +1,64 @@
+"""
+Testes da limpeza de agendamentos antigos (descarte de dias inteiros)
+"""
+
+import datetime
+
+import pytest
+
+from config.settings import SCHEDULING_CONFIG
+from agents.scheduling_logic import Appointment, BarberScheduler
+from agents.sql_store import SQLiteAppointmentStore
+
+def _appointments(days_ago, per_day=3):
+    """Agendamentos concluídos de alguns dias passados, per_day por dia"""
+    today = datetime.date.today()
+    appointments = {}
+    for offset in days_ago:
+        date = today - datetime.timedelta(days=offset)
+        for index in range(per_day):
+            appointment_id = f"apt_{offset:03d}_{index}"
+            created_at = datetime.datetime.combine(date, datetime.time(8)) - datetime.timedelta(days=1)
+            appointments[appointment_id] = Appointment(
+                id=appointment_id, client_name=f"Cliente {index}", client_phone=f"1190000{index:04d}",
+                date=date, time=datetime.time(9 + index), service="Corte", status="completed",
+                created_at=created_at, updated_at=created_at, barber_id="barbeiro_0"
+            )
+    return appointments
+
+@pytest.fixture(autouse=True)
+def one_barber(monkeypatch):
+    monkeypatch.setitem(SCHEDULING_CONFIG, "barbers", {"barbeiro_0": "Barbeiro 0"})
+
+def test_cleanup_drops_whole_days_before_cutoff():
+    scheduler = BarberScheduler(store=_appointments([200, 120, 91, 10, 1]), ledger=None)
+
+    removed = scheduler.cleanup_old_appointments(days_to_keep=90)
+
+    assert removed == 9
+    assert sorted(scheduler.appointments) == ["apt_001_0", "apt_001_1", "apt_001_2",
+                                              "apt_010_0", "apt_010_1", "apt_010_2"]
+    assert scheduler.get_appointment_statistics()["completed"] == 6
+    assert {appointment.date for appointment in scheduler.get_appointment_by_client("11900000000")} == {
+        datetime.date.today() - datetime.timedelta(days=offset) for offset in (1, 10)
+    }
+    assert scheduler.cleanup_old_appointments(days_to_keep=90) == 0
+
+def test_cleanup_deletes_sql_rows_in_one_statement():
+    store = SQLiteAppointmentStore(":memory:", write_batch_size=500)
+    with store.batch():
+        for appointment_id, appointment in _appointments([300, 200, 120, 5], per_day=4).items():
+            store[appointment_id] = appointment
+    scheduler = BarberScheduler(store=store, ledger=None)
+
+    statements = []
+    store._db.set_trace_callback(statements.append)
+    removed = scheduler.cleanup_old_appointments(days_to_keep=90)
+    store._db.set_trace_callback(None)
+
+    assert removed == 12
+    deletes = [sql for sql in statements if sql.startswith("DELETE")]
+    assert len(deletes) == 1
+    assert all(f"'apt_{offset:03d}_{index}'" in deletes[0] for offset in (300, 200, 120) for index in range(4))
+    assert len(store) == 4
+    store.close()
@@ -0,0 +1,138 @@
+"""
+Teste de estresse das reservas concorrentes do BarberScheduler
+
+Milhares de reservas e remarcações disparadas por um pool de threads, disputando
+os mesmos horários: nenhum horário pode ser vendido duas vezes, e quem perde a
+disputa recebe uma resposta de erro (sem exceção).
+"""
+
+import datetime
+import random
+import sys
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from config.settings import SCHEDULING_CONFIG
+from agents.scheduling_logic import BarberScheduler
+
+THREADS = 32
+BOOKINGS = 3000
+DAYS = 10
+
+def _minutes(value: datetime.time) -> int:
+    return value.hour * 60 + value.minute
+
+def _booking_days(scheduler: BarberScheduler):
+    """Próximos dias com expediente (a partir de amanhã)"""
+    days = []
+    date = datetime.date.today() + datetime.timedelta(days=1)
+    while len(days) < DAYS:
+        if scheduler.get_available_slots(date):
+            days.append(date)
+        date += datetime.timedelta(days=1)
+    return days
+
+def _assert_no_double_booking(scheduler: BarberScheduler, days):
+    """Os agendamentos confirmados de cada barbeiro não se sobrepõem"""
+    for date in days:
+        by_barber = defaultdict(list)
+        for appointment in scheduler.get_appointment_by_date(date):
+            start = _minutes(appointment.time)
+            end = start + scheduler.get_service_duration(appointment.service)
+            by_barber[appointment.barber_id].append((start, end, appointment.id))
+        for barber_id, intervals in by_barber.items():
+            intervals.sort()
+            for (_, end, first), (start, _, second) in zip(intervals, intervals[1:]):
+                assert start >= end, f"{first} e {second} se sobrepõem ({barber_id}, {date})"
+
+@pytest.fixture(autouse=True)
+def frequent_thread_switches():
+    """Troca de thread a cada poucos microssegundos, para as disputas acontecerem de fato"""
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+@pytest.fixture(params=[1, 3], ids=["1-barbeiro", "3-barbeiros"])
+def scheduler(request, monkeypatch):
+    barbers = {f"barbeiro_{index}": f"Barbeiro {index}" for index in range(request.param)}
+    monkeypatch.setitem(SCHEDULING_CONFIG, "barbers", barbers)
+    return BarberScheduler(store={}, ledger=None)
+
+def test_concurrent_bookings_never_double_book(scheduler):
+    days = _booking_days(scheduler)
+    slots = [(date, slot.time) for date in days for slot in scheduler.get_available_slots(date)]
+    # Vários clientes disputando cada horário, em ordem aleatória
+    attempts = [slots[index % len(slots)] for index in range(BOOKINGS)]
+    random.Random(12).shuffle(attempts)
+
+    def book(index):
+        date, time = attempts[index]
+        return attempts[index], scheduler.create_appointment(
+            f"Cliente {index}", f"1190000{index:04d}", date, time
+        )
+
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        results = list(pool.map(book, range(BOOKINGS)))
+
+    successes = Counter(slot for slot, (success, _, _) in results if success)
+    for slot, (success, message, appointment_id) in results:
+        if success:
+            assert appointment_id is not None
+        else:
+            assert appointment_id is None and message
+
+    # Nenhum horário acima da capacidade (um cliente por barbeiro)
+    assert max(successes.values()) <= len(scheduler.barbers)
+    # Horários disputados não ficam sem dono: o primeiro cliente de cada um sempre consegue
+    assert set(successes) == set(slots)
+    _assert_no_double_booking(scheduler, days)
+
+    booked = sum(successes.values())
+    assert scheduler.get_appointment_statistics()["confirmed"] == booked
+    assert sum(len(scheduler.get_appointment_by_date(date)) for date in days) == booked
+
+def test_concurrent_reschedules_into_one_slot(scheduler):
+    days = _booking_days(scheduler)
+    source_day, target_day = days[0], days[1]
+    target_time = scheduler.get_available_slots(target_day)[0].time
+
+    appointment_ids = []
+    for index, slot in enumerate(scheduler.get_available_slots(source_day)):
+        for barber_id in scheduler.barbers:
+            success, _, appointment_id = scheduler.create_appointment(
+                f"Cliente {index}", f"1191{index:03d}{len(appointment_ids):04d}",
+                source_day, slot.time, barber_id=barber_id
+            )
+            assert success
+            appointment_ids.append(appointment_id)
+
+    def move(appointment_id):
+        return appointment_id, scheduler.reschedule_appointment(appointment_id, target_day, target_time)
+
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        results = list(pool.map(move, appointment_ids * 4))
+
+    moved = {appointment_id for appointment_id, (success, _) in results if success}
+    assert len(moved) == min(len(scheduler.barbers), len(appointment_ids))
+
+    # Quem perdeu a disputa continua no horário original
+    for appointment_id in appointment_ids:
+        appointment = scheduler.appointments[appointment_id]
+        expected_day = target_day if appointment_id in moved else source_day
+        assert appointment.date == expected_day and appointment.status == 'confirmed'
+    _assert_no_double_booking(scheduler, [source_day, target_day])
+
+def test_bookings_on_different_days_run_in_parallel(scheduler):
+    """Um dia travado não bloqueia reservas nos outros dias (locks por data)"""
+    days = _booking_days(scheduler)
+    blocked_day, free_day = days[0], days[1]
+    free_time = scheduler.get_available_slots(free_day)[0].time
+
+    with scheduler._locked_dates(blocked_day):
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            future = pool.submit(scheduler.create_appointment, "Cliente", "11988887777", free_day, free_time)
+            success, _, _ = future.result(timeout=5)
+    assert success
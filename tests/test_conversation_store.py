@@ -0,0 +1,141 @@
+"""
+Testes dos armazenamentos de contexto de conversa (memória e Redis)
+"""
+
+import datetime
+import threading
+
+import pytest
+
+from config.settings import CONVERSATION_CONFIG
+from agents import conversation_store
+from agents.barber_agent import BarberAgent
+from agents.outbound_dispatcher import OutboundDispatcher
+from agents.conversation_store import (
+    ConversationContextStore, RedisConversationStore, dumps_context, loads_context
+)
+
+class FakeClock:
+    """time.monotonic controlado pelo teste"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(conversation_store.time, "monotonic", fake)
+    return fake
+
+def test_memory_store_expires_idle_conversations(clock):
+    removed = []
+    store = ConversationContextStore(idle_ttl=60, max_entries=10,
+                                     on_evict=lambda key, context, reason: removed.append((key, reason)))
+    store["a"] = {"state": "idle"}
+    clock.now += 30
+    store["b"] = {"state": "waiting_for_date"}
+    clock.now += 40
+
+    # "a" está inativa há 70 s; "b" há 40 s
+    assert "a" not in store
+    assert store["b"]["state"] == "waiting_for_date"
+    assert removed == [("a", "expired")]
+
+    # A leitura de "b" renovou o prazo
+    clock.now += 50
+    assert "b" in store
+
+def test_memory_store_evicts_least_recently_used(clock):
+    removed = []
+    store = ConversationContextStore(idle_ttl=600, max_entries=2,
+                                     on_evict=lambda key, context, reason: removed.append((key, reason)))
+    store["a"] = {"state": "idle"}
+    store["b"] = {"state": "idle"}
+    store["a"]
+    store["c"] = {"state": "idle"}
+
+    assert sorted(store) == ["a", "c"]
+    assert removed == [("b", "evicted")]
+    assert store.get_stats()["evictions"] == 1
+
+def test_context_json_round_trip_keeps_dates_and_times():
+    context = {
+        "state": "waiting_for_confirmation",
+        "pending_data": {"date": datetime.date(2026, 11, 3), "time": datetime.time(14, 30)},
+        "last_interaction": datetime.datetime(2026, 10, 17, 9, 15, 2),
+        "current_appointment": None
+    }
+    assert loads_context(dumps_context(context)) == context
+
+    with pytest.raises(TypeError):
+        dumps_context({"pending_data": {"services": {"Corte"}}})
+
+@pytest.fixture
+def redis_client():
+    fakeredis = pytest.importorskip("fakeredis")
+    return fakeredis.FakeStrictRedis()
+
+def test_redis_store_shares_contexts_between_instances(redis_client):
+    first = RedisConversationStore(client=redis_client)
+    second = RedisConversationStore(client=redis_client)
+
+    context = {"state": "waiting_for_time", "pending_data": {"date": datetime.date(2026, 11, 3)},
+               "last_interaction": datetime.datetime.now()}
+    first.save("conversa", context)
+
+    loaded = second["conversa"]
+    assert loaded["state"] == "waiting_for_time"
+    assert loaded["pending_data"]["date"] == datetime.date(2026, 11, 3)
+    # Campos voláteis não são gravados
+    assert "last_interaction" not in loaded
+
+    key = f"{CONVERSATION_CONFIG['key_prefix']}:conversa"
+    assert 0 < redis_client.ttl(key) <= CONVERSATION_CONFIG["idle_ttl"]
+    assert second.state_counts() == {"waiting_for_time": 1}
+
+def test_redis_store_skips_unchanged_writes(redis_client):
+    store = RedisConversationStore(client=redis_client)
+    store.save("conversa", {"state": "idle", "pending_data": {}})
+
+    context = store["conversa"]
+    context["last_interaction"] = datetime.datetime.now()
+    store.save("conversa", context)
+    assert store.get_stats()["skipped_writes"] == 1
+
+    context["state"] = "waiting_for_date"
+    store.save("conversa", context)
+    assert store.get_stats()["writes"] == 2
+    assert store.state_counts() == {"waiting_for_date": 1}
+
+    del store["conversa"]
+    assert "conversa" not in store
+    assert store.state_counts() == {}
+
+def test_agent_context_is_visible_to_the_next_worker_right_away(redis_client, monkeypatch):
+    release = threading.Event()
+
+    def slow_send(phone_number, message):
+        release.wait(5)
+        return True, "ok"
+
+    dispatcher = OutboundDispatcher(workers=1, asynchronous=True)
+    workers = []
+    for _ in range(2):
+        agent = BarberAgent()
+        agent.conversation_context = RedisConversationStore(client=redis_client)
+        agent.outbound = dispatcher
+        workers.append(agent)
+    monkeypatch.setattr(workers[0].whatsapp, "send_message", slow_send)
+
+    try:
+        # Um envio anterior ao cliente ainda está preso na API do WhatsApp
+        dispatcher.dispatch("5511988887777", slow_send, "mensagem anterior")
+        workers[0].process_message("quero agendar um corte", "5511988887777", "conversa")
+        # A gravação do contexto não espera a fila de envio
+        assert workers[1].conversation_context["conversa"]["state"] == "waiting_for_date"
+    finally:
+        release.set()
+        dispatcher.shutdown()
@@ -0,0 +1,71 @@
+"""
+Testes da interpretação de datas e horários das mensagens
+"""
+
+from datetime import date, time
+
+import pytest
+
+from agents.datetime_parser import parse_date, parse_time
+
+# Uma terça-feira
+TODAY = date(2026, 10, 13)
+
+@pytest.mark.parametrize("message, expected", [
+    ("amanhã", date(2026, 10, 14)),
+    ("depois de amanhã", date(2026, 10, 15)),
+    ("15/11", date(2026, 11, 15)),
+    ("10/10", date(2027, 10, 10)),
+    ("15/11/2026", date(2026, 11, 15)),
+    ("25-12-26", date(2026, 12, 25)),
+    ("dia 31", date(2026, 10, 31)),
+    ("dia 5", date(2026, 11, 5)),
+    ("20 de dezembro", date(2026, 12, 20)),
+    ("dia 3 de março de 2027", date(2027, 3, 3)),
+    ("sexta que vem", date(2026, 10, 16)),
+    ("terça que vem", date(2026, 10, 20)),
+    ("quinta-feira da semana que vem", date(2026, 10, 22)),
+    ("daqui a 3 dias", date(2026, 10, 16)),
+    ("em duas semanas", date(2026, 10, 27)),
+    ("semana que vem", date(2026, 10, 19)),
+    ("31/02", None),
+    ("qualquer dia", None),
+])
+def test_parse_date(message, expected):
+    assert parse_date(message, today=TODAY) == expected
+
+@pytest.mark.parametrize("message, expected", [
+    ("15h30", time(15, 30)),
+    ("15:30", time(15, 30)),
+    ("9.45", time(9, 45)),
+    ("pode ser 16h?", time(16)),
+    ("às 18 horas", time(18)),
+    ("as 9 da manhã", time(9)),
+    ("às 3 da tarde", time(15)),
+    ("lá pelas 5 e meia da tarde", time(17, 30)),
+    ("12 da noite", time(0)),
+    ("meio-dia", time(12)),
+    ("meio dia e meia", time(12, 30)),
+    ("14", time(14)),
+    ("quero 2 cortes", None),
+    ("depois do almoço", None),
+])
+def test_parse_time(message, expected):
+    assert parse_time(message) == expected
+
+@pytest.mark.parametrize("message, expected", [
+    # Sem período nem "h": antes da abertura, mas dentro do expediente à tarde
+    ("às 3", time(15)),
+    ("3", time(15)),
+    ("às 3 e meia", time(15, 30)),
+    # Horário escrito com "h" ou ":" vale como está
+    ("1h", time(1)),
+    ("3h", time(3)),
+    ("3h30", time(3, 30)),
+    ("2:30", time(2, 30)),
+    ("1 hora", time(1)),
+    # Depois da abertura não há ambiguidade
+    ("às 9", time(9)),
+])
+def test_afternoon_default_only_without_explicit_clock(message, expected):
+    assert parse_time(message) == expected
@@ -0,0 +1,51 @@
+"""
+Testes do roteador de intenções: mesma classificação das cadeias de any() originais
+"""
+
+import pytest
+
+from config.settings import INTENT_KEYWORDS
+from agents.intent_router import IntentMatch, IntentRouter, intent_router
+from benchmarks.bench_intent_router import CORPUS, expanded_table, legacy_route
+
+@pytest.mark.parametrize("stage", sorted(INTENT_KEYWORDS))
+def test_route_matches_legacy_chains_over_corpus(stage):
+    for message in CORPUS:
+        assert intent_router.route(stage, message) == legacy_route(INTENT_KEYWORDS[stage], message), message
+
+def test_route_matches_legacy_chains_with_expanded_table():
+    table = expanded_table()
+    router = IntentRouter({"idle": table})
+    for message in CORPUS:
+        assert router.route("idle", message) == legacy_route(table, message), message
+
+@pytest.mark.parametrize("message, intent", [
+    ("quero mudar meu horario pra mais tarde", "reschedule"),
+    ("tem horarios disponiveis no sabado?", None),
+    ("BOA TARDE QUERO AGENDAR", "schedule"),
+    ("o que pode fazer?", "help"),
+])
+def test_route_keeps_table_priority(message, intent):
+    assert intent_router.route("idle", message) == intent
+
+@pytest.mark.parametrize("message, intent", [
+    ("não quero", "decline"),
+    ("nao quero, obrigado", "decline"),
+    ("Quero sim!", "accept"),
+    ("aceito", "accept"),
+    ("talvez", None),
+])
+def test_waitlist_offer_answers(message, intent):
+    assert intent_router.route("waitlist_offer", message) == intent
+
+def test_match_returns_keywords_with_positions():
+    message = "Quero remarcar o horário"
+    assert intent_router.match("idle", message) == [
+        IntentMatch("reschedule", "remarcar", 6, 14),
+        IntentMatch("schedule", "horário", 17, 24),
+    ]
+    assert message.lower()[6:14] == "remarcar"
+
+def test_keyword_in_two_intents_is_rejected():
+    with pytest.raises(ValueError):
+        IntentRouter({"idle": {"schedule": ["marcar"], "reschedule": ["Marcar"]}})
@@ -0,0 +1,95 @@
+"""
+Testes do journal e dos snapshots (recuperação do estado depois de reabrir)
+"""
+
+import datetime
+import os
+
+import pytest
+
+from agents.appointment_store import ColumnarAppointmentStore
+from agents.journal import JOURNAL_FILE, SNAPSHOT_FILE, JournaledAppointmentStore
+from agents.scheduling_logic import Appointment
+
+def _appointment(index: int, status: str = "confirmed") -> Appointment:
+    created_at = datetime.datetime(2026, 10, 1, 9, 30, 15, 123456)
+    return Appointment(
+        id=f"apt_{index:04d}", client_name=f"Cliente {index}", client_phone=f"119000{index:05d}",
+        date=datetime.date(2026, 11, 3) + datetime.timedelta(days=index % 7),
+        time=datetime.time(9 + index % 8, 30 * (index % 2)), service="Corte", status=status,
+        created_at=created_at, updated_at=created_at + datetime.timedelta(minutes=index),
+        barber_id=f"barbeiro_{index % 2}"
+    )
+
+def _state(store) -> dict:
+    """Agendamentos do armazenamento como objetos Appointment comparáveis"""
+    return {
+        appointment_id: (appointment.to_appointment() if hasattr(appointment, "to_appointment") else appointment)
+        for appointment_id, appointment in store.items()
+    }
+
+@pytest.fixture(params=[ColumnarAppointmentStore, dict], ids=["columns", "rows"])
+def inner(request):
+    """Armazenamento interno colunar (padrão) ou dict (snapshot em linhas)"""
+    return request.param
+
+def test_reopen_recovers_snapshot_and_journal_tail(tmp_path, inner):
+    directory = str(tmp_path / "journal")
+    store = JournaledAppointmentStore.open(directory, inner=inner(), snapshot_every=1000)
+    for index in range(20):
+        store[f"apt_{index:04d}"] = _appointment(index)
+    store.snapshot()
+
+    # Cauda do journal depois do snapshot: alterações, remoções e novos agendamentos
+    store["apt_0003"] = _appointment(3, status="cancelled")
+    del store["apt_0005"]
+    for index in range(20, 25):
+        store[f"apt_{index:04d}"] = _appointment(index)
+    expected = _state(store)
+    store.close()
+
+    assert os.path.exists(os.path.join(directory, SNAPSHOT_FILE))
+    reopened = JournaledAppointmentStore.open(directory, inner=inner())
+    assert _state(reopened) == expected
+    assert "apt_0005" not in reopened and reopened["apt_0003"].status == "cancelled"
+    reopened.close()
+
+def test_automatic_snapshot_restarts_journal(tmp_path):
+    directory = str(tmp_path)
+    store = JournaledAppointmentStore.open(directory, snapshot_every=10)
+    for index in range(25):
+        store[f"apt_{index:04d}"] = _appointment(index)
+    expected = _state(store)
+    store.close()
+
+    with open(os.path.join(directory, JOURNAL_FILE), encoding="utf-8") as journal_file:
+        assert len(journal_file.readlines()) == 5
+
+    reopened = JournaledAppointmentStore.open(directory)
+    assert _state(reopened) == expected
+    reopened.close()
+
+def test_truncated_last_record_is_discarded(tmp_path):
+    directory = str(tmp_path)
+    store = JournaledAppointmentStore.open(directory)
+    for index in range(5):
+        store[f"apt_{index:04d}"] = _appointment(index)
+    expected = _state(store)
+    store.close()
+
+    # Queda no meio da escrita do próximo registro
+    journal_path = os.path.join(directory, JOURNAL_FILE)
+    with open(journal_path, "ab") as journal_file:
+        journal_file.write(b'["put",["apt_0005","Cliente 5"')
+
+    reopened = JournaledAppointmentStore.open(directory)
+    assert _state(reopened) == expected
+    # O registro incompleto foi cortado: novas escritas não se misturam com ele
+    reopened["apt_0006"] = _appointment(6)
+    expected = _state(reopened)
+    reopened.close()
+
+    recovered = JournaledAppointmentStore.open(directory)
+    assert _state(recovered) == expected
+    assert "apt_0006" in recovered and "apt_0005" not in recovered
+    recovered.close()
@@ -0,0 +1,101 @@
+"""
+Testes da fila de envio do WhatsApp e do notificador da lista de espera
+"""
+
+import datetime
+import threading
+import time
+from collections import defaultdict
+
+import pytest
+
+from agents.barber_agent import BarberAgent
+from agents.outbound_dispatcher import OutboundDispatcher
+from agents.scheduling_logic import WaitlistOffer, normalize_phone_number
+
+@pytest.fixture
+def dispatcher():
+    dispatcher = OutboundDispatcher(workers=4, queue_size=100, asynchronous=True)
+    yield dispatcher
+    dispatcher.shutdown(timeout=5)
+
+def test_messages_of_each_client_keep_their_order(dispatcher):
+    delivered = defaultdict(list)
+    lock = threading.Lock()
+
+    def send(phone_number, sequence):
+        # Envios lentos e de duração variável, para embaralhar as threads
+        time.sleep(0.0005 * (sequence % 3))
+        with lock:
+            delivered[phone_number].append(sequence)
+        return True, "ok"
+
+    phones = [f"55119000000{index:02d}" for index in range(12)]
+    for sequence in range(30):
+        for phone_number in phones:
+            dispatcher.dispatch(phone_number, send, sequence)
+
+    assert dispatcher.flush(timeout=10)
+    assert all(delivered[phone_number] == list(range(30)) for phone_number in phones)
+    assert dispatcher.get_stats()["sent"] == 30 * len(phones)
+
+def test_slow_client_does_not_hold_other_clients(dispatcher):
+    release = threading.Event()
+    fast_done = threading.Event()
+
+    def slow_send(phone_number):
+        release.wait(5)
+        return True, "ok"
+
+    def fast_send(phone_number):
+        fast_done.set()
+        return True, "ok"
+
+    def shard(phone_number):
+        return hash(normalize_phone_number(phone_number)) % dispatcher.workers
+
+    slow_phone = "5511900000001"
+    # Um cliente que cai em outra thread de envio
+    fast_phone = next(
+        phone_number for phone_number in (f"55119000001{index:02d}" for index in range(100))
+        if shard(phone_number) != shard(slow_phone)
+    )
+    dispatcher.dispatch(slow_phone, slow_send)
+    dispatcher.dispatch(fast_phone, fast_send)
+    try:
+        assert fast_done.wait(5)
+    finally:
+        release.set()
+
+def test_failures_are_reported_to_callbacks_and_shutdown_refuses_new_sends(dispatcher):
+    results = []
+
+    def failing_send(phone_number):
+        raise ConnectionError("WhatsApp fora do ar")
+
+    dispatcher.dispatch("5511900000001", failing_send, callback=results.append)
+    dispatcher.shutdown(timeout=5)
+
+    assert [(result.success, result.action) for result in results] == [(False, "failing_send")]
+    assert dispatcher.get_stats()["failed"] == 1
+    with pytest.raises(RuntimeError):
+        dispatcher.dispatch("5511900000001", failing_send)
+
+def test_agent_registers_itself_as_waitlist_notifier(monkeypatch):
+    agent = BarberAgent()
+    agent.outbound = OutboundDispatcher(asynchronous=False)
+    sent = []
+    monkeypatch.setattr(agent.whatsapp, "send_quick_reply",
+                        lambda phone_number, message, buttons: sent.append((phone_number, message)) or (True, "ok"))
+
+    offer = WaitlistOffer(
+        entry_id="wl_1", client_phone="5511911112222",
+        date=datetime.date(2026, 11, 3), time=datetime.time(15, 30), service="Corte",
+        expires_at=datetime.datetime.now() + datetime.timedelta(minutes=10)
+    )
+    agent.scheduler.waitlist_notifier(offer)
+
+    assert len(sent) == 1
+    phone_number, message = sent[0]
+    assert phone_number == "5511911112222"
+    assert "03/11/2026" in message and "15:30" in message
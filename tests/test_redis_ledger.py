@@ -0,0 +1,94 @@
+"""
+Testes do ledger de horários no Redis (ocupação compartilhada entre processos)
+"""
+
+import datetime
+import logging
+
+import pytest
+
+from config.settings import CACHE_CONFIG, SCHEDULING_CONFIG
+from agents.availability_cache import InProcessAvailabilityCache, RedisAvailabilityCache
+from agents.redis_ledger import RedisSlotLedger
+from agents.scheduling_logic import Appointment, BarberScheduler
+
+@pytest.fixture
+def ledger():
+    fakeredis = pytest.importorskip("fakeredis")
+    return RedisSlotLedger(client=fakeredis.FakeStrictRedis())
+
+@pytest.fixture(autouse=True)
+def one_barber(monkeypatch):
+    monkeypatch.setitem(SCHEDULING_CONFIG, "barbers", {"barbeiro_0": "Barbeiro 0"})
+
+def _next_working_day(scheduler: BarberScheduler) -> datetime.date:
+    date = datetime.date.today() + datetime.timedelta(days=1)
+    while not scheduler.get_available_slots(date):
+        date += datetime.timedelta(days=1)
+    return date
+
+def _appointment(appointment_id: str, date: datetime.date, time: datetime.time) -> Appointment:
+    created_at = datetime.datetime.now()
+    return Appointment(
+        id=appointment_id, client_name="Cliente", client_phone="11988887777", date=date, time=time,
+        service="Corte", status="confirmed", created_at=created_at, updated_at=created_at,
+        barber_id="barbeiro_0"
+    )
+
+def test_processes_sharing_a_ledger_never_double_book(ledger):
+    first = BarberScheduler(store={}, ledger=ledger)
+    second = BarberScheduler(store={}, ledger=ledger)
+    date = _next_working_day(first)
+    time = first.get_available_slots(date)[0].time
+
+    assert first.create_appointment("Ana", "11911112222", date, time)[0]
+    success, message, _ = second.create_appointment("Bia", "11933334444", date, time)
+    assert not success and message
+    assert time not in [slot.time for slot in second.get_available_slots(date)]
+
+def test_startup_reconciles_stored_appointments_and_logs_overlaps(ledger, caplog):
+    probe = BarberScheduler(store={}, ledger=None)
+    date = _next_working_day(probe)
+    times = [slot.time for slot in probe.get_available_slots(date)]
+
+    # Reserva de outro processo, no mesmo horário de um agendamento armazenado
+    other = BarberScheduler(store={}, ledger=ledger)
+    assert other.create_appointment("Outro", "11955556666", date, times[1])[0]
+
+    store = {
+        "apt_a": _appointment("apt_a", date, times[0]),
+        "apt_b": _appointment("apt_b", date, times[1]),
+    }
+    with caplog.at_level(logging.ERROR, logger="agents.redis_ledger"):
+        scheduler = BarberScheduler(store=store, ledger=ledger)
+
+    conflicts = [record.getMessage() for record in caplog.records if "sobrepõe" in record.getMessage()]
+    assert len(conflicts) == 1 and "apt_b" in conflicts[0]
+    # Agendamentos armazenados voltam a ocupar o ledger
+    assert not other.is_time_slot_available(date, times[0])
+    assert scheduler.reconcile_ledger() == 0
+
+def test_ledger_with_memory_cache_setting_uses_redis_cache(ledger, monkeypatch, caplog):
+    monkeypatch.setitem(CACHE_CONFIG, "backend", "memory")
+    with caplog.at_level(logging.WARNING, logger="agents.scheduling_logic"):
+        scheduler = BarberScheduler(store={}, ledger=ledger)
+    assert isinstance(scheduler.availability_cache, RedisAvailabilityCache)
+    assert scheduler.availability_cache.client is ledger.client
+    assert any("CACHE_BACKEND=memory" in record.getMessage() for record in caplog.records)
+
+    caplog.clear()
+    with caplog.at_level(logging.WARNING, logger="agents.scheduling_logic"):
+        BarberScheduler(store={}, cache=InProcessAvailabilityCache(), ledger=ledger)
+    assert any("em memória" in record.getMessage() for record in caplog.records)
+
+def test_cached_availability_sees_bookings_of_other_processes(ledger, monkeypatch):
+    monkeypatch.setitem(CACHE_CONFIG, "backend", "memory")
+    first = BarberScheduler(store={}, ledger=ledger)
+    second = BarberScheduler(store={}, ledger=ledger)
+    date = _next_working_day(first)
+    time = first.get_available_slots(date)[0].time
+
+    # Preenche o cache dos dois processos antes da reserva
+    assert time in [slot.time for slot in second.get_available_slots(date)]
+    assert first.create_appointment("Ana", "11911112222", date, time)[0]
+    assert time not in [slot.time for slot in second.get_available_slots(date)]
@@ -0,0 +1,157 @@
+"""
+Testes das consultas do BarberScheduler servidas por índices (clientes, próximos
+agendamentos e estatísticas), comparadas a uma varredura dos agendamentos
+"""
+
+import datetime
+import random
+
+import pytest
+
+from config.settings import SCHEDULING_CONFIG
+from agents.scheduling_logic import Appointment, BarberScheduler, normalize_phone_number
+
+PHONES = ("11911112222", "(11) 91111-2222", "+55 11 93333-4444", "11955556666")
+
+@pytest.fixture(autouse=True)
+def one_barber(monkeypatch):
+    monkeypatch.setitem(SCHEDULING_CONFIG, "barbers", {"barbeiro_0": "Barbeiro 0"})
+
+@pytest.fixture
+def scheduler():
+    return BarberScheduler(store={}, ledger=None)
+
+def _working_days(scheduler: BarberScheduler, count: int):
+    days = []
+    date = datetime.date.today() + datetime.timedelta(days=1)
+    while len(days) < count:
+        if scheduler.is_working_day(date):
+            days.append(date)
+        date += datetime.timedelta(days=1)
+    return days
+
+def _random_operations(scheduler: BarberScheduler, operations: int, seed: int = 11):
+    """Reservas, cancelamentos e remarcações aleatórias de alguns clientes"""
+    rng = random.Random(seed)
+    days = _working_days(scheduler, 3)
+    for index in range(operations):
+        booked = [apt.id for apt in scheduler.appointments.values() if apt.status == "confirmed"]
+        date = rng.choice(days)
+        grid = [slot.time for slot in scheduler.generate_time_slots(date)]
+        action = rng.random()
+        if action < 0.6 or not booked:
+            scheduler.create_appointment(f"Cliente {index}", rng.choice(PHONES), date, rng.choice(grid),
+                                         service=rng.choice(("Corte", "Barba", "Corte + Barba")))
+        elif action < 0.8:
+            scheduler.cancel_appointment(rng.choice(booked))
+        else:
+            scheduler.reschedule_appointment(rng.choice(booked), rng.choice(days), rng.choice(grid))
+
+def _expected_by_client(scheduler: BarberScheduler, client_phone: str):
+    phone = normalize_phone_number(client_phone)
+    return sorted(
+        (apt for apt in scheduler.appointments.values()
+         if apt.status != "cancelled" and normalize_phone_number(apt.client_phone) == phone),
+        key=lambda apt: (apt.date, apt.time)
+    )
+
+def test_client_lookup_matches_scan_for_any_phone_format(scheduler):
+    _random_operations(scheduler, 120)
+    reloaded = BarberScheduler(store=scheduler.appointments, ledger=None)
+
+    for phone in PHONES + ("5511911112222", "11900000000"):
+        expected = [apt.id for apt in _expected_by_client(scheduler, phone)]
+        assert [apt.id for apt in scheduler.get_appointment_by_client(phone)] == expected
+        assert [apt.id for apt in reloaded.get_appointment_by_client(phone)] == expected
+
+    # Os dois formatos do mesmo número caem no mesmo cliente
+    assert scheduler.get_appointment_by_client(PHONES[0]) == scheduler.get_appointment_by_client(PHONES[1])
+
+def test_cancelled_appointment_leaves_client_index(scheduler):
+    date = _working_days(scheduler, 1)[0]
+    time = scheduler.get_available_slots(date)[0].time
+    _, _, appointment_id = scheduler.create_appointment("Ana", "(11) 97777-8888", date, time)
+    assert [apt.id for apt in scheduler.get_appointment_by_client("11977778888")] == [appointment_id]
+
+    assert scheduler.cancel_appointment(appointment_id)[0]
+    assert scheduler.get_appointment_by_client("11977778888") == []
+
+def _appointment(appointment_id: str, start: datetime.datetime, status: str = "confirmed") -> Appointment:
+    return Appointment(
+        id=appointment_id, client_name="Cliente", client_phone="11988887777", date=start.date(),
+        time=start.time(), service="Corte", status=status, created_at=start - datetime.timedelta(days=2),
+        updated_at=start - datetime.timedelta(days=2), barber_id="barbeiro_0"
+    )
+
+def test_upcoming_appointments_in_time_order():
+    # Minutos exatos: a linha do tempo compara data e hora completas
+    now = datetime.datetime.now().replace(second=0, microsecond=0)
+    offsets = {"apt_passado": -3, "apt_1h": 1, "apt_5h": 5, "apt_20h": 20, "apt_30h": 30, "apt_3d": 72}
+    store = {appointment_id: _appointment(appointment_id, now + datetime.timedelta(hours=hours))
+             for appointment_id, hours in offsets.items()}
+    store["apt_cancelado"] = _appointment("apt_cancelado", now + datetime.timedelta(hours=2), status="cancelled")
+    store["apt_concluido"] = _appointment("apt_concluido", now + datetime.timedelta(hours=3), status="completed")
+    scheduler = BarberScheduler(store=store, ledger=None)
+
+    assert [apt.id for apt in scheduler.get_upcoming_appointments()] == ["apt_1h", "apt_5h", "apt_20h"]
+    assert [apt.id for apt in scheduler.get_upcoming_appointments(hours_ahead=48)] == [
+        "apt_1h", "apt_5h", "apt_20h", "apt_30h"
+    ]
+
+    assert scheduler.cancel_appointment("apt_5h")[0]
+    assert [apt.id for apt in scheduler.get_upcoming_appointments()] == ["apt_1h", "apt_20h"]
+
+def test_upcoming_appointments_follow_reschedules(scheduler):
+    tomorrow = datetime.date.today() + datetime.timedelta(days=1)
+    _random_operations(scheduler, 120)
+    # Janela que cobre tudo o que foi marcado
+    hours_ahead = 24 * ((_working_days(scheduler, 3)[-1] - tomorrow).days + 2)
+
+    expected = sorted(
+        (apt for apt in scheduler.appointments.values() if apt.status == "confirmed"),
+        key=lambda apt: (datetime.datetime.combine(apt.date, apt.time), apt.id)
+    )
+    upcoming = scheduler.get_upcoming_appointments(hours_ahead=hours_ahead)
+    assert [apt.id for apt in upcoming] == [apt.id for apt in expected]
+    assert upcoming == sorted(upcoming, key=lambda apt: (apt.date, apt.time))
+
+def _expected_statistics(appointments) -> dict:
+    """Estatísticas calculadas do zero, como no get_appointment_statistics original"""
+    appointments = list(appointments)
+    total = len(appointments)
+    confirmed = sum(1 for apt in appointments if apt.status == "confirmed")
+    return {
+        "total": total,
+        "confirmed": confirmed,
+        "cancelled": sum(1 for apt in appointments if apt.status == "cancelled"),
+        "completed": sum(1 for apt in appointments if apt.status == "completed"),
+        "occupancy_rate": (confirmed / total * 100) if total > 0 else 0
+    }
+
+def test_incremental_statistics_match_recount(scheduler):
+    for checkpoint in range(3):
+        _random_operations(scheduler, 60, seed=checkpoint)
+        values = list(scheduler.appointments.values())
+        assert scheduler.get_appointment_statistics() == _expected_statistics(values)
+
+        for date in {apt.date for apt in values}:
+            assert scheduler.get_day_statistics(date) == _expected_statistics(apt for apt in values if apt.date == date)
+        for service in ("Corte", "Barba", "Corte + Barba", "Pigmentação"):
+            assert scheduler.get_service_statistics(service) == _expected_statistics(
+                apt for apt in values if apt.service == service
+            )
+
+    reloaded = BarberScheduler(store=scheduler.appointments, ledger=None)
+    assert reloaded.get_statistics_snapshot() == scheduler.get_statistics_snapshot()
+
+def test_statistics_snapshot_drops_empty_buckets(scheduler):
+    date = _working_days(scheduler, 1)[0]
+    time = scheduler.get_available_slots(date)[0].time
+    _, _, appointment_id = scheduler.create_appointment("Ana", "11911112222", date, time, service="Barba")
+    assert scheduler.cancel_appointment(appointment_id)[0]
+
+    snapshot = scheduler.get_statistics_snapshot()
+    assert snapshot["totals"] == _expected_statistics(scheduler.appointments.values())
+    assert snapshot["by_day"] == {date: {"cancelled": 1}}
+    assert snapshot["by_service"] == {"Barba": {"cancelled": 1}}
+    assert scheduler.get_day_statistics(date + datetime.timedelta(days=1))["total"] == 0
@@ -0,0 +1,110 @@
+"""
+Testes das durações por serviço: sobreposição de intervalos e horários em que
+um serviço cabe na agenda
+"""
+
+import datetime
+import random
+
+import pytest
+
+from config.settings import SCHEDULING_CONFIG
+from agents.scheduling_logic import BarberScheduler
+
+SERVICES = ("Corte", "Sobrancelha", "Corte + Barba", "Pigmentação")
+
+@pytest.fixture(autouse=True)
+def one_barber(monkeypatch):
+    monkeypatch.setitem(SCHEDULING_CONFIG, "barbers", {"barbeiro_0": "Barbeiro 0"})
+
+@pytest.fixture
+def scheduler():
+    return BarberScheduler(store={}, ledger=None)
+
+def _next_working_day(scheduler: BarberScheduler) -> datetime.date:
+    date = datetime.date.today() + datetime.timedelta(days=1)
+    while not scheduler.is_working_day(date):
+        date += datetime.timedelta(days=1)
+    return date
+
+def _minutes(value: datetime.time) -> int:
+    return value.hour * 60 + value.minute
+
+def _fits(scheduler: BarberScheduler, date: datetime.date, start: int, duration: int) -> bool:
+    """Varredura direta: [start, start + duração + buffer) não encosta em nenhum confirmado"""
+    end = start + duration + scheduler.buffer_time
+    for apt in scheduler.appointments.values():
+        if apt.date != date or apt.status != "confirmed":
+            continue
+        apt_start = _minutes(apt.time)
+        apt_end = apt_start + scheduler.get_service_duration(apt.service) + scheduler.buffer_time
+        if apt_start < end and apt_end > start:
+            return False
+    return True
+
+def _book_randomly(scheduler: BarberScheduler, date: datetime.date, attempts: int, seed: int = 3):
+    rng = random.Random(seed)
+    start, end = scheduler.get_working_hours_for_date(date)
+    candidates = list(range(_minutes(start), _minutes(end), scheduler.time_granularity))
+    for index in range(attempts):
+        minutes = rng.choice(candidates)
+        scheduler.create_appointment(f"Cliente {index}", f"119{index:08d}", date,
+                                     datetime.time(minutes // 60, minutes % 60), service=rng.choice(SERVICES))
+
+def test_overlap_checks_use_service_duration(scheduler):
+    date = _next_working_day(scheduler)
+    _book_randomly(scheduler, date, 40)
+    assert sum(apt.status == "confirmed" for apt in scheduler.appointments.values()) >= 4
+    start, end = scheduler.get_working_hours_for_date(date)
+
+    for service in SERVICES:
+        duration = scheduler.get_service_duration(service)
+        for minutes in range(_minutes(start), _minutes(end), 5):
+            time = datetime.time(minutes // 60, minutes % 60)
+            assert scheduler.is_time_slot_available(date, time, service) == _fits(scheduler, date, minutes, duration)
+
+        available = [slot.time for slot in scheduler.get_available_slots(date, service=service)]
+        assert available == [slot.time for slot in scheduler.generate_time_slots(date)
+                             if _fits(scheduler, date, _minutes(slot.time), duration)]
+
+def test_fitting_times_match_scan(scheduler):
+    date = _next_working_day(scheduler)
+    _book_randomly(scheduler, date, 40, seed=8)
+    start, end = scheduler.get_working_hours_for_date(date)
+
+    for service in SERVICES:
+        duration = scheduler.get_service_duration(service)
+        expected = [
+            datetime.time(minutes // 60, minutes % 60)
+            for minutes in range(_minutes(start), _minutes(end) - duration + 1, scheduler.time_granularity)
+            if _fits(scheduler, date, minutes, duration)
+        ]
+        assert scheduler.find_fitting_times(date, service=service) == expected
+    assert scheduler.find_fitting_times(date, duration=75) == scheduler.find_fitting_times(date, service="Pigmentação")
+
+def test_long_service_blocks_following_slots(scheduler):
+    date = _next_working_day(scheduler)
+    grid = [slot.time for slot in scheduler.generate_time_slots(date)]
+    assert scheduler.create_appointment("Ana", "11911112222", date, grid[1], service="Pigmentação")[0]
+
+    # 75 min + 15 de buffer a partir do segundo horário: ocupa também o terceiro
+    busy = [slot.time for slot in scheduler.generate_time_slots(date) if not slot.available]
+    assert busy == grid[1:3]
+    success, message, _ = scheduler.create_appointment("Bia", "11933334444", date, grid[2])
+    assert not success and message
+    # O primeiro horário não comporta um serviço que termina depois do início da pigmentação
+    assert not scheduler.is_time_slot_available(date, grid[0], "Corte + Barba")
+    assert scheduler.is_time_slot_available(date, grid[0], "Sobrancelha")
+
+def test_short_service_fits_slots_busy_for_default_duration(scheduler):
+    date = _next_working_day(scheduler)
+    grid = [slot.time for slot in scheduler.generate_time_slots(date)]
+    # Sobrancelha 30 min depois do segundo horário: o segundo fica ocupado para a duração padrão
+    later = datetime.time((_minutes(grid[1]) + 30) // 60, (_minutes(grid[1]) + 30) % 60)
+    assert scheduler.create_appointment("Ana", "11911112222", date, later, service="Sobrancelha")[0]
+
+    default = [slot.time for slot in scheduler.get_available_slots(date)]
+    short = [slot.time for slot in scheduler.get_available_slots(date, service="Sobrancelha")]
+    assert grid[1] not in default
+    assert grid[1] in short and set(default) <= set(short)
+    assert scheduler.create_appointment("Bia", "11933334444", date, grid[1], service="Sobrancelha")[0]
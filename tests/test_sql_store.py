@@ -0,0 +1,105 @@
+"""
+Testes do armazenamento SQL com o backend SQLite (ida e volta, lotes e reversões)
+"""
+
+import dataclasses
+import datetime
+import os
+import sqlite3
+
+import pytest
+
+from config.settings import SCHEDULING_CONFIG
+from agents.scheduling_logic import Appointment, BarberScheduler
+from agents.sql_store import SQLiteAppointmentStore
+
+def _appointment(appointment_id: str, date: datetime.date, time: datetime.time,
+                 phone: str = "11988887777", status: str = "confirmed") -> Appointment:
+    created_at = datetime.datetime(2026, 10, 1, 9, 30, 15)
+    return Appointment(
+        id=appointment_id, client_name="Cliente", client_phone=phone, date=date, time=time,
+        service="Corte", status=status, created_at=created_at, updated_at=created_at,
+        barber_id="barbeiro_0"
+    )
+
+def _rows(store: SQLiteAppointmentStore) -> int:
+    """Linhas gravadas no banco (sem passar pelo cache nem pelas escritas pendentes)"""
+    return store._db.execute("SELECT COUNT(*) FROM appointments").fetchone()[0]
+
+@pytest.fixture
+def store():
+    store = SQLiteAppointmentStore(":memory:")
+    yield store
+    store.close()
+
+def test_round_trip_and_queries(store):
+    day = datetime.date(2026, 11, 3)
+    store["apt_1"] = _appointment("apt_1", day, datetime.time(9))
+    store["apt_2"] = _appointment("apt_2", day, datetime.time(10), phone="(11) 97777-6666")
+    store["apt_3"] = _appointment("apt_3", day, datetime.time(11), status="cancelled")
+    store["apt_4"] = _appointment("apt_4", day + datetime.timedelta(days=1), datetime.time(9))
+    # Write-through: tudo já está no banco
+    assert _rows(store) == 4
+
+    # Leitura direto do banco, sem o cache em memória
+    store._cache.clear()
+    store._query_cache.clear()
+    assert store["apt_1"] == _appointment("apt_1", day, datetime.time(9))
+
+    assert sorted(apt.id for apt in store.find_by_date(day)) == ["apt_1", "apt_2"]
+    assert [apt.id for apt in store.find_by_phone("11977776666")] == ["apt_2"]
+    assert sorted(apt.id for apt in store.find_by_phone("11988887777")) == ["apt_1", "apt_4"]
+
+    # Escritas invalidam as consultas em cache
+    store["apt_1"] = dataclasses.replace(store["apt_1"], status="cancelled")
+    assert [apt.id for apt in store.find_by_date(day)] == ["apt_2"]
+
+    del store["apt_2"]
+    assert "apt_2" not in store
+    assert store.find_by_date(day) == []
+    assert len(store) == 3 and _rows(store) == 3
+    with pytest.raises(KeyError):
+        del store["apt_2"]
+
+def test_batch_is_written_in_one_transaction_and_rolled_back_on_error(store):
+    day = datetime.date(2026, 11, 3)
+    with pytest.raises(sqlite3.IntegrityError):
+        with store.batch():
+            store["apt_1"] = _appointment("apt_1", day, datetime.time(9))
+            # Nada vai ao banco antes do fim do lote
+            assert _rows(store) == 0
+            store["apt_2"] = dataclasses.replace(_appointment("apt_2", day, datetime.time(10)), client_name=None)
+
+    # A linha válida também foi desfeita; as escritas voltam para a fila pendente
+    assert _rows(store) == 0
+    store["apt_2"] = _appointment("apt_2", day, datetime.time(10))
+    assert _rows(store) == 2
+
+def test_atomic_scheduler_batch_leaves_database_untouched(monkeypatch, store):
+    monkeypatch.setitem(SCHEDULING_CONFIG, "barbers", {"barbeiro_0": "Barbeiro 0"})
+    scheduler = BarberScheduler(store=store, ledger=None)
+    date = datetime.date.today() + datetime.timedelta(days=1)
+    while not scheduler.get_available_slots(date):
+        date += datetime.timedelta(days=1)
+    first, second = [slot.time for slot in scheduler.get_available_slots(date)][:2]
+
+    results = scheduler.create_appointments([
+        {"client_name": "Ana", "client_phone": "11911112222", "date": date, "time": first},
+        {"client_name": "Bia", "client_phone": "11933334444", "date": date, "time": second},
+        # Mesmo horário da Ana: o lote inteiro falha
+        {"client_name": "Caio", "client_phone": "11955556666", "date": date, "time": first},
+    ], atomic=True)
+
+    assert [success for success, _, _ in results] == [False, False, False]
+    assert _rows(store) == 0
+    assert {first, second} <= {slot.time for slot in scheduler.get_available_slots(date)}
+
+def test_sqlite_file_parent_directory_is_created(tmp_path):
+    path = os.path.join(tmp_path, "dados", "agenda", "appointments.db")
+    store = SQLiteAppointmentStore(path)
+    store["apt_1"] = _appointment("apt_1", datetime.date(2026, 11, 3), datetime.time(9))
+    store.close()
+
+    reopened = SQLiteAppointmentStore(path)
+    assert reopened["apt_1"].time == datetime.time(9)
+    reopened.close()
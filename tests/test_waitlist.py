@@ -0,0 +1,99 @@
+"""
+Testes da lista de espera: oferta ao liberar um horário e resposta ao convite
+"""
+
+import datetime
+
+import pytest
+
+from config.settings import SCHEDULING_CONFIG
+from agents.scheduling_logic import BarberScheduler
+from agents.barber_agent import BarberAgent
+
+def _next_working_day(scheduler: BarberScheduler) -> datetime.date:
+    date = datetime.date.today() + datetime.timedelta(days=1)
+    while not scheduler.get_available_slots(date):
+        date += datetime.timedelta(days=1)
+    return date
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    monkeypatch.setitem(SCHEDULING_CONFIG, "barbers", {"barbeiro_0": "Barbeiro 0"})
+    return BarberScheduler(store={}, ledger=None)
+
+def test_cancellation_offers_slot_to_oldest_waiting_client(scheduler):
+    date = _next_working_day(scheduler)
+    booked = {}
+    for index, slot in enumerate(scheduler.get_available_slots(date)):
+        success, _, appointment_id = scheduler.create_appointment(
+            f"Cliente {index}", f"1190000{index:04d}", date, slot.time
+        )
+        assert success
+        booked[slot.time] = appointment_id
+    assert scheduler.get_available_slots(date) == []
+
+    offers = []
+    scheduler.waitlist_notifier = offers.append
+    success, _, first_entry = scheduler.join_waitlist("Primeiro", "11911112222", date)
+    assert success
+    success, _, _ = scheduler.join_waitlist("Segundo", "11933334444", date)
+    assert success
+
+    freed_time = sorted(booked)[2]
+    assert scheduler.cancel_appointment(booked[freed_time])[0]
+
+    assert len(offers) == 1
+    offer = offers[0]
+    assert (offer.entry_id, offer.date, offer.time) == (first_entry, date, freed_time)
+    assert scheduler.get_waitlist_offer("11911112222") == offer
+
+    success, _, appointment_id = scheduler.accept_waitlist_offer(first_entry)
+    assert success
+    appointment = scheduler.appointments[appointment_id]
+    assert (appointment.client_name, appointment.date, appointment.time) == ("Primeiro", date, freed_time)
+    assert scheduler.get_waitlist_offer("11911112222") is None
+
+def test_declined_offer_goes_to_next_client(scheduler):
+    date = _next_working_day(scheduler)
+    times = [slot.time for slot in scheduler.get_available_slots(date)]
+    appointment_ids = [
+        scheduler.create_appointment(f"Cliente {index}", f"1190000{index:04d}", date, time)[2]
+        for index, time in enumerate(times)
+    ]
+
+    offers = []
+    scheduler.waitlist_notifier = offers.append
+    first_entry = scheduler.join_waitlist("Primeiro", "11911112222", date)[2]
+    second_entry = scheduler.join_waitlist("Segundo", "11933334444", date)[2]
+    assert scheduler.cancel_appointment(appointment_ids[0])[0]
+
+    assert scheduler.decline_waitlist_offer(first_entry)[0]
+    assert [offer.entry_id for offer in offers] == [first_entry, second_entry]
+    assert offers[1].time == times[0]
+
+@pytest.fixture
+def agent():
+    return BarberAgent()
+
+def _invite_context():
+    return {
+        'state': 'waiting_for_waitlist_confirmation',
+        'phone_number': '11911112222',
+        'current_appointment': None,
+        'pending_data': {'date': datetime.date.today() + datetime.timedelta(days=1)},
+    }
+
+@pytest.mark.parametrize("message", ["não quero", "Nao quero", "não", "nao, obrigado"])
+def test_waitlist_invite_refusal_returns_to_idle(agent, message):
+    response, context = agent._handle_waitlist_confirmation(message, _invite_context(), "conversa")
+
+    assert context['state'] == 'idle'
+    assert context['pending_data'] == {}
+    assert "lista de espera" in response
+
+@pytest.mark.parametrize("message", ["sim", "quero", "pode me colocar na lista"])
+def test_waitlist_invite_acceptance_asks_for_name(agent, message):
+    _, context = agent._handle_waitlist_confirmation(message, _invite_context(), "conversa")
+
+    assert context['state'] == 'waiting_for_waitlist_name'
+    assert 'date' in context['pending_data']
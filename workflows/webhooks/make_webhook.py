@@ -7,8 +7,8 @@ Recebe mensagens processadas e executa ações de agendamento
 import json
 import logging
 import requests
-from datetime import datetime
-from typing import Dict, Any, Optional
+from datetime import date as date_type, datetime, time as time_type
+from typing import Dict, Any, List, Optional
 from flask import Flask, request, jsonify
 from config.settings import MAKE_CONFIG, WHATSAPP_CONFIG
 from agents.barber_agent import barber_agent
@@ -88,18 +88,28 @@ class MakeWebhook:
                     "error": "Dados incompletos para agendamento"
                 }
             
+            try:
+                date = self._parse_date(date)
+                time = self._parse_time(time)
+            except (TypeError, ValueError):
+                return {
+                    "success": False,
+                    "error": "Data ou horário inválido (use AAAA-MM-DD e HH:MM)"
+                }
+            
             # Cria agendamento via agente
-            appointment = self.barber_agent.scheduler.create_appointment(
+            success, message, appointment_id = self.barber_agent.scheduler.create_appointment(
                 client_name=client_name,
                 client_phone=phone_number,
                 date=date,
                 time=time,
-                service="Corte de Cabelo"
+                service="Corte de Cabelo",
+                barber_id=data.get("barber_id")
             )
             
-            if appointment:
+            if success:
                 # Envia confirmação
-                confirmation_msg = f"✅ Agendamento confirmado!\n\n📅 Data: {date}\n🕐 Horário: {time}\n👤 Nome: {client_name}\n\n⏰ Lembrete: Chegue 10 minutos antes do horário."
+                confirmation_msg = f"✅ Agendamento confirmado!\n\n📅 Data: {date.strftime('%d/%m/%Y')}\n🕐 Horário: {time.strftime('%H:%M')}\n👤 Nome: {client_name}\n\n⏰ Lembrete: Chegue 10 minutos antes do horário."
                 
                 self.send_whatsapp_response(
                     phone_number,
@@ -113,13 +123,13 @@ class MakeWebhook:
                 
                 return {
                     "success": True,
-                    "appointment_id": appointment.id,
+                    "appointment_id": appointment_id,
                     "message": "Agendamento criado com sucesso"
                 }
             else:
                 return {
                     "success": False,
-                    "error": "Falha ao criar agendamento"
+                    "error": message
                 }
                 
         except Exception as e:
@@ -141,14 +151,22 @@ class MakeWebhook:
                     "error": "Data não informada"
                 }
             
+            try:
+                date = self._parse_date(date)
+            except (TypeError, ValueError):
+                return {
+                    "success": False,
+                    "error": "Data inválida (use AAAA-MM-DD)"
+                }
+            
             # Busca horários disponíveis
             available_slots = self.barber_agent.scheduler.get_available_slots(date)
             
             if available_slots:
                 # Formata horários disponíveis
-                time_list = "\n".join([f"• {slot.time}" for slot in available_slots[:10]])
+                time_list = "\n".join([f"• {slot.time.strftime('%H:%M')}" for slot in available_slots[:10]])
                 
-                availability_msg = f"🕐 Horários disponíveis para {date}:\n\n{time_list}"
+                availability_msg = f"🕐 Horários disponíveis para {date.strftime('%d/%m/%Y')}:\n\n{time_list}"
                 
                 if len(available_slots) > 10:
                     availability_msg += f"\n\n... e mais {len(available_slots) - 10} horários disponíveis."
@@ -173,7 +191,7 @@ class MakeWebhook:
                 }
             else:
                 # Nenhum horário disponível
-                no_availability_msg = f"😔 Não há horários disponíveis para {date}.\n\nGostaria de ver outras datas?"
+                no_availability_msg = f"😔 Não há horários disponíveis para {date.strftime('%d/%m/%Y')}.\n\nGostaria de ver outras datas?"
                 
                 self.send_whatsapp_response(
                     phone_number,
@@ -212,7 +230,7 @@ class MakeWebhook:
             
             if appointment_id:
                 # Cancela agendamento específico
-                success = self.barber_agent.scheduler.cancel_appointment(appointment_id)
+                success, message = self.barber_agent.scheduler.cancel_appointment(appointment_id)
                 
                 if success:
                     cancellation_msg = "❌ Agendamento cancelado com sucesso!\n\nGostaria de fazer um novo agendamento?"
@@ -233,7 +251,7 @@ class MakeWebhook:
                 else:
                     return {
                         "success": False,
-                        "error": "Falha ao cancelar agendamento"
+                        "error": message
                     }
             else:
                 # Busca agendamentos do cliente
@@ -294,13 +312,23 @@ class MakeWebhook:
                 }
             
             if appointment_id and new_date and new_time:
+                try:
+                    new_date = self._parse_date(new_date)
+                    new_time = self._parse_time(new_time)
+                except (TypeError, ValueError):
+                    return {
+                        "success": False,
+                        "error": "Data ou horário inválido (use AAAA-MM-DD e HH:MM)"
+                    }
+                
                 # Executa remarcação
-                success = self.barber_agent.scheduler.reschedule_appointment(
-                    appointment_id, new_date, new_time
+                success, message = self.barber_agent.scheduler.reschedule_appointment(
+                    appointment_id, new_date, new_time,
+                    new_barber_id=data.get("new_barber_id")
                 )
                 
                 if success:
-                    reschedule_msg = f"🔄 Agendamento remarcado com sucesso!\n\n📅 Nova data: {new_date}\n🕐 Novo horário: {new_time}\n\n⏰ Lembrete: Chegue 10 minutos antes do horário."
+                    reschedule_msg = f"🔄 Agendamento remarcado com sucesso!\n\n📅 Nova data: {new_date.strftime('%d/%m/%Y')}\n🕐 Novo horário: {new_time.strftime('%H:%M')}\n\n⏰ Lembrete: Chegue 10 minutos antes do horário."
                     
                     self.send_whatsapp_response(
                         phone_number,
@@ -318,7 +346,7 @@ class MakeWebhook:
                 else:
                     return {
                         "success": False,
-                        "error": "Falha ao remarcar agendamento"
+                        "error": message
                     }
             else:
                 # Busca agendamentos para remarcação
@@ -364,11 +392,163 @@ class MakeWebhook:
                 "error": str(e)
             }
 
+    @staticmethod
+    def _parse_date(value) -> date_type:
+        """Converte a data recebida do Make (AAAA-MM-DD) em date"""
+        if isinstance(value, date_type):
+            return value
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    
+    @staticmethod
+    def _parse_time(value) -> time_type:
+        """Converte o horário recebido do Make (HH:MM) em time"""
+        if isinstance(value, time_type):
+            return value
+        return datetime.strptime(value, "%H:%M").time()
+    
+    @staticmethod
+    def _parse_flag(value) -> bool:
+        """
+        Converte uma opção booleana do Make (true/false, "true"/"false", 1/0)
+        
+        Rejeita qualquer outro valor: bool("false") seria True e aplicaria o lote
+        com a semântica errada.
+        """
+        if isinstance(value, bool):
+            return value
+        if isinstance(value, int) and value in (0, 1):
+            return bool(value)
+        if isinstance(value, str) and value.strip().lower() in ("true", "false", "1", "0"):
+            return value.strip().lower() in ("true", "1")
+        raise ValueError(f"Valor inválido para atomic: {value!r} (use true ou false)")
+    
+    @staticmethod
+    def _batch_response(results: List[tuple], atomic: bool) -> Dict[str, Any]:
+        """Monta a resposta de um lote com o resultado de cada item"""
+        items = []
+        for result in results:
+            item = {"success": result[0], "message": result[1]}
+            if len(result) > 2:
+                item["appointment_id"] = result[2]
+            items.append(item)
+        
+        applied = sum(1 for item in items if item["success"])
+        return {
+            "success": applied == len(items),
+            "atomic": atomic,
+            "applied": applied,
+            "failed": len(items) - applied,
+            "results": items
+        }
+    
+    def handle_batch_scheduling_request(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Processa um lote de agendamentos (ex: lista de clientes sem hora marcada do dia)
+        
+        Espera "items" com phone_number, client_name, date, time e, opcionalmente,
+        service e barber_id; "atomic": true aplica tudo ou nada.
+        """
+        try:
+            atomic = self._parse_flag(data.get("atomic", False))
+            items = data.get("items") or []
+            if not isinstance(items, list) or not items:
+                return {
+                    "success": False,
+                    "error": "Lista de itens não informada"
+                }
+            
+            bookings = []
+            for item in items:
+                if not all([item.get("phone_number"), item.get("date"), item.get("time"), item.get("client_name")]):
+                    return {
+                        "success": False,
+                        "error": "Dados incompletos para agendamento em um dos itens"
+                    }
+                bookings.append({
+                    "client_name": item["client_name"],
+                    "client_phone": item["phone_number"],
+                    "date": self._parse_date(item["date"]),
+                    "time": self._parse_time(item["time"]),
+                    "service": item.get("service", "Corte de Cabelo"),
+                    "barber_id": item.get("barber_id")
+                })
+            
+            results = self.barber_agent.scheduler.create_appointments(bookings, atomic=atomic)
+            return self._batch_response(results, atomic)
+            
+        except Exception as e:
+            logger.error(f"Erro no agendamento em lote: {e}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
+    
+    def handle_batch_cancellation_request(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Processa um lote de cancelamentos ("appointment_ids": lista de IDs)"""
+        try:
+            atomic = self._parse_flag(data.get("atomic", False))
+            appointment_ids = data.get("appointment_ids") or []
+            if not isinstance(appointment_ids, list) or not appointment_ids:
+                return {
+                    "success": False,
+                    "error": "Lista de agendamentos não informada"
+                }
+            
+            results = self.barber_agent.scheduler.cancel_appointments(appointment_ids, atomic=atomic)
+            return self._batch_response(results, atomic)
+            
+        except Exception as e:
+            logger.error(f"Erro no cancelamento em lote: {e}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
+    
+    def handle_batch_reschedule_request(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Processa um lote de remarcações (ex: clientes de um barbeiro que faltou)
+        
+        Espera "items" com appointment_id, new_date, new_time e, opcionalmente,
+        new_barber_id; "atomic": true aplica tudo ou nada.
+        """
+        try:
+            atomic = self._parse_flag(data.get("atomic", False))
+            items = data.get("items") or []
+            if not isinstance(items, list) or not items:
+                return {
+                    "success": False,
+                    "error": "Lista de itens não informada"
+                }
+            
+            moves = []
+            for item in items:
+                if not all([item.get("appointment_id"), item.get("new_date"), item.get("new_time")]):
+                    return {
+                        "success": False,
+                        "error": "Dados incompletos para remarcação em um dos itens"
+                    }
+                moves.append({
+                    "appointment_id": item["appointment_id"],
+                    "new_date": self._parse_date(item["new_date"]),
+                    "new_time": self._parse_time(item["new_time"]),
+                    "new_barber_id": item.get("new_barber_id")
+                })
+            
+            results = self.barber_agent.scheduler.reschedule_appointments(moves, atomic=atomic)
+            return self._batch_response(results, atomic)
+            
+        except Exception as e:
+            logger.error(f"Erro na remarcação em lote: {e}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
+
 # Instância global
 make_webhook = MakeWebhook()
 
 @app.route('/webhook/make', methods=['POST'])
-def make_webhook():
+def make_webhook_endpoint():
     """Endpoint principal do webhook do Make"""
     
     try:
@@ -396,6 +576,12 @@ def make_webhook():
             result = make_webhook.handle_cancellation_request(data)
         elif action_type == "reschedule_appointment":
             result = make_webhook.handle_reschedule_request(data)
+        elif action_type == "batch_schedule_appointments":
+            result = make_webhook.handle_batch_scheduling_request(data)
+        elif action_type == "batch_cancel_appointments":
+            result = make_webhook.handle_batch_cancellation_request(data)
+        elif action_type == "batch_reschedule_appointments":
+            result = make_webhook.handle_batch_reschedule_request(data)
         else:
             # Processa mensagem padrão
             result = make_webhook.process_make_request(data)
@@ -422,6 +608,9 @@ def make_webhook_status():
             "check_availability", 
             "cancel_appointment",
             "reschedule_appointment",
+            "batch_schedule_appointments",
+            "batch_cancel_appointments",
+            "batch_reschedule_appointments",
             "process_message"
         ]
     })